@@ -4,16 +4,28 @@ Comprehensive Supply Chain Operations Analysis
 Analyzes both merchandising strategy and operational health metrics
 """
 
-import pandas as pd
 import numpy as np
 import os
+import sys
 from datetime import datetime
 import json
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'claude'))
+from dataset_store import load_dataset, SUPPLY_CHAIN_STORE_DIR
+
 def analyze_comprehensive_supply_chain():
     """Analyze both merchandising strategy and operational health"""
     print("Loading dataset for comprehensive supply chain analysis...")
-    df = pd.read_csv("/Users/arghya.mukherjee/Downloads/cursor/sd/metadata/grocery_dataset.csv")
+    df = load_dataset(columns=[
+        'category', 'brand', 'customer_type', 'store_type', 'supplier_id',
+        'total_amount', 'basket_size', 'margin_impact', 'inventory_turnover',
+        'price_elasticity', 'price_sensitivity_score', 'promotional_lift',
+        'promotion_effectiveness', 'sales_per_sqft', 'category_space_allocation',
+        'space_utilization', 'sku_performance_score', 'stockout_risk_score',
+        'safety_stock_level', 'forecast_accuracy', 'demand_volatility',
+        'supplier_performance_score', 'delivery_reliability', 'supplier_cost_efficiency',
+        'replenishment_lead_time'
+    ], store_dir=SUPPLY_CHAIN_STORE_DIR)
     print(f"Loaded {len(df):,} transactions")
     
     insights = {}
@@ -22,29 +34,29 @@ def analyze_comprehensive_supply_chain():
     print("Analyzing merchandising strategy...")
     
     # Category Strategy
-    category_revenue = df.groupby('category')['total_amount'].sum().sort_values(ascending=False).head(5)
-    category_margin = df.groupby('category')['margin_impact'].mean().sort_values().head(5)
-    category_turnover = df.groupby('category')['inventory_turnover'].mean().sort_values().head(5)
+    category_revenue = df.groupby('category', observed=True)['total_amount'].sum().sort_values(ascending=False).head(5)
+    category_margin = df.groupby('category', observed=True)['margin_impact'].mean().sort_values().head(5)
+    category_turnover = df.groupby('category', observed=True)['inventory_turnover'].mean().sort_values().head(5)
     
     # Brand Strategy
-    brand_revenue = df.groupby('brand')['total_amount'].sum().sort_values(ascending=False).head(10)
-    brand_margin = df.groupby('brand')['margin_impact'].mean().sort_values().head(10)
+    brand_revenue = df.groupby('brand', observed=True)['total_amount'].sum().sort_values(ascending=False).head(10)
+    brand_margin = df.groupby('brand', observed=True)['margin_impact'].mean().sort_values().head(10)
     
     # Pricing Strategy
-    price_elasticity = df.groupby('category')['price_elasticity'].mean().sort_values().head(5)
-    price_sensitivity = df.groupby('category')['price_sensitivity_score'].mean().sort_values(ascending=False).head(5)
+    price_elasticity = df.groupby('category', observed=True)['price_elasticity'].mean().sort_values().head(5)
+    price_sensitivity = df.groupby('category', observed=True)['price_sensitivity_score'].mean().sort_values(ascending=False).head(5)
     
     # Promotional Strategy
-    promo_lift = df.groupby('category')['promotional_lift'].mean().sort_values(ascending=False).head(5)
-    promo_effectiveness = df.groupby('category')['promotion_effectiveness'].mean().sort_values(ascending=False).head(5)
+    promo_lift = df.groupby('category', observed=True)['promotional_lift'].mean().sort_values(ascending=False).head(5)
+    promo_effectiveness = df.groupby('category', observed=True)['promotion_effectiveness'].mean().sort_values(ascending=False).head(5)
     
     # Space Strategy
-    sales_density = df.groupby('category')['sales_per_sqft'].mean().sort_values(ascending=False).head(5)
-    space_allocation = df.groupby('category')['category_space_allocation'].mean().sort_values(ascending=False).head(5)
+    sales_density = df.groupby('category', observed=True)['sales_per_sqft'].mean().sort_values(ascending=False).head(5)
+    space_allocation = df.groupby('category', observed=True)['category_space_allocation'].mean().sort_values(ascending=False).head(5)
     
     # Customer Strategy
-    customer_value = df.groupby('customer_type')['total_amount'].sum().sort_values(ascending=False)
-    customer_basket = df.groupby('customer_type')['basket_size'].mean().sort_values(ascending=False)
+    customer_value = df.groupby('customer_type', observed=True)['total_amount'].sum().sort_values(ascending=False)
+    customer_basket = df.groupby('customer_type', observed=True)['basket_size'].mean().sort_values(ascending=False)
     
     insights['merchandising_strategy'] = {
         'category_strategy': {
@@ -78,25 +90,25 @@ def analyze_comprehensive_supply_chain():
     print("Analyzing operational health...")
     
     # Inventory Management
-    inventory_turnover = df.groupby('category')['inventory_turnover'].mean().sort_values()
-    stockout_risk = df.groupby('category')['stockout_risk_score'].mean().sort_values(ascending=False)
-    safety_stock = df.groupby('category')['safety_stock_level'].mean().sort_values(ascending=False)
+    inventory_turnover = df.groupby('category', observed=True)['inventory_turnover'].mean().sort_values()
+    stockout_risk = df.groupby('category', observed=True)['stockout_risk_score'].mean().sort_values(ascending=False)
+    safety_stock = df.groupby('category', observed=True)['safety_stock_level'].mean().sort_values(ascending=False)
     
     # Forecast Accuracy
-    forecast_accuracy = df.groupby('category')['forecast_accuracy'].mean().sort_values(ascending=False)
-    demand_volatility = df.groupby('category')['demand_volatility'].mean().sort_values(ascending=False)
+    forecast_accuracy = df.groupby('category', observed=True)['forecast_accuracy'].mean().sort_values(ascending=False)
+    demand_volatility = df.groupby('category', observed=True)['demand_volatility'].mean().sort_values(ascending=False)
     
     # Supplier Performance
-    supplier_performance = df.groupby('supplier_id')['supplier_performance_score'].mean().sort_values(ascending=False).head(20)
-    delivery_reliability = df.groupby('supplier_id')['delivery_reliability'].mean().sort_values(ascending=False).head(20)
-    supplier_cost_efficiency = df.groupby('supplier_id')['supplier_cost_efficiency'].mean().sort_values(ascending=False).head(20)
+    supplier_performance = df.groupby('supplier_id', observed=True)['supplier_performance_score'].mean().sort_values(ascending=False).head(20)
+    delivery_reliability = df.groupby('supplier_id', observed=True)['delivery_reliability'].mean().sort_values(ascending=False).head(20)
+    supplier_cost_efficiency = df.groupby('supplier_id', observed=True)['supplier_cost_efficiency'].mean().sort_values(ascending=False).head(20)
     
     # Lead Time Analysis
-    lead_time = df.groupby('category')['replenishment_lead_time'].mean().sort_values(ascending=False)
+    lead_time = df.groupby('category', observed=True)['replenishment_lead_time'].mean().sort_values(ascending=False)
     
     # Store Operations
-    store_performance = df.groupby('store_type')['sales_per_sqft'].mean().sort_values(ascending=False)
-    space_utilization = df.groupby('store_type')['space_utilization'].mean().sort_values(ascending=False)
+    store_performance = df.groupby('store_type', observed=True)['sales_per_sqft'].mean().sort_values(ascending=False)
+    space_utilization = df.groupby('store_type', observed=True)['space_utilization'].mean().sort_values(ascending=False)
     
     insights['operational_health'] = {
         'inventory_management': {
@@ -4,16 +4,23 @@ Industry Benchmark Analysis for Supply Chain Operations
 Analyzes our performance against industry benchmarks
 """
 
-import pandas as pd
 import numpy as np
 import os
+import sys
 from datetime import datetime
 import json
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'claude'))
+from dataset_store import load_dataset, SUPPLY_CHAIN_STORE_DIR
+
 def analyze_industry_benchmarks():
     """Analyze our performance against industry benchmarks"""
     print("Loading dataset for industry benchmark analysis...")
-    df = pd.read_csv("/Users/arghya.mukherjee/Downloads/cursor/sd/metadata/grocery_dataset.csv")
+    df = load_dataset(columns=[
+        'basket_size', 'category', 'forecast_accuracy', 'inventory_turnover',
+        'margin_impact', 'price_elasticity', 'promotional_lift', 'space_utilization',
+        'supplier_performance_score', 'total_amount'
+    ], store_dir=SUPPLY_CHAIN_STORE_DIR)
     print(f"Loaded {len(df):,} transactions")
     
     benchmarks = {}
@@ -22,9 +29,9 @@ def analyze_industry_benchmarks():
     print("Analyzing category performance benchmarks...")
     
     # Our actual performance
-    category_revenue = df.groupby('category')['total_amount'].sum().sort_values(ascending=False)
-    category_margin = df.groupby('category')['margin_impact'].mean()
-    category_turnover = df.groupby('category')['inventory_turnover'].mean()
+    category_revenue = df.groupby('category', observed=True)['total_amount'].sum().sort_values(ascending=False)
+    category_margin = df.groupby('category', observed=True)['margin_impact'].mean()
+    category_turnover = df.groupby('category', observed=True)['inventory_turnover'].mean()
     
     # Industry benchmarks (typical grocery retail)
     industry_benchmarks = {
@@ -4,23 +4,32 @@ Fundamental Merchandising Strategy Analysis
 Analyzes the dataset to identify core merchandising challenges that leaders actually ask
 """
 
-import pandas as pd
 import numpy as np
 import os
+import sys
 from datetime import datetime
 import json
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'claude'))
+from dataset_store import load_dataset, SUPPLY_CHAIN_STORE_DIR
+
 def analyze_merchandising_strategy():
     """Analyze fundamental merchandising strategy questions"""
     print("Loading dataset for merchandising analysis...")
-    df = pd.read_csv("/Users/arghya.mukherjee/Downloads/cursor/sd/metadata/grocery_dataset.csv")
+    df = load_dataset(columns=[
+        'category', 'brand', 'customer_type', 'total_amount', 'unit_price',
+        'basket_size', 'margin_impact', 'inventory_turnover', 'price_elasticity',
+        'price_sensitivity_score', 'promotional_lift', 'promotion_effectiveness',
+        'sales_per_sqft', 'category_space_allocation', 'space_utilization',
+        'sku_performance_score'
+    ], store_dir=SUPPLY_CHAIN_STORE_DIR)
     print(f"Loaded {len(df):,} transactions")
     
     insights = {}
     
     # 1. Category Strategy Analysis
     print("Analyzing category strategy...")
-    category_analysis = df.groupby('category').agg({
+    category_analysis = df.groupby('category', observed=True).agg({
         'total_amount': ['sum', 'mean', 'count'],
         'unit_price': 'mean',
         'margin_impact': 'mean',
@@ -31,11 +40,11 @@ def analyze_merchandising_strategy():
     }).round(2)
     
     # Top revenue categories
-    top_revenue = df.groupby('category')['total_amount'].sum().sort_values(ascending=False).head(5)
+    top_revenue = df.groupby('category', observed=True)['total_amount'].sum().sort_values(ascending=False).head(5)
     # Lowest margin categories
-    lowest_margin = df.groupby('category')['margin_impact'].mean().sort_values().head(5)
+    lowest_margin = df.groupby('category', observed=True)['margin_impact'].mean().sort_values().head(5)
     # Slowest turning categories
-    slowest_turnover = df.groupby('category')['inventory_turnover'].mean().sort_values().head(5)
+    slowest_turnover = df.groupby('category', observed=True)['inventory_turnover'].mean().sort_values().head(5)
     
     insights['category_strategy'] = {
         'top_revenue_categories': top_revenue.to_dict(),
@@ -45,8 +54,8 @@ def analyze_merchandising_strategy():
     
     # 2. Brand Strategy Analysis
     print("Analyzing brand strategy...")
-    brand_revenue = df.groupby('brand')['total_amount'].sum().sort_values(ascending=False).head(10)
-    brand_margin = df.groupby('brand')['margin_impact'].mean().sort_values().head(10)
+    brand_revenue = df.groupby('brand', observed=True)['total_amount'].sum().sort_values(ascending=False).head(10)
+    brand_margin = df.groupby('brand', observed=True)['margin_impact'].mean().sort_values().head(10)
     
     insights['brand_strategy'] = {
         'top_revenue_brands': brand_revenue.to_dict(),
@@ -55,8 +64,8 @@ def analyze_merchandising_strategy():
     
     # 3. Price Strategy Analysis
     print("Analyzing price strategy...")
-    price_elasticity = df.groupby('category')['price_elasticity'].mean().sort_values().head(5)
-    price_sensitivity = df.groupby('category')['price_sensitivity_score'].mean().sort_values(ascending=False).head(5)
+    price_elasticity = df.groupby('category', observed=True)['price_elasticity'].mean().sort_values().head(5)
+    price_sensitivity = df.groupby('category', observed=True)['price_sensitivity_score'].mean().sort_values(ascending=False).head(5)
     
     insights['price_strategy'] = {
         'most_elastic_categories': price_elasticity.to_dict(),
@@ -65,8 +74,8 @@ def analyze_merchandising_strategy():
     
     # 4. Promotional Strategy Analysis
     print("Analyzing promotional strategy...")
-    promo_lift = df.groupby('category')['promotional_lift'].mean().sort_values(ascending=False).head(5)
-    promo_effectiveness = df.groupby('category')['promotion_effectiveness'].mean().sort_values(ascending=False).head(5)
+    promo_lift = df.groupby('category', observed=True)['promotional_lift'].mean().sort_values(ascending=False).head(5)
+    promo_effectiveness = df.groupby('category', observed=True)['promotion_effectiveness'].mean().sort_values(ascending=False).head(5)
     
     insights['promotional_strategy'] = {
         'highest_lift_categories': promo_lift.to_dict(),
@@ -75,8 +84,8 @@ def analyze_merchandising_strategy():
     
     # 5. Space Strategy Analysis
     print("Analyzing space strategy...")
-    sales_density = df.groupby('category')['sales_per_sqft'].mean().sort_values(ascending=False).head(5)
-    space_allocation = df.groupby('category')['category_space_allocation'].mean().sort_values(ascending=False).head(5)
+    sales_density = df.groupby('category', observed=True)['sales_per_sqft'].mean().sort_values(ascending=False).head(5)
+    space_allocation = df.groupby('category', observed=True)['category_space_allocation'].mean().sort_values(ascending=False).head(5)
     
     insights['space_strategy'] = {
         'highest_density_categories': sales_density.to_dict(),
@@ -85,8 +94,8 @@ def analyze_merchandising_strategy():
     
     # 6. Customer Strategy Analysis
     print("Analyzing customer strategy...")
-    customer_value = df.groupby('customer_type')['total_amount'].sum().sort_values(ascending=False)
-    customer_basket = df.groupby('customer_type')['basket_size'].mean().sort_values(ascending=False)
+    customer_value = df.groupby('customer_type', observed=True)['total_amount'].sum().sort_values(ascending=False)
+    customer_basket = df.groupby('customer_type', observed=True)['basket_size'].mean().sort_values(ascending=False)
     
     insights['customer_strategy'] = {
         'customer_value_by_type': customer_value.to_dict(),
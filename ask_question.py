@@ -2,10 +2,63 @@
 """
 Ask a question to the LangGraph Store Manager
 Usage: python3 ask_question.py "Your question here"
+
+Sends the question to the warm server (python3 qa_server.py) when it is running, so the data
+is not reloaded per question; otherwise loads the system in-process as before.
+Set QA_SERVER_URL to point at a server on another port. Either way, a question already answered
+against the current revenue tree / dashboard artifacts comes from the answer cache, and numeric
+lookups ("top stores", "revenue run rate") come straight from the aggregate tables.
 """
 
+import json
+import os
 import sys
-from langgraph_multi_agent_store_manager import LangGraphStoreManager
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'claude'))
+
+QA_SERVER_URL = os.environ.get('QA_SERVER_URL', 'http://127.0.0.1:8765')
+
+
+def ask_server(question, url=QA_SERVER_URL):
+    """Answer from the warm server, or None when no server is listening"""
+    request = urllib.request.Request(f"{url}/ask", data=json.dumps({'question': question}).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return json.load(response)['answer']
+    except urllib.error.HTTPError as exc:
+        try:
+            message = json.load(exc).get('error', exc.reason)
+        except (ValueError, AttributeError):
+            message = exc.reason
+        raise RuntimeError(message) from None
+    except (urllib.error.URLError, ConnectionError):
+        return None
+
+
+def ask_local(question):
+    """Aggregate lookup or cached answer, else load the full system in this process (slow: reads all data)"""
+    # Imported here: both pull in pandas (and the cache the pipeline), which the server path never needs
+    from aggregate_query import AggregateQueries, format_result
+    from answer_cache import AnswerCache, artifact_version
+    structured = AggregateQueries().ask(question)
+    if structured is not None:
+        return format_result(structured)
+    cache = AnswerCache()
+    version = artifact_version()
+    answer = cache.get(question, version)
+    if answer is not None:
+        return answer
+    from langgraph_multi_agent_store_manager import LangGraphStoreManager
+    print("(QA server not running — loading data in-process; start it with: python3 qa_server.py)")
+    system = LangGraphStoreManager()
+    answer = system.ask(question)
+    cache.put(question, version, answer)
+    cache.save()
+    return answer
+
 
 def main():
     if len(sys.argv) < 2:
@@ -15,15 +68,14 @@ def main():
     # Get question from command line
     question = " ".join(sys.argv[1:])
 
-    # Initialize system (loads all data)
-    system = LangGraphStoreManager()
-
     print(f"\n{'='*70}")
     print(f"YOUR QUESTION: {question}")
     print("="*70 + "\n")
 
-    # Get answer through multi-agent pipeline
-    answer = system.ask(question)
+    # Get answer through multi-agent pipeline (warm server first)
+    answer = ask_server(question)
+    if answer is None:
+        answer = ask_local(question)
 
     print(f"\n💼 STORE MANAGER'S ANSWER:")
     print("="*70)
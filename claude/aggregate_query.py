@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""
+Structured Aggregate Queries
+Answers the numeric questions ("top stores", "customers by region", "revenue run rate") from
+the precomputed metadata_ceo aggregate tables, without touching raw transactions
+
+    queries = AggregateQueries()
+    result = queries.ask("Which stores are our top performers?")    # None → not a lookup question
+    print(format_result(result))
+
+A question becomes a typed Intent, the Intent a QueryPlan, and the plan runs against tables
+held in memory as NumPy columns with a value → row-positions index per dimension and a
+cached sort order per measure:
+
+    Intent     kind (rank | lookup | breakdown | metric), entity, measure, direction, k, filters
+    QueryPlan  table, group_by (set when the entity is rolled up from a finer table), measure,
+               filters, direction, k
+
+Ranking on a table keyed by the entity (one row per entity) is a filtered slice of the
+presorted order (microseconds). When only a finer table carries the measure or the filter
+columns (e.g. categories within a region from the revenue tree, or brands from
+revenue_by_brand.csv, which has a row per category and brand), the plan rolls it up once and
+keeps the result. Distinct counts (unique customers) cannot be summed over finer rows, so they
+are only answered from a table keyed by the entity. Only complete tables are registered: a top-N extract would silently drop entities
+from rankings and rollups.
+
+Questions the Intent cannot express (a year, quarter or month, weekend/holiday splits, a
+filter on a metric, a direction such as "declining") return None, so the full system answers
+them instead of a confident wrong number.
+
+Usage: python3 aggregate_query.py "Which stores are our top performers?"
+"""
+
+import json
+import re
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import BASE_DIR, METADATA_CEO_DIR
+
+KPI_DIR = BASE_DIR / "metadata"
+DASHBOARD_FILE = 'ceo_executive_dashboard.json'
+
+# name → file (metadata_ceo/), key column; order is preference when several tables qualify.
+# A table whose key repeats (brands within categories) is rolled up over the key before use.
+# Complete tables only (not the store_insights_top_50 / product_insights_top_100 extracts)
+TABLES = {
+    'stores': ('revenue_by_store.csv', 'store_id'),
+    'regions': ('revenue_by_region.csv', 'region'),
+    'categories': ('revenue_by_category.csv', 'category'),
+    'subcategories': ('revenue_by_subcategory.csv', 'sub_category'),
+    'brands': ('revenue_by_brand.csv', 'brand'),
+    'products': ('revenue_by_sku.csv', 'product_id'),
+    'revenue_tree': ('revenue_tree_aggregates.csv', 'product_id'),
+}
+# name → dashboard JSON path of a {key: {measure: value}} section, key column
+DASHBOARD_TABLES = {
+    'segments': ('customer_metrics.segment_breakdown', 'segment'),
+}
+
+# Canonical column names, so tables written by different phases line up
+COLUMN_ALIASES = {
+    'store_region': 'region',
+    'transaction_count': 'transactions',
+    'total_quantity': 'quantity',
+    'units_sold': 'quantity',
+    'customers': 'unique_customers',
+}
+
+# entity → key column, words naming it (most specific entities first)
+ENTITIES = {
+    'sub_category': ('sub_category', ('subcategory', 'subcategories', 'sub category', 'sub categories')),
+    'segment': ('segment', ('segment', 'segments')),
+    'store': ('store_id', ('store', 'stores', 'outlet', 'outlets', 'location', 'locations')),
+    'region': ('region', ('region', 'regions', 'market', 'markets')),
+    'category': ('category', ('category', 'categories', 'department', 'departments')),
+    'brand': ('brand', ('brand', 'brands')),
+    'product': ('product_id', ('product', 'products', 'sku', 'skus', 'item', 'items')),
+}
+SINGULAR_WORDS = {'subcategory', 'sub category', 'segment', 'store', 'outlet', 'location', 'region', 'market',
+                  'category', 'department', 'brand', 'product', 'sku', 'item'}
+
+# measure → words naming it (first match in the question wins, longest phrases first)
+MEASURES = {
+    'avg_transaction_value': ('average transaction value', 'avg transaction value', 'transaction value', 'atv',
+                              'ticket size'),
+    'avg_basket_size': ('basket size', 'basket'),
+    'revenue_per_customer': ('revenue per customer', 'spend per customer'),
+    'yoy_growth_pct': ('growth', 'growing', 'yoy', 'year over year'),
+    'gross_margin_pct': ('margin', 'margins', 'profitability'),
+    'avg_discount_pct': ('discount', 'discounts', 'discounting'),
+    'avg_checkout_sec': ('checkout',),
+    'unique_customers': ('customers', 'customer count', 'shoppers'),
+    'transactions': ('transactions', 'footfall', 'traffic', 'orders', 'visits'),
+    'quantity': ('units', 'quantity', 'volume'),
+    'revenue': ('revenue', 'sales', 'turnover', 'performers', 'performing', 'performance'),
+}
+DEFAULT_MEASURE = 'revenue'
+# Additive measures roll up as sums, ratios are recomputed from the summed parts, distinct
+# counts are dropped (a customer of two rows is one customer); every other measure rolls up
+# as a revenue-weighted mean
+ADDITIVE_MEASURES = {'revenue', 'transactions', 'quantity', 'revenue_percentage'}
+RATIO_MEASURES = {'avg_transaction_value': ('revenue', 'transactions')}
+DISTINCT_MEASURES = {'unique_customers'}
+
+DESCENDING_WORDS = ('top', 'best', 'highest', 'largest', 'biggest', 'leading', 'most', 'strongest', 'fastest')
+ASCENDING_WORDS = ('bottom', 'worst', 'lowest', 'smallest', 'weakest', 'least', 'underperforming', 'slowest')
+# Directions the ranking cannot express (there is no trend measure to rank on)
+UNKNOWN_DIRECTION_WORDS = ('declining', 'decline', 'declined', 'shrinking', 'shrink', 'shrunk', 'falling', 'fell',
+                           'dropping', 'dropped', 'decreasing', 'decreased', 'contracting', 'slowing', 'losing',
+                           'worsening', 'deteriorating')
+# Periods and splits the tables are not broken down by (they cover the whole two years)
+UNSUPPORTED_QUALIFIERS = re.compile(
+    r"\b((19|20)\d{2}|fy\d{2}|q[1-4]|h[12]|quarters?|quarterly|months?|monthly|weeks?|weekly|daily|today|"
+    r"yesterday|ytd|mtd|year to date|(this|last|next|previous|prior|current|past) (year|month|week|quarter)|"
+    r"january|february|march|april|may|june|july|august|september|october|november|december|"
+    r"weekends?|weekdays?|holidays?)\b")
+# Questions asking for explanation or advice go to the full system
+OPEN_ENDED = re.compile(r"\b(why|should|recommend|improve|strategy|plan|how can|how do|what if|explain|driving|drivers?|"
+                        r"caus(e|es|ing)|behind|risks?)\b")
+DEFAULT_K = 5
+
+# (phrase, dashboard path, label); a dict-valued path is returned as a ranked breakdown
+METRICS = [
+    ('run rate', 'business_performance.total_revenue_2023', 'Annual revenue run rate (2023 revenue)'),
+    ('total revenue', 'business_performance.total_revenue_2_years', 'Total revenue (2 years)'),
+    ('revenue growth', 'growth_metrics.yoy_revenue_growth_pct', 'YoY revenue growth %'),
+    ('growth', 'growth_metrics.yoy_revenue_growth_pct', 'YoY revenue growth %'),
+    ('gross margin', 'profitability_indicators.gross_margin_pct', 'Gross margin %'),
+    ('margin', 'profitability_indicators.gross_margin_pct', 'Gross margin %'),
+    ('average transaction value', 'business_performance.avg_transaction_value', 'Average transaction value'),
+    ('atv', 'business_performance.avg_transaction_value', 'Average transaction value'),
+    ('how many stores', 'operational_metrics.total_stores', 'Stores'),
+    ('number of stores', 'operational_metrics.total_stores', 'Stores'),
+    ('how many customers', 'operational_metrics.total_customers', 'Customers'),
+    ('number of customers', 'operational_metrics.total_customers', 'Customers'),
+    ('how many products', 'operational_metrics.total_products', 'Products'),
+    ('retention', 'customer_metrics.customer_retention_rate_pct', 'Customer retention %'),
+    ('lifetime value', 'customer_metrics.customer_lifetime_value', 'Customer lifetime value'),
+    ('loyalty', 'customer_metrics.loyalty_program_usage_pct', 'Loyalty program usage %'),
+    ('promotion', 'profitability_indicators.promotional_revenue_pct', 'Promotional revenue %'),
+    ('promotional', 'profitability_indicators.promotional_revenue_pct', 'Promotional revenue %'),
+    ('discount', 'profitability_indicators.avg_discount_pct', 'Average discount %'),
+    ('checkout', 'operational_efficiency.avg_checkout_duration_sec', 'Average checkout time (sec)'),
+    ('delivery', 'channel_performance.delivery_method', 'Revenue by delivery method'),
+    ('payment', 'channel_performance.payment_method', 'Revenue by payment method'),
+    ('season', 'time_based_patterns.seasonal', 'Revenue by season'),
+    ('time slot', 'time_based_patterns.time_slot', 'Revenue by time slot'),
+    ('time of day', 'time_based_patterns.time_slot', 'Revenue by time slot'),
+]
+
+Intent = namedtuple('Intent', ['kind', 'entity', 'measure', 'descending', 'k', 'filters'])
+QueryPlan = namedtuple('QueryPlan', ['table', 'group_by', 'measure', 'filters', 'descending', 'k'])
+
+
+def _word_pattern(phrases):
+    alternatives = sorted((re.escape(p) for p in phrases), key=len, reverse=True)
+    return re.compile(r"(?<![a-z0-9_])(" + "|".join(alternatives) + r")(?![a-z0-9_])")
+
+
+def _normalize(question):
+    return " ".join(re.sub(r"[^a-z0-9_&%\-]+", " ", question.lower().replace('-', ' ')).split())
+
+
+ENTITY_PATTERNS = {name: _word_pattern(words) for name, (_, words) in ENTITIES.items()}
+MEASURE_PATTERNS = {name: _word_pattern(words) for name, words in MEASURES.items()}
+DESCENDING_PATTERN = _word_pattern(DESCENDING_WORDS)
+ASCENDING_PATTERN = _word_pattern(ASCENDING_WORDS)
+UNKNOWN_DIRECTION_PATTERN = _word_pattern(UNKNOWN_DIRECTION_WORDS)
+COUNT_PATTERN = re.compile(r"\b(?:top|bottom|best|worst|first|last)\s+(\d{1,3})\b")
+METRIC_PATTERNS = [(_word_pattern([phrase]), path, label) for phrase, path, label in METRICS]
+
+
+class AggregateTable:
+    """Columns as NumPy arrays, value → row positions per dimension, sort order per measure (lazy)"""
+
+    def __init__(self, name, frame, key):
+        frame = frame.rename(columns=COLUMN_ALIASES)
+        self.name = name
+        self.key = key
+        self.rows = len(frame)
+        # One row per key value; otherwise the key is only a column to roll up over
+        self.keyed = key in frame.columns and frame[key].is_unique
+        self.columns = {column: frame[column].to_numpy() for column in frame.columns}
+        self.dimensions = [c for c in frame.columns if not pd.api.types.is_numeric_dtype(frame[c])]
+        self.measures = [c for c in frame.columns if pd.api.types.is_numeric_dtype(frame[c])]
+        self.index = {}
+        for column in self.dimensions:
+            values = frame[column].astype(str).to_numpy()
+            uniques, inverse = np.unique(values, return_inverse=True)
+            order = np.argsort(inverse, kind='stable')
+            bounds = np.r_[0, np.cumsum(np.bincount(inverse, minlength=len(uniques)))]
+            self.index[column] = {value: order[bounds[i]:bounds[i + 1]] for i, value in enumerate(uniques)}
+        self._orders = {}
+
+    def order(self, measure):
+        """Row positions by measure, descending (stable, so ties keep file order)"""
+        if measure not in self._orders:
+            values = self.columns[measure].astype(np.float64)
+            self._orders[measure] = np.argsort(-np.nan_to_num(values, nan=-np.inf), kind='stable')
+        return self._orders[measure]
+
+    def mask(self, filters):
+        mask = np.ones(self.rows, dtype=bool)
+        for column, value in filters:
+            selected = np.zeros(self.rows, dtype=bool)
+            selected[self.index[column].get(value, [])] = True
+            mask &= selected
+        return mask
+
+    def rollup(self, key, measures, filters=()):
+        """Table keyed by `key` from this one (sums, recomputed ratios or revenue-weighted means; no distinct counts)"""
+        mask = self.mask(filters)
+        keys = self.columns[key][mask].astype(str)
+        uniques, inverse = np.unique(keys, return_inverse=True)
+        data = {key: uniques}
+        weights = self.columns['revenue'][mask].astype(np.float64) if 'revenue' in self.columns else None
+        for measure in measures:
+            if measure in DISTINCT_MEASURES:
+                continue
+            parts = RATIO_MEASURES.get(measure)
+            if parts and all(part in self.columns for part in parts):
+                numerator, denominator = (np.bincount(inverse, weights=self.columns[part][mask].astype(np.float64),
+                                                      minlength=len(uniques)) for part in parts)
+                data[measure] = numerator / denominator
+                continue
+            values = self.columns[measure][mask].astype(np.float64)
+            if measure in ADDITIVE_MEASURES or weights is None:
+                total = np.bincount(inverse, weights=values, minlength=len(uniques))
+                data[measure] = total if measure in ADDITIVE_MEASURES else \
+                    total / np.bincount(inverse, minlength=len(uniques))
+            else:
+                data[measure] = (np.bincount(inverse, weights=values * weights, minlength=len(uniques))
+                                 / np.bincount(inverse, weights=weights, minlength=len(uniques)))
+        # Dimensions that are constant within each key (e.g. a store's region) carry over
+        for column in self.dimensions:
+            if column == key or column in data:
+                continue
+            values = self.columns[column][mask].astype(str)
+            first = np.zeros(len(uniques), dtype=np.int64)
+            first[inverse[::-1]] = np.arange(len(inverse))[::-1]
+            if (values == values[first][inverse]).all():
+                data[column] = values[first]
+        return AggregateTable(f"{self.name}→{key}", pd.DataFrame(data), key)
+
+
+class AggregateQueries:
+
+    def __init__(self, directory=METADATA_CEO_DIR, kpi_dir=KPI_DIR):
+        self.directory = Path(directory)
+        self.kpi_dir = Path(kpi_dir)
+        self.tables = {}
+        self.dashboard = {}
+        self._signatures = {}
+        self._rollups = {}
+        self.refresh()
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    def _sources(self):
+        sources = {name: (self.directory / file, key) for name, (file, key) in TABLES.items()}
+        # kpi_<name>.csv tables, keyed on their first column
+        for path in sorted(self.kpi_dir.glob('kpi_*.csv')):
+            sources[path.stem] = (path, None)
+        return sources
+
+    def refresh(self):
+        """(Re)load every table whose file changed since the last load; returns the names reloaded"""
+        reloaded = []
+        dashboard_path = self.directory / DASHBOARD_FILE
+        sources = dict(self._sources(), dashboard=(dashboard_path, None))
+        for name, (path, key) in sources.items():
+            if not path.exists():
+                continue
+            stat = path.stat()
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if self._signatures.get(name) == signature:
+                continue
+            try:
+                if name == 'dashboard':
+                    self._load_dashboard(path)
+                else:
+                    frame = pd.read_csv(path)
+                    self.tables[name] = AggregateTable(name, frame, key or frame.columns[0])
+            except (ValueError, KeyError, IndexError) as exc:
+                print(f"  ⚠️  Skipping {path.name}: {exc}")
+                continue
+            self._signatures[name] = signature
+            reloaded.append(name)
+        if reloaded:
+            self._rollups.clear()
+            self._build_value_index()
+        return reloaded
+
+    def _load_dashboard(self, path):
+        with open(path) as f:
+            self.dashboard = json.load(f)
+        for name, (section, key) in DASHBOARD_TABLES.items():
+            records = self.metric(section)
+            if isinstance(records, dict):
+                frame = pd.DataFrame.from_dict(records, orient='index').rename_axis(key).reset_index()
+                self.tables[name] = AggregateTable(name, frame, key)
+
+    def _build_value_index(self):
+        """lower-cased dimension value → (column, value), over every table"""
+        self.values = {}
+        for table in self.tables.values():
+            for column, index in table.index.items():
+                for value in index:
+                    self.values.setdefault(value.lower(), (column, value))
+        self._value_pattern = _word_pattern(self.values) if self.values else None
+
+    def metric(self, path):
+        node = self.dashboard
+        for part in path.split('.'):
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+
+    # ------------------------------------------------------------------
+    # Question → Intent
+    # ------------------------------------------------------------------
+    def parse(self, question):
+        """Intent for a numeric lookup question, or None when it needs the full system"""
+        text = _normalize(question)
+        if OPEN_ENDED.search(text):
+            return None
+
+        filters = []
+        if self._value_pattern is not None:
+            for match in self._value_pattern.finditer(text):
+                filters.append(self.values[match.group(1)])
+        filter_text = self._value_pattern.sub(' ', text) if self._value_pattern is not None else text
+        if UNSUPPORTED_QUALIFIERS.search(filter_text) or UNKNOWN_DIRECTION_PATTERN.search(filter_text):
+            return None
+
+        # The entity asked about is the first one named; one that only qualifies a named value
+        # ("the East region") yields to any other
+        named_columns = {column for column, _ in filters}
+        found = []
+        for name, pattern in ENTITY_PATTERNS.items():
+            match = pattern.search(filter_text)
+            if match:
+                found.append((ENTITIES[name][0] in named_columns, match.start(), name, match.group(1)))
+        entity = entity_word = None
+        if found:
+            _, _, entity, entity_word = min(found)
+        else:
+            # A bare id ("How is STR_000023 doing?") names its entity
+            for name, (key, _) in ENTITIES.items():
+                if key in named_columns:
+                    entity = name
+                    break
+
+        measure = next((name for name, pattern in MEASURE_PATTERNS.items() if pattern.search(filter_text)), None)
+
+        descending = None
+        if ASCENDING_PATTERN.search(filter_text):
+            descending = False
+        elif DESCENDING_PATTERN.search(filter_text):
+            descending = True
+        count = COUNT_PATTERN.search(filter_text)
+
+        if entity is not None:
+            key = ENTITIES[entity][0]
+            named = [value for column, value in filters if column == key]
+            filters = [(column, value) for column, value in filters if column != key]
+            if named:
+                return Intent('lookup', entity, measure or DEFAULT_MEASURE, True, len(named),
+                              tuple(filters) + tuple((key, value) for value in named))
+            if descending is not None:
+                k = int(count.group(1)) if count else (1 if entity_word in SINGULAR_WORDS else DEFAULT_K)
+                return Intent('rank', entity, measure or DEFAULT_MEASURE, descending, k, tuple(filters))
+            if entity_word and re.search(rf"\b(by|per|each|every|across)\s+{re.escape(entity_word)}\b", filter_text):
+                return Intent('breakdown', entity, measure or DEFAULT_MEASURE, True, None, tuple(filters))
+            return None
+
+        # Company-wide metrics have no breakdown to apply a named value to
+        if filters:
+            return None
+        for pattern, path, label in METRIC_PATTERNS:
+            if pattern.search(text) and self.metric(path) is not None:
+                return Intent('metric', None, path, True, None, ())
+        return None
+
+    # ------------------------------------------------------------------
+    # Intent → QueryPlan → rows
+    # ------------------------------------------------------------------
+    def plan(self, intent):
+        """Cheapest table answering the intent: keyed by the entity if possible, else a rollup"""
+        key = ENTITIES[intent.entity][0]
+        filter_columns = {column for column, _ in intent.filters if column != key}
+        for name, table in self.tables.items():
+            if (table.key == key and table.keyed and intent.measure in table.columns
+                    and filter_columns <= set(table.columns)):
+                return QueryPlan(name, None, intent.measure, intent.filters, intent.descending, intent.k)
+        if intent.measure in DISTINCT_MEASURES:
+            return None
+        for name, table in self.tables.items():
+            if key in table.columns and intent.measure in table.columns and filter_columns <= set(table.columns):
+                return QueryPlan(name, key, intent.measure, intent.filters, intent.descending, intent.k)
+        return None
+
+    def _rollup(self, plan):
+        group_filters = tuple(sorted((c, v) for c, v in plan.filters if c != plan.group_by))
+        cache_key = (plan.table, plan.group_by, group_filters)
+        if cache_key not in self._rollups:
+            table = self.tables[plan.table]
+            measures = [m for m in table.measures if m != plan.group_by]
+            self._rollups[cache_key] = table.rollup(plan.group_by, measures, group_filters)
+        return self._rollups[cache_key], tuple((c, v) for c, v in plan.filters if c == plan.group_by)
+
+    def execute(self, plan):
+        table, filters = (self.tables[plan.table], plan.filters) if plan.group_by is None else self._rollup(plan)
+        order = table.order(plan.measure)
+        selected = order[table.mask(filters)[order]]
+        if not plan.descending:
+            selected = selected[::-1]
+        if plan.k is not None:
+            selected = selected[:plan.k]
+        return [{column: (values[row].item() if hasattr(values[row], 'item') else values[row])
+                 for column, values in table.columns.items()} for row in selected]
+
+    def ask(self, question):
+        """Structured answer {'intent', 'plan', 'rows' | 'value', 'seconds'}, or None"""
+        start = time.perf_counter()
+        intent = self.parse(question)
+        if intent is None:
+            return None
+        if intent.kind == 'metric':
+            value = self.metric(intent.measure)
+            label = next(label for _, path, label in METRICS if path == intent.measure)
+            if isinstance(value, dict):
+                value = dict(sorted(value.items(), key=lambda item: -item[1] if isinstance(item[1], (int, float)) else 0))
+            return {'intent': intent, 'plan': None, 'label': label, 'value': value,
+                    'seconds': time.perf_counter() - start}
+        plan = self.plan(intent)
+        if plan is None:
+            return None
+        rows = self.execute(plan)
+        if not rows:
+            return None
+        return {'intent': intent, 'plan': plan, 'rows': rows, 'seconds': time.perf_counter() - start}
+
+
+
+def _format_value(measure, value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return "n/a"
+    if measure.endswith('_pct') or measure.endswith('percentage'):
+        return f"{value:.1f}%"
+    if measure.endswith('_sec'):
+        return f"{value:,.0f} sec"
+    if measure in ('revenue', 'avg_transaction_value', 'revenue_per_customer', 'revenue_per_transaction') \
+            or 'revenue' in measure:
+        return f"${value:,.2f}"
+    if isinstance(value, float) and not value.is_integer():
+        return f"{value:,.2f}"
+    return f"{value:,.0f}"
+
+
+def format_result(result):
+    """Plain-text answer for a result of AggregateQueries.ask()"""
+    intent = result['intent']
+    if intent.kind == 'metric':
+        value = result['value']
+        if isinstance(value, dict):
+            lines = [f"{result['label']}:"]
+            lines += [f"  {i}. {name}: {_format_value('revenue', v)}" for i, (name, v) in enumerate(value.items(), 1)]
+            return "\n".join(lines)
+        return f"{result['label']}: {_format_value(intent.measure.split('.')[-1], value)}"
+
+    plan = result['plan']
+    key = ENTITIES[intent.entity][0]
+    filters = [f"{column} = {value}" for column, value in plan.filters if column != key]
+    where = f" ({', '.join(filters)})" if filters else ""
+    measure_name = plan.measure.replace('_', ' ')
+    if intent.kind == 'rank':
+        direction = "Top" if plan.descending else "Bottom"
+        header = f"{direction} {len(result['rows'])} {intent.entity.replace('_', ' ')}(s) by {measure_name}{where}:"
+    elif intent.kind == 'breakdown':
+        header = f"{measure_name.capitalize()} by {intent.entity.replace('_', ' ')}{where}:"
+    else:
+        header = f"{intent.entity.replace('_', ' ').capitalize()} {measure_name}{where}:"
+    lines = [header]
+    extra = ['revenue', 'yoy_growth_pct', 'revenue_percentage']
+    for i, row in enumerate(result['rows'], 1):
+        label = str(row[key])
+        details = [str(row[c]) for c in ('product_name', 'region', 'store_type', 'category')
+                   if c in row and c != key and c not in {col for col, _ in plan.filters}]
+        if details:
+            label += f" ({', '.join(details)})"
+        shown = [f"{measure_name} {_format_value(plan.measure, row[plan.measure])}"]
+        shown += [f"{c.replace('_', ' ')} {_format_value(c, row[c])}" for c in extra
+                  if c != plan.measure and c in row]
+        lines.append(f"  {i}. {label} — " + ", ".join(shown))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python3 aggregate_query.py \"Which stores are our top performers?\"")
+        sys.exit(1)
+    queries = AggregateQueries()
+    question = " ".join(sys.argv[1:])
+    result = queries.ask(question)
+    if result is None:
+        print("Not a structured lookup question (needs the full store manager system)")
+        sys.exit(0)
+    print(f"Intent: {result['intent']}")
+    print(f"Plan:   {result['plan']}")
+    print(f"({result['seconds'] * 1e6:,.0f} µs)\n")
+    print(format_result(result))
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Answer Cache
+Persistent LRU cache of store-manager answers keyed on the normalized question plus the
+content hash of the metadata_ceo artifacts the answers are computed from
+
+    cache = AnswerCache()
+    version = artifact_version()                 # hash of revenue tree + dashboard outputs
+    answer = cache.get(question, version)
+    if answer is None:
+        answer = system.ask(question)
+        cache.put(question, version, answer)
+
+Invalidation is automatic: when build_revenue_tree / create_ceo_dashboard regenerate their
+outputs the version changes, so old entries stop matching and are dropped on the next put.
+Eviction is least-recently-used, bounded by entry count and total answer size. New entries
+are written to disk at most every save_interval seconds, by the next put or by a timer when no
+put follows (and by save(), e.g. on shutdown), so a burst of misses does not rewrite the whole
+file per answer, yet every answer reaches disk within save_interval.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from dataset_store import BASE_DIR, METADATA_CEO_DIR
+from run_pipeline import PHASES
+
+CACHE_PATH = BASE_DIR / "claude" / ".answer_cache" / "answers.json"
+DEPENDENCY_PHASES = ('build_revenue_tree', 'create_ceo_dashboard')
+DEPENDENCIES = [name for phase in DEPENDENCY_PHASES for name in PHASES[phase]['outputs']]
+
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+DEFAULT_SAVE_INTERVAL = 30.0
+
+_HASHES = {}
+
+
+def normalize_question(question):
+    """Case, punctuation and whitespace-insensitive form: "What's our revenue run rate?" → "what s our revenue run rate" """
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", question.lower()).split())
+
+
+def _file_hash(path):
+    # Re-hashed only when size or mtime changes
+    stat = path.stat()
+    signature = (stat.st_size, stat.st_mtime_ns)
+    cached = _HASHES.get(path)
+    if cached is None or cached[0] != signature:
+        cached = (signature, hashlib.sha256(path.read_bytes()).hexdigest())
+        _HASHES[path] = cached
+    return cached[1]
+
+
+def artifact_version(names=DEPENDENCIES, directory=METADATA_CEO_DIR):
+    """One hash over the content of the dependency artifacts (missing files count as absent)"""
+    digest = hashlib.sha256()
+    for name in sorted(names):
+        path = Path(directory) / name
+        digest.update(f"{name}:{_file_hash(path) if path.exists() else None}\n".encode())
+    return digest.hexdigest()
+
+
+class AnswerCache:
+
+    def __init__(self, path=CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES,
+                 save_interval=DEFAULT_SAVE_INTERVAL):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.save_interval = save_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key → {'question', 'version', 'answer'}, least recently used first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._saved_at = time.monotonic()
+        self._timer = None
+        if self.path.exists():
+            with open(self.path) as f:
+                for key, entry in json.load(f).items():
+                    self._entries[key] = entry
+                    self._bytes += len(entry['answer'])
+            self._evict()
+
+    @staticmethod
+    def key(question, version):
+        return hashlib.sha256(f"{normalize_question(question)}\n{version}".encode('utf-8')).hexdigest()
+
+    def get(self, question, version):
+        key = self.key(question, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry['answer']
+
+    def put(self, question, version, answer):
+        if not isinstance(answer, str):
+            answer = str(answer)
+        key = self.key(question, version)
+        with self._lock:
+            # Entries for any other artifact version can never be hit again
+            for stale in [k for k, entry in self._entries.items() if entry['version'] != version]:
+                self._bytes -= len(self._entries.pop(stale)['answer'])
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key)['answer'])
+            self._entries[key] = {'question': question, 'version': version, 'answer': answer}
+            self._bytes += len(answer)
+            self._evict()
+            elapsed = time.monotonic() - self._saved_at
+            if elapsed >= self.save_interval:
+                self._save()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.save_interval - elapsed, self.save)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= len(entry['answer'])
+
+    def _save(self):
+        # Write-then-rename so a crash never leaves a truncated cache behind
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+        self._saved_at = time.monotonic()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def save(self):
+        """Persist every entry and the current recency order (call before exiting)"""
+        with self._lock:
+            self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._save()
+
+    def stats(self):
+        return {'entries': len(self._entries), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses}
+
+    def __len__(self):
+        return len(self._entries)
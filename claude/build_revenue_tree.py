@@ -2,27 +2,89 @@
 """
 Phase 1.2A: Build Revenue Analysis Tree
 Hierarchical breakdown: Total → Region → Store → Category → Sub-Category → Brand → SKU
+
+Usage: python3 build_revenue_tree.py [--json-tree]
 """
 
-import pandas as pd
 import json
-from collections import defaultdict
-
-def build_revenue_tree():
+import sys
+
+from dataset_store import iter_chunks
+from streaming_aggregation import StreamingAggregator
+
+TREE_KEYS = ['store_region', 'store_id', 'category', 'sub_category', 'brand', 'product_id']
+AGGREGATES_PATH = '/Users/arghya.mukherjee/Downloads/cursor/sd ceo/claude/metadata_ceo/revenue_tree_aggregates.csv'
+
+# Dataset columns the revenue aggregates read
+REVENUE_COLUMNS = [
+    'transaction_id', 'store_region', 'store_id', 'store_type', 'category',
+    'sub_category', 'brand', 'product_id', 'product_name', 'quantity',
+    'total_amount', 'customer_id'
+]
+
+# Keys of the per-level CSV exports (file suffix → group keys)
+CSV_LEVELS = {
+    'region': ['store_region'],
+    'store': ['store_id', 'store_region', 'store_type'],
+    'category': ['category'],
+    'subcategory': ['category', 'sub_category'],
+    'brand': ['category', 'brand'],
+    'sku': ['product_id', 'product_name', 'category', 'sub_category', 'brand'],
+}
+
+def declare_revenue_aggregates(engine):
+    """Leaf table, store types and the six CSV levels, all filled by one streaming pass"""
+    engine.add('totals', [], revenue=('total_amount', 'sum'), transactions=('total_amount', 'size'))
+    engine.add('leaves', TREE_KEYS + ['product_name'],
+               revenue=('total_amount', 'sum'),
+               transaction_count=('total_amount', 'size'),
+               quantity=('quantity', 'sum'))
+    engine.add('store_types', ['store_id'], store_type=('store_type', 'first'))
+    for level, keys in CSV_LEVELS.items():
+        engine.add(level, keys,
+                   revenue=('total_amount', 'sum'),
+                   transaction_count=('transaction_id', 'count'),
+                   unique_customers=('customer_id', 'nunique'),
+                   total_quantity=('quantity', 'sum'))
+    return engine
+
+def aggregate_revenue_leaves(engine):
+    """SKU-level revenue, transactions and units for every Region → ... → SKU path, sorted by revenue"""
+    leaves = engine.result('leaves').reset_index()
+    return leaves.sort_values('revenue', ascending=False, kind='mergesort', ignore_index=True)
+
+def rollup_revenue_level(leaves, depth):
+    """Roll the leaf table up to the first `depth` hierarchy keys, sorted by revenue"""
+    level = leaves.groupby(TREE_KEYS[:depth], observed=True, sort=False)[
+        ['revenue', 'transaction_count', 'quantity']
+    ].sum().reset_index()
+    return level.sort_values('revenue', ascending=False, kind='mergesort', ignore_index=True)
+
+def _key_tuples(level, depth):
+    return zip(*(level[key].tolist() for key in TREE_KEYS[:depth]))
+
+def build_revenue_tree(write_json_tree=False, engine=None):
+    """
+    Build the tree and CSV exports by streaming the dataset, or from an engine already fed through
+    declare_revenue_aggregates (e.g. merged partial states, see incremental_aggregates.py)
+    """
     print("=" * 80)
     print("PHASE 1.2A: BUILDING REVENUE ANALYSIS TREE")
     print("=" * 80)
     print()
 
-    # Load dataset
-    print("Loading dataset...")
-    df = pd.read_csv('/Users/arghya.mukherjee/Downloads/cursor/sd ceo/grocery_dataset.csv')
-    print(f"✓ Loaded {len(df):,} rows")
+    if engine is None:
+        # Stream the dataset once; only per-group partial aggregates stay in memory
+        print("Streaming dataset...")
+        engine = declare_revenue_aggregates(StreamingAggregator())
+        engine.consume(iter_chunks(columns=REVENUE_COLUMNS))
+    print(f"✓ Aggregated {engine.rows:,} rows")
     print()
 
     # Calculate total revenue
-    total_revenue = df['total_amount'].sum()
-    total_transactions = len(df)
+    totals = engine.result('totals')
+    total_revenue = totals['revenue']
+    total_transactions = int(totals['transactions'])
 
     print(f"Total Revenue: ${total_revenue:,.2f}")
     print(f"Total Transactions: {total_transactions:,}")
@@ -38,26 +100,23 @@ def build_revenue_tree():
         "breakdown": {}
     }
 
+    # One groupby over all six hierarchy keys; every other level is a rollup of it
+    leaves = aggregate_revenue_leaves(engine)
+    store_types = engine.result('store_types')['store_type']
+    levels = [rollup_revenue_level(leaves, depth) for depth in range(1, len(TREE_KEYS))]
+    regions, stores, categories, subcategories, brands = levels
+
     # LEVEL 1: By Region
     print("\n" + "=" * 80)
     print("LEVEL 1: REVENUE BY REGION")
     print("=" * 80)
 
-    region_data = df.groupby('store_region').agg({
-        'total_amount': 'sum',
-        'transaction_id': 'count'
-    }).sort_values('total_amount', ascending=False)
-
-    for region in region_data.index:
-        region_df = df[df['store_region'] == region]
-        rev = region_data.loc[region, 'total_amount']
-        txn_count = region_data.loc[region, 'transaction_id']
+    region_nodes = {}
+    for region, rev, txn_count in zip(regions['store_region'].tolist(), regions['revenue'].to_numpy(),
+                                      regions['transaction_count'].to_numpy()):
         pct = (rev / total_revenue) * 100
         avg_txn = rev / txn_count
-
-        print(f"{region:15s}: ${rev:15,.2f} ({pct:5.2f}%) | {txn_count:,} txns | Avg: ${avg_txn:.2f}")
-
-        tree["breakdown"][region] = {
+        node = {
             "revenue": float(rev),
             "revenue_formatted": f"${rev:,.2f}",
             "percentage_of_total": float(pct),
@@ -65,136 +124,116 @@ def build_revenue_tree():
             "avg_transaction_value": float(avg_txn),
             "stores": {}
         }
+        tree["breakdown"][region] = node
+        region_nodes[region] = node
+
+    # LEVEL 2: By Store (within region)
+    store_nodes = {}
+    for region, store_id, store_rev, store_txn in zip(stores['store_region'].tolist(), stores['store_id'].tolist(),
+                                                      stores['revenue'].to_numpy(),
+                                                      stores['transaction_count'].to_numpy()):
+        parent = region_nodes[region]
+        node = {
+            "revenue": float(store_rev),
+            "revenue_formatted": f"${store_rev:,.2f}",
+            "percentage_of_region": float((store_rev / parent["revenue"]) * 100),
+            "percentage_of_total": float((store_rev / total_revenue) * 100),
+            "transaction_count": int(store_txn),
+            "avg_transaction_value": float(store_rev / store_txn),
+            "store_type": store_types[store_id],
+            "categories": {}
+        }
+        parent["stores"][store_id] = node
+        store_nodes[(region, store_id)] = node
+
+    # LEVEL 3: By Category (within store)
+    category_nodes = {}
+    for key, cat_rev in zip(_key_tuples(categories, 3), categories['revenue'].to_numpy()):
+        parent = store_nodes[key[:-1]]
+        node = {
+            "revenue": float(cat_rev),
+            "revenue_formatted": f"${cat_rev:,.2f}",
+            "percentage_of_store": float((cat_rev / parent["revenue"]) * 100),
+            "percentage_of_total": float((cat_rev / total_revenue) * 100),
+            "subcategories": {}
+        }
+        parent["categories"][key[-1]] = node
+        category_nodes[key] = node
+
+    # LEVEL 4: By Sub-Category (within category)
+    subcategory_nodes = {}
+    for key, subcat_rev in zip(_key_tuples(subcategories, 4), subcategories['revenue'].to_numpy()):
+        parent = category_nodes[key[:-1]]
+        node = {
+            "revenue": float(subcat_rev),
+            "revenue_formatted": f"${subcat_rev:,.2f}",
+            "percentage_of_category": float((subcat_rev / parent["revenue"]) * 100),
+            "percentage_of_total": float((subcat_rev / total_revenue) * 100),
+            "brands": {}
+        }
+        parent["subcategories"][key[-1]] = node
+        subcategory_nodes[key] = node
+
+    # LEVEL 5: By Brand (within sub-category)
+    brand_nodes = {}
+    for key, brand_rev in zip(_key_tuples(brands, 5), brands['revenue'].to_numpy()):
+        parent = subcategory_nodes[key[:-1]]
+        node = {
+            "revenue": float(brand_rev),
+            "revenue_formatted": f"${brand_rev:,.2f}",
+            "percentage_of_subcategory": float((brand_rev / parent["revenue"]) * 100),
+            "percentage_of_total": float((brand_rev / total_revenue) * 100),
+            "products": {}
+        }
+        parent["brands"][key[-1]] = node
+        brand_nodes[key] = node
+
+    # LEVEL 6: By Product/SKU (within brand)
+    for key, prod_name, prod_rev, prod_qty in zip(_key_tuples(leaves, 6), leaves['product_name'].tolist(),
+                                                  leaves['revenue'].to_numpy(), leaves['quantity'].to_numpy()):
+        parent = brand_nodes[key[:-1]]
+        parent["products"][key[-1]] = {
+            "product_name": prod_name,
+            "revenue": float(prod_rev),
+            "revenue_formatted": f"${prod_rev:,.2f}",
+            "percentage_of_brand": float((prod_rev / parent["revenue"]) * 100),
+            "percentage_of_total": float((prod_rev / total_revenue) * 100),
+            "quantity_sold": int(prod_qty)
+        }
 
-        # LEVEL 2: By Store (within region)
+    for region, region_node in tree["breakdown"].items():
+        print(f"{region:15s}: ${region_node['revenue']:15,.2f} ({region_node['percentage_of_total']:5.2f}%) | "
+              f"{region_node['transaction_count']:,} txns | Avg: ${region_node['avg_transaction_value']:.2f}")
         print(f"\n  LEVEL 2: Stores in {region}")
-        store_data = region_df.groupby('store_id').agg({
-            'total_amount': 'sum',
-            'transaction_id': 'count',
-            'store_type': 'first'
-        }).sort_values('total_amount', ascending=False)
-
-        for store_id in store_data.index:
-            store_df = region_df[region_df['store_id'] == store_id]
-            store_rev = store_data.loc[store_id, 'total_amount']
-            store_txn = store_data.loc[store_id, 'transaction_id']
-            store_type = store_data.loc[store_id, 'store_type']
-            store_pct = (store_rev / rev) * 100
-            store_avg = store_rev / store_txn
-
-            print(f"    {store_id:12s} ({store_type:12s}): ${store_rev:13,.2f} ({store_pct:5.2f}% of region)")
-
-            tree["breakdown"][region]["stores"][store_id] = {
-                "revenue": float(store_rev),
-                "revenue_formatted": f"${store_rev:,.2f}",
-                "percentage_of_region": float(store_pct),
-                "percentage_of_total": float((store_rev / total_revenue) * 100),
-                "transaction_count": int(store_txn),
-                "avg_transaction_value": float(store_avg),
-                "store_type": store_type,
-                "categories": {}
-            }
-
-            # LEVEL 3: By Category (within store)
-            category_data = store_df.groupby('category').agg({
-                'total_amount': 'sum',
-                'transaction_id': 'count'
-            }).sort_values('total_amount', ascending=False)
-
-            for category in category_data.index:
-                cat_df = store_df[store_df['category'] == category]
-                cat_rev = category_data.loc[category, 'total_amount']
-                cat_pct = (cat_rev / store_rev) * 100
-
-                tree["breakdown"][region]["stores"][store_id]["categories"][category] = {
-                    "revenue": float(cat_rev),
-                    "revenue_formatted": f"${cat_rev:,.2f}",
-                    "percentage_of_store": float(cat_pct),
-                    "percentage_of_total": float((cat_rev / total_revenue) * 100),
-                    "subcategories": {}
-                }
-
-                # LEVEL 4: By Sub-Category (within category)
-                subcat_data = cat_df.groupby('sub_category').agg({
-                    'total_amount': 'sum',
-                    'transaction_id': 'count'
-                }).sort_values('total_amount', ascending=False)
-
-                for subcat in subcat_data.index:
-                    subcat_df = cat_df[cat_df['sub_category'] == subcat]
-                    subcat_rev = subcat_data.loc[subcat, 'total_amount']
-                    subcat_pct = (subcat_rev / cat_rev) * 100
-
-                    tree["breakdown"][region]["stores"][store_id]["categories"][category]["subcategories"][subcat] = {
-                        "revenue": float(subcat_rev),
-                        "revenue_formatted": f"${subcat_rev:,.2f}",
-                        "percentage_of_category": float(subcat_pct),
-                        "percentage_of_total": float((subcat_rev / total_revenue) * 100),
-                        "brands": {}
-                    }
-
-                    # LEVEL 5: By Brand (within sub-category)
-                    brand_data = subcat_df.groupby('brand').agg({
-                        'total_amount': 'sum',
-                        'transaction_id': 'count'
-                    }).sort_values('total_amount', ascending=False)
-
-                    for brand in brand_data.index:
-                        brand_df = subcat_df[subcat_df['brand'] == brand]
-                        brand_rev = brand_data.loc[brand, 'total_amount']
-                        brand_pct = (brand_rev / subcat_rev) * 100
-
-                        tree["breakdown"][region]["stores"][store_id]["categories"][category]["subcategories"][subcat]["brands"][brand] = {
-                            "revenue": float(brand_rev),
-                            "revenue_formatted": f"${brand_rev:,.2f}",
-                            "percentage_of_subcategory": float(brand_pct),
-                            "percentage_of_total": float((brand_rev / total_revenue) * 100),
-                            "products": {}
-                        }
-
-                        # LEVEL 6: By Product/SKU (within brand)
-                        product_data = brand_df.groupby(['product_id', 'product_name']).agg({
-                            'total_amount': 'sum',
-                            'transaction_id': 'count',
-                            'quantity': 'sum'
-                        }).sort_values('total_amount', ascending=False)
-
-                        for (prod_id, prod_name), row in product_data.iterrows():
-                            prod_rev = row['total_amount']
-                            prod_qty = row['quantity']
-                            prod_pct = (prod_rev / brand_rev) * 100
-
-                            tree["breakdown"][region]["stores"][store_id]["categories"][category]["subcategories"][subcat]["brands"][brand]["products"][prod_id] = {
-                                "product_name": prod_name,
-                                "revenue": float(prod_rev),
-                                "revenue_formatted": f"${prod_rev:,.2f}",
-                                "percentage_of_brand": float(prod_pct),
-                                "percentage_of_total": float((prod_rev / total_revenue) * 100),
-                                "quantity_sold": int(prod_qty)
-                            }
-
+        for store_id, store_node in region_node["stores"].items():
+            print(f"    {store_id:12s} ({store_node['store_type']:12s}): ${store_node['revenue']:13,.2f} "
+                  f"({store_node['percentage_of_region']:5.2f}% of region)")
         print()
 
-    # Save JSON tree
+    # Save compact aggregate table (backs the drill-down service in revenue_drilldown.py)
     print("=" * 80)
     print("SAVING REVENUE ANALYSIS TREE")
     print("=" * 80)
 
-    json_path = '/Users/arghya.mukherjee/Downloads/cursor/sd ceo/claude/metadata_ceo/analysis_tree_total_revenue.json'
-    with open(json_path, 'w') as f:
-        json.dump(tree, f, indent=2)
-    print(f"✓ JSON tree saved to: {json_path}")
+    aggregates = leaves[TREE_KEYS[:2]].copy()
+    aggregates['store_type'] = store_types.reindex(leaves['store_id']).to_numpy()
+    for column in TREE_KEYS[2:] + ['product_name', 'revenue', 'transaction_count', 'quantity']:
+        aggregates[column] = leaves[column]
+    aggregates.to_csv(AGGREGATES_PATH, index=False)
+    print(f"✓ Aggregate table saved to: {AGGREGATES_PATH} ({len(aggregates):,} rows)")
+
+    # The fully nested JSON is large and slow to load; only written on request
+    if write_json_tree:
+        json_path = '/Users/arghya.mukherjee/Downloads/cursor/sd ceo/claude/metadata_ceo/analysis_tree_total_revenue.json'
+        with open(json_path, 'w') as f:
+            json.dump(tree, f, indent=2)
+        print(f"✓ JSON tree saved to: {json_path}")
 
     # Create CSV exports at each level
     print("\nCreating CSV exports...")
 
     # Revenue by Region
-    region_csv = df.groupby('store_region').agg({
-        'total_amount': 'sum',
-        'transaction_id': 'count',
-        'customer_id': 'nunique',
-        'quantity': 'sum'
-    }).reset_index()
+    region_csv = engine.result('region').reset_index()
     region_csv.columns = ['region', 'revenue', 'transaction_count', 'unique_customers', 'total_quantity']
     region_csv['revenue_percentage'] = (region_csv['revenue'] / total_revenue * 100).round(2)
     region_csv['avg_transaction_value'] = (region_csv['revenue'] / region_csv['transaction_count']).round(2)
@@ -203,12 +242,7 @@ def build_revenue_tree():
     print("✓ revenue_by_region.csv")
 
     # Revenue by Store
-    store_csv = df.groupby(['store_id', 'store_region', 'store_type']).agg({
-        'total_amount': 'sum',
-        'transaction_id': 'count',
-        'customer_id': 'nunique',
-        'quantity': 'sum'
-    }).reset_index()
+    store_csv = engine.result('store').reset_index()
     store_csv.columns = ['store_id', 'region', 'store_type', 'revenue', 'transaction_count', 'unique_customers', 'total_quantity']
     store_csv['revenue_percentage'] = (store_csv['revenue'] / total_revenue * 100).round(2)
     store_csv['avg_transaction_value'] = (store_csv['revenue'] / store_csv['transaction_count']).round(2)
@@ -217,12 +251,7 @@ def build_revenue_tree():
     print("✓ revenue_by_store.csv")
 
     # Revenue by Category
-    category_csv = df.groupby('category').agg({
-        'total_amount': 'sum',
-        'transaction_id': 'count',
-        'customer_id': 'nunique',
-        'quantity': 'sum'
-    }).reset_index()
+    category_csv = engine.result('category').reset_index()
     category_csv.columns = ['category', 'revenue', 'transaction_count', 'unique_customers', 'total_quantity']
     category_csv['revenue_percentage'] = (category_csv['revenue'] / total_revenue * 100).round(2)
     category_csv['avg_transaction_value'] = (category_csv['revenue'] / category_csv['transaction_count']).round(2)
@@ -231,12 +260,7 @@ def build_revenue_tree():
     print("✓ revenue_by_category.csv")
 
     # Revenue by Sub-Category
-    subcat_csv = df.groupby(['category', 'sub_category']).agg({
-        'total_amount': 'sum',
-        'transaction_id': 'count',
-        'customer_id': 'nunique',
-        'quantity': 'sum'
-    }).reset_index()
+    subcat_csv = engine.result('subcategory').reset_index()
     subcat_csv.columns = ['category', 'sub_category', 'revenue', 'transaction_count', 'unique_customers', 'total_quantity']
     subcat_csv['revenue_percentage'] = (subcat_csv['revenue'] / total_revenue * 100).round(2)
     subcat_csv['avg_transaction_value'] = (subcat_csv['revenue'] / subcat_csv['transaction_count']).round(2)
@@ -245,12 +269,7 @@ def build_revenue_tree():
     print("✓ revenue_by_subcategory.csv")
 
     # Revenue by Brand
-    brand_csv = df.groupby(['category', 'brand']).agg({
-        'total_amount': 'sum',
-        'transaction_id': 'count',
-        'customer_id': 'nunique',
-        'quantity': 'sum'
-    }).reset_index()
+    brand_csv = engine.result('brand').reset_index()
     brand_csv.columns = ['category', 'brand', 'revenue', 'transaction_count', 'unique_customers', 'total_quantity']
     brand_csv['revenue_percentage'] = (brand_csv['revenue'] / total_revenue * 100).round(2)
     brand_csv['avg_transaction_value'] = (brand_csv['revenue'] / brand_csv['transaction_count']).round(2)
@@ -259,12 +278,7 @@ def build_revenue_tree():
     print("✓ revenue_by_brand.csv")
 
     # Revenue by SKU/Product
-    sku_csv = df.groupby(['product_id', 'product_name', 'category', 'sub_category', 'brand']).agg({
-        'total_amount': 'sum',
-        'transaction_id': 'count',
-        'customer_id': 'nunique',
-        'quantity': 'sum'
-    }).reset_index()
+    sku_csv = engine.result('sku').reset_index()
     sku_csv.columns = ['product_id', 'product_name', 'category', 'sub_category', 'brand', 'revenue', 'transaction_count', 'unique_customers', 'total_quantity']
     sku_csv['revenue_percentage'] = (sku_csv['revenue'] / total_revenue * 100).round(2)
     sku_csv['avg_transaction_value'] = (sku_csv['revenue'] / sku_csv['transaction_count']).round(2)
@@ -278,9 +292,9 @@ def build_revenue_tree():
     print("=" * 80)
     print(f"Total Revenue Validated: ${total_revenue:,.2f}")
     print(f"Hierarchy Levels: 6 (Total → Region → Store → Category → Sub-Category → Brand → SKU)")
-    print(f"Files Created: 7 (1 JSON + 6 CSVs)")
+    print(f"Files Created: {8 if write_json_tree else 7} ({'1 JSON + ' if write_json_tree else ''}7 CSVs)")
 
     return tree
 
 if __name__ == "__main__":
-    tree = build_revenue_tree()
+    tree = build_revenue_tree(write_json_tree='--json-tree' in sys.argv)
@@ -8,6 +8,9 @@ import pandas as pd
 import json
 from datetime import datetime
 
+from dataset_store import load_dataset, load_partitions
+from distinct_count import distinct_count
+
 def ceo_metadata_layer():
     print("=" * 80)
     print("PHASE 1.6: CEO-SPECIFIC METADATA LAYER")
@@ -16,7 +19,10 @@ def ceo_metadata_layer():
 
     # Load dataset and previous analyses
     print("Loading data and previous analyses...")
-    df = pd.read_csv('/Users/arghya.mukherjee/Downloads/cursor/sd ceo/grocery_dataset.csv')
+    df = load_dataset(columns=[
+        'timestamp', 'store_id', 'store_region', 'product_id', 'total_amount',
+        'customer_id', 'employee_id'
+    ])
     df['timestamp'] = pd.to_datetime(df['timestamp'])
     df['year'] = df['timestamp'].dt.year
 
@@ -33,8 +39,9 @@ def ceo_metadata_layer():
     print("1. Creating Executive Summary...")
 
     total_rev = df['total_amount'].sum()
-    total_customers = df['customer_id'].nunique()
-    total_stores = df['store_id'].nunique()
+    total_customers = distinct_count(df['customer_id'])
+    total_stores = distinct_count(df['store_id'])
+    total_products = distinct_count(df['product_id'])
 
     exec_summary = f"""# CEO Executive Summary
 **Date**: {datetime.now().strftime('%B %d, %Y')}
@@ -49,7 +56,7 @@ def ceo_metadata_layer():
 - **Stores**: {total_stores} locations across 5 regions
 - **Customer Base**: {total_customers:,} active customers
 - **Transactions**: {len(df):,} completed
-- **Products**: {df['product_id'].nunique()} SKUs across 10 categories
+- **Products**: {total_products} SKUs across 10 categories
 
 ### Performance Summary
 - **YoY Revenue Growth**: {dashboard['growth_metrics']['yoy_revenue_growth_pct']:.1f}% (2023 vs 2022)
@@ -752,12 +759,12 @@ See: regional_market_analysis.md
         "company_overview": {
             "name": "Grocery Retail Chain",
             "revenue_2_year": float(total_rev),
-            "revenue_2023": float(df[df['year'] == 2023]['total_amount'].sum()),
+            "revenue_2023": float(load_partitions(['total_amount'], year=2023)['total_amount'].sum()),
             "stores": int(total_stores),
             "regions": list(df['store_region'].unique()),
             "customer_base": int(total_customers),
-            "employees": int(df['employee_id'].nunique()),
-            "products": int(df['product_id'].nunique())
+            "employees": distinct_count(df['employee_id']),
+            "products": total_products
         },
         "strategic_priorities": [
             "Reverse revenue decline - return to 5%+ growth",
@@ -9,21 +9,81 @@ import numpy as np
 from datetime import datetime
 import json
 
-def create_ceo_dashboard():
+from dataset_store import load_dataset, load_dimension
+from fused_aggregation import FusedAggregator
+
+DASHBOARD_COLUMNS = [
+    'timestamp', 'store_id', 'store_region', 'store_type', 'product_id',
+    'category', 'quantity', 'unit_price', 'discount_percentage',
+    'final_price', 'total_amount', 'payment_method', 'customer_id', 'customer_type',
+    'loyalty_points_used', 'basket_size', 'is_weekend', 'season', 'promotion_id',
+    'stock_level_at_sale', 'delivery_method', 'time_slot', 'employee_id',
+    'checkout_duration_sec', 'is_organic'
+]
+# Products sampled for the growth ranking
+GROWTH_SAMPLE_SIZE = 20
+
+def prepare_dashboard_frame(df):
+    """Add the calendar and derived value columns the dashboard aggregates group and sum by"""
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df['year'] = df['timestamp'].dt.year
+    df['quarter'] = df['timestamp'].dt.quarter
+    df['month'] = df['timestamp'].dt.month
+    df['hour'] = df['timestamp'].dt.hour
+    df['is_promo'] = df['promotion_id'] != 'NO_PROMO'
+    df['loyalty_used'] = df['loyalty_points_used'] > 0
+    df['gross_value'] = df['unit_price'] * df['quantity']
+    df['net_value'] = df['final_price'] * df['quantity']
+    return df
+
+def declare_dashboard_aggregates(engine):
+    """Every cube and distinct count the dashboard reads"""
+    engine.add_cube('totals', [], [
+        'total_amount', 'basket_size', 'discount_percentage', 'checkout_duration_sec',
+        'stock_level_at_sale', 'gross_value', 'net_value', 'loyalty_used'
+    ])
+    engine.add_cube('calendar', ['year', 'quarter', 'month', 'hour'], ['total_amount'])
+    engine.add_cube('business', ['store_region', 'store_type', 'customer_type', 'category', 'is_promo'], ['total_amount'])
+    engine.add_cube('channels', ['delivery_method', 'payment_method', 'season', 'time_slot', 'is_weekend', 'is_organic'],
+                    ['total_amount'])
+    engine.add_cube('products', ['product_id', 'year'], ['total_amount', 'quantity'])
+    engine.add_cube('employees', ['employee_id'], ['total_amount'])
+    engine.add_distinct('stores', ['store_region', 'store_type'], 'store_id')
+    engine.add_distinct('customers_by_year', ['year'], 'customer_id')
+    engine.add_distinct('customers_by_segment', ['customer_type'], 'customer_id')
+    engine.add_distinct('customers_by_region', ['store_region'], 'customer_id')
+    engine.add_distinct('products_by_category', ['category'], 'product_id')
+    engine.add_distinct('employee_ids', [], 'employee_id')
+    return engine
+
+def create_ceo_dashboard(engine=None, sample_products=None):
+    """
+    Build the dashboard from the dataset, or from an already-run engine declared with
+    declare_dashboard_aggregates (e.g. merged partial states, see incremental_aggregates.py)
+    """
     print("=" * 80)
     print("PHASE 1.2B: CEO EXECUTIVE DASHBOARD")
     print("=" * 80)
     print()
 
-    # Load dataset
-    print("Loading dataset...")
-    df = pd.read_csv('/Users/arghya.mukherjee/Downloads/cursor/sd ceo/grocery_dataset.csv')
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df['year'] = df['timestamp'].dt.year
-    df['quarter'] = df['timestamp'].dt.quarter
-    df['month'] = df['timestamp'].dt.month
-    df['year_month'] = df['timestamp'].dt.to_period('M')
-    print(f"✓ Loaded {len(df):,} rows")
+    if engine is None:
+        # Load dataset
+        print("Loading dataset...")
+        df = prepare_dashboard_frame(load_dataset(columns=DASHBOARD_COLUMNS))
+        print(f"✓ Loaded {len(df):,} rows")
+        print()
+
+        # ========================================================================
+        # DECLARE ALL METRICS, THEN COMPUTE THEM IN ONE FUSED PASS
+        # ========================================================================
+        print("Computing all dashboard aggregates in one fused pass...")
+        engine = declare_dashboard_aggregates(FusedAggregator(df))
+        engine.run()
+        sample_products = df['product_id'].unique()[:GROWTH_SAMPLE_SIZE]
+
+    totals = engine.frame('totals')
+    product_names = load_dimension('product_dim')['product_name']
+    print("✓ Aggregates ready")
     print()
 
     dashboard_metrics = {}
@@ -33,36 +93,30 @@ def create_ceo_dashboard():
     # ========================================================================
     print("1. Business Performance Metrics...")
 
-    total_revenue = df['total_amount'].sum()
-    total_transactions = len(df)
-    avg_transaction = df['total_amount'].mean()
+    total_revenue = totals['total_amount']
+    total_transactions = int(totals['count'])
+    avg_transaction = total_revenue / total_transactions
 
     # By year
-    yearly = df.groupby('year').agg({
-        'total_amount': 'sum',
-        'transaction_id': 'count'
-    })
+    yearly = engine.frame('calendar', ['year'])
 
     # By quarter
-    quarterly = df.groupby(['year', 'quarter']).agg({
-        'total_amount': 'sum',
-        'transaction_id': 'count'
-    })
+    quarterly = engine.frame('calendar', ['year', 'quarter'])
 
     # By month
-    monthly = df.groupby('year_month').agg({
-        'total_amount': 'sum',
-        'transaction_id': 'count'
-    })
+    monthly = engine.frame('calendar', ['year', 'month'])
+
+    store_count = engine.distinct_counts('stores', [])
+    customer_count = engine.distinct_counts('customers_by_year', [])
 
     # Revenue per store
-    revenue_per_store = total_revenue / df['store_id'].nunique()
+    revenue_per_store = total_revenue / store_count
 
     # Revenue per customer
-    revenue_per_customer = total_revenue / df['customer_id'].nunique()
+    revenue_per_customer = total_revenue / customer_count
 
     # Transaction frequency per customer
-    txn_per_customer = total_transactions / df['customer_id'].nunique()
+    txn_per_customer = total_transactions / customer_count
 
     dashboard_metrics['business_performance'] = {
         'total_revenue_2_years': float(total_revenue),
@@ -83,12 +137,13 @@ def create_ceo_dashboard():
     # YoY Growth
     yoy_revenue_growth = ((yearly.loc[2023, 'total_amount'] - yearly.loc[2022, 'total_amount']) /
                           yearly.loc[2022, 'total_amount'] * 100)
-    yoy_txn_growth = ((yearly.loc[2023, 'transaction_id'] - yearly.loc[2022, 'transaction_id']) /
-                      yearly.loc[2022, 'transaction_id'] * 100)
+    yoy_txn_growth = ((yearly.loc[2023, 'count'] - yearly.loc[2022, 'count']) /
+                      yearly.loc[2022, 'count'] * 100)
 
     # Customer growth
-    customers_2022 = df[df['year'] == 2022]['customer_id'].nunique()
-    customers_2023 = df[df['year'] == 2023]['customer_id'].nunique()
+    customers_by_year = engine.distinct_counts('customers_by_year')
+    customers_2022 = customers_by_year[2022]
+    customers_2023 = customers_by_year[2023]
     customer_growth = ((customers_2023 - customers_2022) / customers_2022 * 100)
 
     # QoQ Growth (Q4 2023 vs Q3 2023)
@@ -115,23 +170,21 @@ def create_ceo_dashboard():
     # ========================================================================
     print("3. Operational Metrics...")
 
-    store_count = df['store_id'].nunique()
-    customer_count = df['customer_id'].nunique()
-    product_count = df['product_id'].nunique()
-    employee_count = df['employee_id'].nunique()
-    avg_basket_size = df['basket_size'].mean()
+    product_count = engine.distinct_counts('products_by_category', [])
+    employee_count = engine.distinct_counts('employee_ids')
+    avg_basket_size = totals['basket_size'] / total_transactions
 
     # By region
-    stores_by_region = df.groupby('store_region')['store_id'].nunique().to_dict()
+    stores_by_region = engine.distinct_counts('stores', ['store_region']).to_dict()
 
     # By type
-    stores_by_type = df.groupby('store_type')['store_id'].nunique().to_dict()
+    stores_by_type = engine.distinct_counts('stores', ['store_type']).to_dict()
 
     # Customers by segment
-    customers_by_segment = df.groupby('customer_type')['customer_id'].nunique().to_dict()
+    customers_by_segment = engine.distinct_counts('customers_by_segment').to_dict()
 
     # Products by category
-    products_by_category = df.groupby('category')['product_id'].nunique().to_dict()
+    products_by_category = engine.distinct_counts('products_by_category').to_dict()
 
     dashboard_metrics['operational_metrics'] = {
         'total_stores': int(store_count),
@@ -151,18 +204,19 @@ def create_ceo_dashboard():
     print("4. Profitability Indicators...")
 
     # Gross margin calculation
-    total_unit_price = (df['unit_price'] * df['quantity']).sum()
-    total_final_price = (df['final_price'] * df['quantity']).sum()
+    total_unit_price = totals['gross_value']
+    total_final_price = totals['net_value']
     gross_margin_pct = ((total_unit_price - total_final_price) / total_unit_price * 100)
 
     # Discount impact
     total_discounts = total_unit_price - total_final_price
-    avg_discount_pct = df['discount_percentage'].mean()
+    avg_discount_pct = totals['discount_percentage'] / total_transactions
 
     # Promotional transactions
-    promo_count = (df['promotion_id'] != 'NO_PROMO').sum()
-    promo_pct = (promo_count / len(df)) * 100
-    promo_revenue = df[df['promotion_id'] != 'NO_PROMO']['total_amount'].sum()
+    promo = engine.frame('business', ['is_promo'])
+    promo_count = promo['count'].get(True, 0)
+    promo_pct = (promo_count / total_transactions) * 100
+    promo_revenue = promo['total_amount'].get(True, 0.0)
 
     dashboard_metrics['profitability_indicators'] = {
         'gross_margin_pct': float(gross_margin_pct),
@@ -182,16 +236,18 @@ def create_ceo_dashboard():
     clv = revenue_per_customer
 
     # Customer segmentation revenue
-    segment_revenue = df.groupby('customer_type')['total_amount'].sum()
-    segment_customers = df.groupby('customer_type')['customer_id'].nunique()
+    segment_revenue = engine.frame('business', ['customer_type'])['total_amount']
+    segment_customers = engine.distinct_counts('customers_by_segment')
 
     # Loyalty program usage
-    loyalty_users = (df['loyalty_points_used'] > 0).sum()
-    loyalty_usage_pct = (loyalty_users / len(df)) * 100
+    loyalty_users = totals['loyalty_used']
+    loyalty_usage_pct = (loyalty_users / total_transactions) * 100
 
     # Retention (customers in both years)
-    customers_both_years = len(set(df[df['year'] == 2022]['customer_id']) &
-                               set(df[df['year'] == 2023]['customer_id']))
+    year_labels = engine.codes('year')[1]
+    customer_years = engine.presence('customers_by_year')
+    customers_both_years = int((customer_years[year_labels.index(2022)] &
+                                customer_years[year_labels.index(2023)]).sum())
     retention_rate = (customers_both_years / customers_2022) * 100
 
     dashboard_metrics['customer_metrics'] = {
@@ -212,31 +268,32 @@ def create_ceo_dashboard():
     # ========================================================================
     print("6. Product Performance...")
 
+    product_totals = engine.frame('products', ['product_id'])[['total_amount', 'quantity']]
+    product_totals.index = pd.MultiIndex.from_arrays(
+        [product_totals.index, product_names.reindex(product_totals.index).to_numpy()],
+        names=['product_id', 'product_name']
+    )
+
     # Top 10 products by revenue
-    top_products_rev = df.groupby(['product_id', 'product_name']).agg({
-        'total_amount': 'sum',
-        'quantity': 'sum'
-    }).sort_values('total_amount', ascending=False).head(10)
+    top_products_rev = product_totals.sort_values('total_amount', ascending=False).head(10)
 
     # Top 10 products by volume
-    top_products_vol = df.groupby(['product_id', 'product_name']).agg({
-        'total_amount': 'sum',
-        'quantity': 'sum'
-    }).sort_values('quantity', ascending=False).head(10)
+    top_products_vol = product_totals.sort_values('quantity', ascending=False).head(10)
 
     # Top 10 categories by revenue
-    top_categories = df.groupby('category')['total_amount'].sum().sort_values(ascending=False).head(10)
+    top_categories = engine.frame('business', ['category'])['total_amount'].sort_values(ascending=False).head(10)
 
     # Growth analysis by product (2023 vs 2022)
+    product_year_revenue = engine.frame('products')['total_amount']
     product_growth = []
-    for pid in df['product_id'].unique()[:20]:  # Sample top products
-        prod_2022 = df[(df['product_id'] == pid) & (df['year'] == 2022)]['total_amount'].sum()
-        prod_2023 = df[(df['product_id'] == pid) & (df['year'] == 2023)]['total_amount'].sum()
+    for pid in sample_products:  # Sample top products
+        prod_2022 = product_year_revenue.get((pid, 2022), 0.0)
+        prod_2023 = product_year_revenue.get((pid, 2023), 0.0)
         if prod_2022 > 0:
             growth = ((prod_2023 - prod_2022) / prod_2022 * 100)
             product_growth.append({
                 'product_id': pid,
-                'product_name': df[df['product_id'] == pid]['product_name'].iloc[0],
+                'product_name': product_names[pid],
                 'growth_pct': growth,
                 'revenue_2023': prod_2023
             })
@@ -261,12 +318,10 @@ def create_ceo_dashboard():
     # ========================================================================
     print("7. Regional Performance...")
 
-    regional = df.groupby('store_region').agg({
-        'total_amount': 'sum',
-        'store_id': 'nunique',
-        'customer_id': 'nunique',
-        'transaction_id': 'count'
-    }).sort_values('total_amount', ascending=False)
+    regional = engine.frame('business', ['store_region'])
+    regional['store_id'] = engine.distinct_counts('stores', ['store_region'])
+    regional['customer_id'] = engine.distinct_counts('customers_by_region')
+    regional = regional.sort_values('total_amount', ascending=False)
 
     dashboard_metrics['regional_performance'] = {
         region: {
@@ -274,7 +329,7 @@ def create_ceo_dashboard():
             'revenue_pct': float((row['total_amount'] / total_revenue) * 100),
             'stores': int(row['store_id']),
             'customers': int(row['customer_id']),
-            'transactions': int(row['transaction_id']),
+            'transactions': int(row['count']),
             'revenue_per_store': float(row['total_amount'] / row['store_id'])
         }
         for region, row in regional.iterrows()
@@ -286,14 +341,15 @@ def create_ceo_dashboard():
     print("8. Channel Performance...")
 
     # Delivery method
-    delivery = df.groupby('delivery_method')['total_amount'].sum()
+    delivery = engine.frame('channels', ['delivery_method'])['total_amount']
 
     # Payment method
-    payment = df.groupby('payment_method')['total_amount'].sum()
+    payment = engine.frame('channels', ['payment_method'])['total_amount']
 
     # Organic vs Non-organic
-    organic_rev = df[df['is_organic'] == True]['total_amount'].sum()
-    non_organic_rev = df[df['is_organic'] == False]['total_amount'].sum()
+    organic = engine.frame('channels', ['is_organic'])['total_amount']
+    organic_rev = organic.get(True, 0.0)
+    non_organic_rev = organic.get(False, 0.0)
 
     dashboard_metrics['channel_performance'] = {
         'delivery_method': {method: float(rev) for method, rev in delivery.items()},
@@ -312,21 +368,22 @@ def create_ceo_dashboard():
     print("9. Time-Based Patterns...")
 
     # Weekend vs Weekday
-    weekend_rev = df[df['is_weekend'] == True]['total_amount'].sum()
-    weekday_rev = df[df['is_weekend'] == False]['total_amount'].sum()
+    weekend = engine.frame('channels', ['is_weekend'])['total_amount']
+    weekend_rev = weekend.get(True, 0.0)
+    weekday_rev = weekend.get(False, 0.0)
 
     # Seasonal
-    seasonal = df.groupby('season')['total_amount'].sum().sort_values(ascending=False)
+    seasonal = engine.frame('channels', ['season'])['total_amount'].sort_values(ascending=False)
 
     # Time slot
-    timeslot = df.groupby('time_slot')['total_amount'].sum().sort_values(ascending=False)
+    timeslot = engine.frame('channels', ['time_slot'])['total_amount'].sort_values(ascending=False)
 
     # Monthly trends
-    monthly_trends = df.groupby('year_month').agg({
-        'total_amount': 'sum',
-        'transaction_id': 'count'
-    }).reset_index()
-    monthly_trends['year_month'] = monthly_trends['year_month'].astype(str)
+    monthly_trends = [
+        {'year_month': f"{year}-{month:02d}", 'total_amount': float(row['total_amount']),
+         'transaction_id': int(row['count'])}
+        for (year, month), row in monthly_sorted.iterrows()
+    ]
 
     dashboard_metrics['time_based_patterns'] = {
         'weekend_vs_weekday': {
@@ -337,7 +394,7 @@ def create_ceo_dashboard():
         },
         'seasonal': {season: float(rev) for season, rev in seasonal.items()},
         'time_slot': {slot: float(rev) for slot, rev in timeslot.items()},
-        'monthly_trends': monthly_trends.to_dict('records')
+        'monthly_trends': monthly_trends
     }
 
     # ========================================================================
@@ -345,22 +402,18 @@ def create_ceo_dashboard():
     # ========================================================================
     print("10. Operational Efficiency...")
 
-    avg_checkout_duration = df['checkout_duration_sec'].mean()
+    avg_checkout_duration = totals['checkout_duration_sec'] / total_transactions
 
     # Peak hour analysis
-    df['hour'] = df['timestamp'].dt.hour
-    hourly_traffic = df.groupby('hour')['transaction_id'].count().sort_values(ascending=False)
+    hourly_traffic = engine.frame('calendar', ['hour'])['count'].sort_values(ascending=False)
 
     # Employee productivity
-    emp_productivity = df.groupby('employee_id').agg({
-        'transaction_id': 'count',
-        'total_amount': 'sum'
-    })
-    avg_txn_per_employee = emp_productivity['transaction_id'].mean()
+    emp_productivity = engine.frame('employees')
+    avg_txn_per_employee = emp_productivity['count'].mean()
     avg_revenue_per_employee = emp_productivity['total_amount'].mean()
 
     # Stock turnover (simplified)
-    avg_stock_level = df['stock_level_at_sale'].mean()
+    avg_stock_level = totals['stock_level_at_sale'] / total_transactions
 
     dashboard_metrics['operational_efficiency'] = {
         'avg_checkout_duration_sec': float(avg_checkout_duration),
@@ -8,180 +8,166 @@ import pandas as pd
 import json
 from datetime import datetime
 
+from dataset_store import duplicate_summary, iter_chunks, load_duplicates
+from streaming_aggregation import StreamingAggregator
+from validation_engine import ValidationEngine, timing_table
+
 def data_validation():
     print("=" * 80)
     print("PHASE 1.7: DATA VALIDATION & CROSS-CHECK")
     print("=" * 80)
     print()
 
-    # Load original dataset
-    print("Loading dataset...")
-    df = pd.read_csv('/Users/arghya.mukherjee/Downloads/cursor/sd ceo/grocery_dataset.csv')
-    print(f"✓ Loaded {len(df):,} rows")
+    metadata_dir = '/Users/arghya.mukherjee/Downloads/cursor/sd ceo/claude/metadata_ceo'
+    revenue_by_region_df = pd.read_csv(f'{metadata_dir}/revenue_by_region.csv')
+    revenue_by_store_df = pd.read_csv(f'{metadata_dir}/revenue_by_store.csv')
+    revenue_by_category_df = pd.read_csv(f'{metadata_dir}/revenue_by_category.csv')
+    with open(f'{metadata_dir}/ceo_executive_dashboard.json') as f:
+        dashboard = json.load(f)
+
+    regional_sum = revenue_by_region_df['revenue'].sum()
+    store_sum = revenue_by_store_df['revenue'].sum()
+    category_sum = revenue_by_category_df['revenue'].sum()
+    regional_txn_sum = revenue_by_region_df['transaction_count'].sum()
+    dashboard_total_rev = dashboard['business_performance']['total_revenue_2_years']
+
+    # Every check below is evaluated in one streaming pass over the dataset store
+    aggregates = StreamingAggregator()
+    aggregates.add('customers', [], customers=('customer_id', 'nunique'))
+    aggregates.add('segment_customers', ['customer_type'], customers=('customer_id', 'nunique'))
+
+    def segment_customer_sum():
+        return int(aggregates.result('segment_customers')['customers'].sum())
+
+    critical_fields = ['total_amount', 'transaction_id', 'customer_id', 'store_id', 'product_id']
+
+    engine = ValidationEngine()
+    engine.reconciliation("Revenue by Region", 'total_amount', regional_sum, tolerance=1,
+                          notes=("All regions sum to total", "Regional sum doesn't match total"))
+    engine.reconciliation("Revenue by Store", 'total_amount', store_sum, tolerance=1,
+                          notes=("All stores sum to total", "Store sum doesn't match total"))
+    engine.reconciliation("Revenue by Category", 'total_amount', category_sum, tolerance=1,
+                          notes=("All categories sum to total", "Category sum doesn't match total"))
+    engine.unique_check("Transaction Uniqueness", 'transaction_id',
+                        notes=("All IDs unique", "Duplicate transaction IDs found"))
+    engine.reconciliation("Regional Transaction Count", None, regional_txn_sum, tolerance=0,
+                          notes=("Counts match", "Regional txns don't match total"))
+    # Note: Customers can appear in multiple years with different segments, so this is informational
+    engine.info("Customer Segmentation",
+                lambda: (0, f"{segment_customer_sum():,} unique customers across segments"))
+    engine.reconciliation("Dashboard Revenue", 'total_amount', dashboard_total_rev, tolerance=1,
+                          notes=("Matches source data", "Dashboard doesn't match source"))
+    for field in critical_fields:
+        engine.null_check(f"Null Check - {field}", field, notes=("No nulls", "Null values found"))
+    engine.range_check("Negative Amounts", 'total_amount', lower=0,
+                       notes=("No negatives", "Negative values found"))
+    engine.row_check("Calculation Accuracy", ['total_amount', 'final_price', 'quantity'],
+                     lambda chunk: (chunk['total_amount'] - chunk['final_price'] * chunk['quantity']).abs() > 0.01,
+                     fail_status='INFO', notes=("All accurate", "Minor rounding differences"))
+
+    print("Validating dataset (single pass)...")
+    results = engine.run(iter_chunks(columns=engine.columns(extra=['customer_type'])), aggregator=aggregates)
+    checks = {result.name: result for result in results}
+    print(f"✓ Validated {engine.rows:,} rows")
     print()
 
-    validation_report = []
-    issues = []
+    validation_report = [(r.name, r.status, r.value, r.note) for r in results]
+    issues = [(r.name, r.value) for r in results if r.status == 'FAIL']
 
     # ========================================================================
     # 1. REVENUE VALIDATION
     # ========================================================================
     print("1. Revenue Validation...")
 
-    total_revenue = df['total_amount'].sum()
+    total_revenue = checks["Revenue by Region"].actual
     print(f"   Total Revenue from source: ${total_revenue:,.2f}")
-
-    # Check regional breakdown
-    revenue_by_region_df = pd.read_csv('/Users/arghya.mukherjee/Downloads/cursor/sd ceo/claude/metadata_ceo/revenue_by_region.csv')
-    regional_sum = revenue_by_region_df['revenue'].sum()
-    print(f"   Sum of regional revenues: ${regional_sum:,.2f}")
-
-    if abs(total_revenue - regional_sum) < 1:
-        print("   ✓ Regional revenues add up correctly")
-        validation_report.append(("Revenue by Region", "PASS", 0, "All regions sum to total"))
-    else:
-        diff = abs(total_revenue - regional_sum)
-        print(f"   ✗ Discrepancy: ${diff:,.2f}")
-        issues.append(("Revenue by Region", diff))
-        validation_report.append(("Revenue by Region", "FAIL", diff, "Regional sum doesn't match total"))
-
-    # Check store-level breakdown
-    revenue_by_store_df = pd.read_csv('/Users/arghya.mukherjee/Downloads/cursor/sd ceo/claude/metadata_ceo/revenue_by_store.csv')
-    store_sum = revenue_by_store_df['revenue'].sum()
-    print(f"   Sum of store revenues: ${store_sum:,.2f}")
-
-    if abs(total_revenue - store_sum) < 1:
-        print("   ✓ Store revenues add up correctly")
-        validation_report.append(("Revenue by Store", "PASS", 0, "All stores sum to total"))
-    else:
-        diff = abs(total_revenue - store_sum)
-        print(f"   ✗ Discrepancy: ${diff:,.2f}")
-        issues.append(("Revenue by Store", diff))
-        validation_report.append(("Revenue by Store", "FAIL", diff, "Store sum doesn't match total"))
-
-    # Check category breakdown
-    revenue_by_category_df = pd.read_csv('/Users/arghya.mukherjee/Downloads/cursor/sd ceo/claude/metadata_ceo/revenue_by_category.csv')
-    category_sum = revenue_by_category_df['revenue'].sum()
-    print(f"   Sum of category revenues: ${category_sum:,.2f}")
-
-    if abs(total_revenue - category_sum) < 1:
-        print("   ✓ Category revenues add up correctly")
-        validation_report.append(("Revenue by Category", "PASS", 0, "All categories sum to total"))
-    else:
-        diff = abs(total_revenue - category_sum)
-        print(f"   ✗ Discrepancy: ${diff:,.2f}")
-        issues.append(("Revenue by Category", diff))
-        validation_report.append(("Revenue by Category", "FAIL", diff, "Category sum doesn't match total"))
+    for name, label, breakdown_sum in [("Revenue by Region", "regional", regional_sum),
+                                       ("Revenue by Store", "store", store_sum),
+                                       ("Revenue by Category", "category", category_sum)]:
+        print(f"   Sum of {label} revenues: ${breakdown_sum:,.2f}")
+        if checks[name].status == 'PASS':
+            print(f"   ✓ {label.capitalize()} revenues add up correctly")
+        else:
+            print(f"   ✗ Discrepancy: ${checks[name].value:,.2f}")
 
     # ========================================================================
     # 2. TRANSACTION COUNT VALIDATION
     # ========================================================================
     print("\n2. Transaction Count Validation...")
 
-    total_transactions = len(df)
+    total_transactions = engine.rows
     print(f"   Total Transactions: {total_transactions:,}")
 
-    # Check for duplicates
-    unique_transactions = df['transaction_id'].nunique()
+    unique_transactions = checks["Transaction Uniqueness"].expected
     print(f"   Unique Transaction IDs: {unique_transactions:,}")
-
-    if unique_transactions != total_transactions:
-        duplicate_count = total_transactions - unique_transactions
-        print(f"   ⚠️  Found {duplicate_count:,} duplicate transaction IDs")
-        validation_report.append(("Transaction Uniqueness", "WARNING", duplicate_count, "Duplicate transaction IDs found"))
+    if checks["Transaction Uniqueness"].status != 'PASS':
+        print(f"   ⚠️  Found {checks['Transaction Uniqueness'].value:,} duplicate transaction IDs")
     else:
         print("   ✓ All transaction IDs are unique")
-        validation_report.append(("Transaction Uniqueness", "PASS", 0, "All IDs unique"))
 
-    # Verify transaction counts in regional data
-    regional_txn_sum = revenue_by_region_df['transaction_count'].sum()
-    print(f"   Regional transaction sum: {regional_txn_sum:,}")
+    # Which ids repeat, and where: the report written by the ingestion-time duplicate detector
+    summary = duplicate_summary()
+    duplicate_md = ""
+    if summary is not None and summary['rows']:
+        duplicates = load_duplicates(nrows=20)
+        print(f"   Duplicate rows from ingestion report: {summary['rows']:,} ({summary['ids']:,} ids)")
+        duplicate_md = (f"\n**Duplicate IDs** ({summary['rows']:,} repeated rows of {summary['ids']:,} ids, first 20; "
+                        f"full list in {summary['file']} in the dataset store):\n\n"
+                        "| Transaction ID | First Row | Repeats |\n|----------------|-----------|---------|\n")
+        for record in duplicates.itertuples(index=False):
+            duplicate_md += f"| {record.transaction_id} | {record.first_row:,} | {record.repeats:,} |\n"
 
-    if regional_txn_sum == total_transactions:
+    print(f"   Regional transaction sum: {regional_txn_sum:,}")
+    if checks["Regional Transaction Count"].status == 'PASS':
         print("   ✓ Regional transaction counts match")
-        validation_report.append(("Regional Transaction Count", "PASS", 0, "Counts match"))
     else:
-        diff = abs(regional_txn_sum - total_transactions)
-        print(f"   ✗ Discrepancy: {diff:,} transactions")
-        issues.append(("Regional Transaction Count", diff))
-        validation_report.append(("Regional Transaction Count", "FAIL", diff, "Regional txns don't match total"))
+        print(f"   ✗ Discrepancy: {checks['Regional Transaction Count'].value:,} transactions")
 
     # ========================================================================
     # 3. CUSTOMER METRICS VALIDATION
     # ========================================================================
     print("\n3. Customer Metrics Validation...")
 
-    total_customers = df['customer_id'].nunique()
+    total_customers = int(aggregates.result('customers')['customers'])
     print(f"   Total Unique Customers: {total_customers:,}")
-
-    # Check customer segmentation
-    segment_customers = df.groupby('customer_type')['customer_id'].nunique().sum()
+    segment_customers = segment_customer_sum()
     print(f"   Sum of segment customers: {segment_customers:,}")
 
-    # Note: Customers can appear in multiple years with different segments
-    # So this validation needs special handling
-    validation_report.append(("Customer Segmentation", "INFO", 0, f"{segment_customers:,} unique customers across segments"))
-
     # ========================================================================
     # 4. CROSS-REFERENCE WITH DASHBOARD
     # ========================================================================
     print("\n4. Cross-Reference with CEO Dashboard...")
 
-    with open('/Users/arghya.mukherjee/Downloads/cursor/sd ceo/claude/metadata_ceo/ceo_executive_dashboard.json') as f:
-        dashboard = json.load(f)
-
-    dashboard_total_rev = dashboard['business_performance']['total_revenue_2_years']
     print(f"   Dashboard Total Revenue: ${dashboard_total_rev:,.2f}")
     print(f"   Source Total Revenue: ${total_revenue:,.2f}")
-
-    if abs(dashboard_total_rev - total_revenue) < 1:
+    if checks["Dashboard Revenue"].status == 'PASS':
         print("   ✓ Dashboard revenue matches source")
-        validation_report.append(("Dashboard Revenue", "PASS", 0, "Matches source data"))
     else:
-        diff = abs(dashboard_total_rev - total_revenue)
-        print(f"   ✗ Discrepancy: ${diff:,.2f}")
-        issues.append(("Dashboard Revenue", diff))
-        validation_report.append(("Dashboard Revenue", "FAIL", diff, "Dashboard doesn't match source"))
+        print(f"   ✗ Discrepancy: ${checks['Dashboard Revenue'].value:,.2f}")
 
     # ========================================================================
     # 5. DATA QUALITY CHECKS
     # ========================================================================
     print("\n5. Data Quality Checks...")
 
-    # Check for null values in critical fields
-    critical_fields = ['total_amount', 'transaction_id', 'customer_id', 'store_id', 'product_id']
-    null_counts = {}
-
-    for field in critical_fields:
-        null_count = df[field].isna().sum()
-        null_counts[field] = null_count
+    null_counts = {field: checks[f"Null Check - {field}"].value for field in critical_fields}
+    for field, null_count in null_counts.items():
         if null_count > 0:
             print(f"   ⚠️  {field}: {null_count:,} null values")
-            validation_report.append((f"Null Check - {field}", "WARNING", null_count, "Null values found"))
         else:
             print(f"   ✓ {field}: No null values")
-            validation_report.append((f"Null Check - {field}", "PASS", 0, "No nulls"))
 
-    # Check for negative values
-    negative_amounts = (df['total_amount'] < 0).sum()
+    negative_amounts = checks["Negative Amounts"].value
     if negative_amounts > 0:
         print(f"   ⚠️  Found {negative_amounts:,} negative total_amounts")
-        validation_report.append(("Negative Amounts", "WARNING", negative_amounts, "Negative values found"))
     else:
         print(f"   ✓ No negative total_amounts")
-        validation_report.append(("Negative Amounts", "PASS", 0, "No negatives"))
-
-    # Check calculation accuracy
-    df_calc = df.copy()
-    df_calc['calculated_total'] = df_calc['final_price'] * df_calc['quantity']
-    calculation_errors = (abs(df_calc['total_amount'] - df_calc['calculated_total']) > 0.01).sum()
 
+    calculation_errors = checks["Calculation Accuracy"].value
     if calculation_errors > 0:
         print(f"   ℹ️  {calculation_errors:,} transactions have rounding differences (>$0.01)")
-        validation_report.append(("Calculation Accuracy", "INFO", calculation_errors, "Minor rounding differences"))
     else:
         print(f"   ✓ All calculations are accurate")
-        validation_report.append(("Calculation Accuracy", "PASS", 0, "All accurate"))
 
     # ========================================================================
     # 6. RECONCILIATION SUMMARY
@@ -196,7 +182,8 @@ def data_validation():
         'source_value': float(total_revenue),
         'calculated_value': float(regional_sum),
         'difference': float(abs(total_revenue - regional_sum)),
-        'status': 'PASS' if abs(total_revenue - regional_sum) < 1 else 'FAIL'
+        'status': 'PASS' if abs(total_revenue - regional_sum) < 1 else 'FAIL',
+        'check_seconds': round(checks["Revenue by Region"].seconds, 4)
     })
 
     # Transaction reconciliation
@@ -205,7 +192,8 @@ def data_validation():
         'source_value': int(total_transactions),
         'calculated_value': int(regional_txn_sum),
         'difference': int(abs(total_transactions - regional_txn_sum)),
-        'status': 'PASS' if total_transactions == regional_txn_sum else 'FAIL'
+        'status': 'PASS' if total_transactions == regional_txn_sum else 'FAIL',
+        'check_seconds': round(checks["Regional Transaction Count"].seconds, 4)
     })
 
     # Customer reconciliation
@@ -214,7 +202,8 @@ def data_validation():
         'source_value': int(total_customers),
         'calculated_value': int(segment_customers),
         'difference': 0,
-        'status': 'INFO'
+        'status': 'INFO',
+        'check_seconds': round(checks["Customer Segmentation"].seconds + engine.aggregate_seconds, 4)
     })
 
     # Save reconciliation
@@ -230,7 +219,7 @@ def data_validation():
 
     report_md = f"""# Data Validation Report - Final
 **Generated**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-**Data Source**: grocery_dataset.csv ({len(df):,} rows)
+**Data Source**: grocery_dataset.csv ({engine.rows:,} rows)
 
 ---
 
@@ -266,7 +255,7 @@ def data_validation():
 | Regional Transaction Sum | {regional_txn_sum:,} | {"✓" if regional_txn_sum == total_transactions else "✗"} |
 
 **Conclusion**: {"All transaction counts validated" if unique_transactions == total_transactions and regional_txn_sum == total_transactions else "Duplicate transaction IDs found"}
-
+{duplicate_md}
 ### Customer Validation
 | Metric | Value | Status |
 |--------|-------|--------|
@@ -315,6 +304,13 @@ def data_validation():
 
 ---
 
+## CHECK TIMING
+
+All checks ran in a single pass over {engine.rows:,} rows.
+
+{timing_table(results, engine.aggregate_seconds)}
+---
+
 ## CONCLUSION
 
 """
@@ -352,7 +348,7 @@ While most validations passed, the following discrepancies were found:
 4. ceo_executive_dashboard.json
 5. grocery_dataset.csv (source)
 
-**Total Records Validated**: {len(df):,}
+**Total Records Validated**: {engine.rows:,}
 **Total Revenue Validated**: ${total_revenue:,.2f}
 
 ---
@@ -0,0 +1,631 @@
+#!/usr/bin/env python3
+"""
+Columnar Dataset Store
+One-time ingestion of grocery_dataset.csv into memory-mapped NumPy columns,
+plus the shared loader every phase script reads from
+
+Layout of a store directory:
+    manifest.json          row count + per-column kind/dtype/file
+    <column>.bin           raw little-endian values (numeric, bool, datetime)
+    <column>.codes.bin     dictionary codes for string columns (-1 = null)
+    <column>.bytes.bin     fixed-width bytes for very high-cardinality ids
+    <column>.lookup.npy    code → id lookup table for entity id columns (ID_COLUMNS)
+    <dimension>.npz        attribute codes per id code for each entity dimension (DIMENSIONS)
+    partitions.rows.npy    row ids grouped by calendar month of the timestamp (PARTITION_COLUMN)
+    transaction_id.dedup/  duplicate detector state (Bloom filter + sorted hash runs)
+    transaction_id.duplicates.csv   every repeated transaction_id with its first row and repeat count
+    transaction_id.duplicate_rows.csv   every repeated row (only with --duplicates --rows)
+
+load_dataset() maps whole columns; iter_chunks() streams bounded row slices;
+load_partitions() reads only the year/month partitions a time predicate can match:
+
+    yoy = {year: load_partitions(['store_id', 'total_amount'], year=year) for year in (2022, 2023)}
+    h1 = load_partitions(['total_amount'], year=2023, month=range(1, 7))
+
+Usage: python3 dataset_store.py [csv_path] [store_dir]
+       python3 dataset_store.py --dimensions [store_dir]    (rebuild dimension tables only)
+       python3 dataset_store.py --duplicates [store_dir] [--rows]   (rebuild the duplicate report only;
+                                                                     --rows also lists every repeated row)
+       python3 dataset_store.py --partitions [store_dir]    (rebuild the year/month partition index only)
+"""
+
+import json
+import shutil
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from duplicate_detector import DuplicateDetector
+
+BASE_DIR = Path("/Users/arghya.mukherjee/Downloads/cursor/sd ceo")
+DATA_FILE = BASE_DIR / "grocery_dataset.csv"
+STORE_DIR = BASE_DIR / "grocery_dataset_store"
+METADATA_CEO_DIR = BASE_DIR / "claude" / "metadata_ceo"
+
+# Dataset used by the top-level supply chain / merchandising analyses
+SUPPLY_CHAIN_DATA_FILE = Path("/Users/arghya.mukherjee/Downloads/cursor/sd/metadata/grocery_dataset.csv")
+SUPPLY_CHAIN_STORE_DIR = Path("/Users/arghya.mukherjee/Downloads/cursor/sd/metadata/grocery_dataset_store")
+
+MANIFEST_NAME = 'manifest.json'
+DATETIME_COLUMNS = ('timestamp',)
+
+# ~24M distinct values: a dictionary would be as large as the column itself
+BYTES_COLUMNS = ('transaction_id',)
+BYTES_WIDTH = 32
+
+# Column checked for repeated values while ingesting (see duplicate_detector.py)
+DUPLICATE_KEY = 'transaction_id'
+
+# Entity ids get their lookup table in a separate <column>.lookup.npy instead of the manifest
+ID_COLUMNS = ('store_id', 'customer_id', 'product_id', 'employee_id')
+
+# Entity dimension tables built at ingestion: name → (key id column, attribute columns).
+# Each attribute holds the first value observed for the id.
+DIMENSIONS = {
+    'product_dim': ('product_id', ('product_name', 'category', 'sub_category', 'brand')),
+    'store_dim': ('store_id', ('store_region', 'store_type')),
+    'customer_dim': ('customer_id', ('customer_type', 'age_group', 'gender')),
+    'employee_dim': ('employee_id', ('store_id', 'store_region', 'store_type')),
+}
+
+# Rows are indexed by calendar month of this column (see build_partitions / load_partitions)
+PARTITION_COLUMN = 'timestamp'
+PARTITIONS_FILE = 'partitions.rows.npy'
+
+# Rows per slice when streaming the store (see iter_chunks)
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+
+# Decoded columns registered by share_dataset(), keyed by (store_dir, column)
+_SHARED_COLUMNS = {}
+
+
+def _column_kind(name, series):
+    if name in DATETIME_COLUMNS:
+        return 'datetime'
+    if name in BYTES_COLUMNS:
+        return 'bytes'
+    if pd.api.types.is_bool_dtype(series):
+        return 'bool'
+    if pd.api.types.is_numeric_dtype(series):
+        return 'numeric'
+    return 'category'
+
+
+def ingest_csv(csv_path=DATA_FILE, store_dir=STORE_DIR, chunksize=500000):
+    """Convert the CSV into a typed, column-per-file store in a single streaming pass"""
+    csv_path = Path(csv_path)
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+
+    print("=" * 80)
+    print("DATASET STORE: INGESTING CSV")
+    print("=" * 80)
+    print(f"Source: {csv_path}")
+    print(f"Store:  {store_dir}")
+    print()
+
+    start = time.time()
+    columns = {}
+    handles = {}
+    dictionaries = {}
+    total_rows = 0
+    detector = None
+
+    for i, chunk in enumerate(pd.read_csv(csv_path, chunksize=chunksize, low_memory=False)):
+        if not columns:
+            for name in chunk.columns:
+                kind = _column_kind(name, chunk[name])
+                if kind == 'numeric':
+                    dtype = str(chunk[name].dtype)
+                    file_name = f"{name}.bin"
+                elif kind == 'bool':
+                    dtype = 'bool'
+                    file_name = f"{name}.bin"
+                elif kind == 'datetime':
+                    dtype = 'datetime64[ns]'
+                    file_name = f"{name}.bin"
+                elif kind == 'bytes':
+                    dtype = f"S{BYTES_WIDTH}"
+                    file_name = f"{name}.bytes.bin"
+                else:
+                    dtype = 'int32'
+                    file_name = f"{name}.codes.bin"
+                    dictionaries[name] = {}
+                columns[name] = {'kind': kind, 'dtype': dtype, 'file': file_name}
+                handles[name] = open(store_dir / file_name, 'wb')
+            if DUPLICATE_KEY in columns:
+                detector = _new_duplicate_detector(store_dir)
+
+        for name, spec in columns.items():
+            values = chunk[name]
+            if spec['kind'] == 'datetime':
+                arr = pd.to_datetime(values).to_numpy(dtype='datetime64[ns]')
+            elif spec['kind'] == 'bytes':
+                encoded = values.astype(str).str.encode('utf-8')
+                if encoded.str.len().max() > BYTES_WIDTH:
+                    raise ValueError(f"{name} values exceed {BYTES_WIDTH} bytes; raise BYTES_WIDTH and re-ingest")
+                arr = encoded.to_numpy(dtype=spec['dtype'])
+            elif spec['kind'] == 'category':
+                # Codes are assigned in first-seen order and remapped to sorted order at the end
+                lookup = dictionaries[name]
+                codes, uniques = pd.factorize(values, use_na_sentinel=True)
+                remap = np.array([lookup.setdefault(v, len(lookup)) for v in uniques], dtype=np.int32)
+                arr = np.where(codes >= 0, remap[codes] if len(remap) else codes, -1).astype(np.int32)
+            else:
+                arr = values.to_numpy(dtype=spec['dtype'])
+            handles[name].write(np.ascontiguousarray(arr).tobytes())
+            if name == DUPLICATE_KEY and detector is not None:
+                detector.add(values.astype(str).to_numpy(dtype=object))
+
+        total_rows += len(chunk)
+        if (i + 1) % 10 == 0:
+            print(f"  Ingested {total_rows:,} rows...")
+
+    for handle in handles.values():
+        handle.close()
+
+    # Sort each dictionary so code order matches lexical order (keeps groupby/sort output unchanged)
+    for name, lookup in dictionaries.items():
+        first_seen = list(lookup.keys())
+        order = sorted(range(len(first_seen)), key=lambda j: str(first_seen[j]))
+        remap = np.empty(len(first_seen), dtype=np.int32)
+        remap[order] = np.arange(len(first_seen), dtype=np.int32)
+        codes = np.memmap(store_dir / columns[name]['file'], dtype=np.int32, mode='r+', shape=(total_rows,))
+        for lo in range(0, total_rows, chunksize):
+            block = codes[lo:lo + chunksize]
+            valid = block >= 0
+            block[valid] = remap[block[valid]]
+        codes.flush()
+        del codes
+        categories = [first_seen[j] for j in order]
+        if name in ID_COLUMNS:
+            lookup_file = f"{name}.lookup.npy"
+            np.save(store_dir / lookup_file, np.array([str(c) for c in categories]))
+            columns[name]['lookup'] = lookup_file
+        else:
+            columns[name]['categories'] = categories
+
+    manifest = {
+        'source': str(csv_path),
+        'rows': int(total_rows),
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'columns': columns
+    }
+    if detector is not None:
+        detector.save()
+        write_duplicate_report(store_dir, manifest, detector)
+    with open(store_dir / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=2, default=str)
+
+    print(f"✓ Ingested {total_rows:,} rows, {len(columns)} columns in {time.time() - start:,.1f}s")
+    manifest = build_dimensions(store_dir, manifest)
+    return build_partitions(store_dir, manifest)
+
+
+def build_dimensions(store_dir=STORE_DIR, manifest=None):
+    """Write one attribute table per entity (first observed value per id) and register it in the manifest"""
+    store_dir = Path(store_dir)
+    manifest = manifest or read_manifest(store_dir)
+    manifest['dimensions'] = {}
+    for name, (key, attributes) in DIMENSIONS.items():
+        if key not in manifest['columns']:
+            continue
+        attributes = [a for a in attributes if manifest['columns'].get(a, {}).get('kind') == 'category']
+        key_spec, key_codes = _map_column(key, store_dir, manifest)
+        first = first_rows_by_code(np.asarray(key_codes), len(_category_dtype(key_spec, store_dir).categories))
+        arrays = {}
+        for attribute in attributes:
+            _, codes = _map_column(attribute, store_dir, manifest)
+            arrays[attribute] = np.where(first >= 0, codes[np.maximum(first, 0)], -1).astype(np.int32)
+        np.savez(store_dir / f"{name}.npz", **arrays)
+        manifest['dimensions'][name] = {'key': key, 'attributes': attributes, 'file': f"{name}.npz"}
+        print(f"✓ {name}: {len(first):,} {key} values × {len(attributes)} attributes")
+
+    with open(store_dir / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=2, default=str)
+    return manifest
+
+
+def _month_ids(timestamps):
+    """Months since 1970-01 per timestamp; NaT maps to -1"""
+    months = np.asarray(timestamps, dtype='datetime64[ns]').astype('datetime64[M]')
+    return np.where(np.isnat(months), -1, months.astype(np.int64))
+
+
+def build_partitions(store_dir=STORE_DIR, manifest=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Index the rows of every calendar month of PARTITION_COLUMN: one row-id array grouped by month
+    (ascending row ids within a month), registered in the manifest as 'YYYY-MM' → [start, stop).
+    A counting sort in two streaming passes over the column; the stored columns are not reordered.
+    """
+    store_dir = Path(store_dir)
+    manifest = manifest or read_manifest(store_dir)
+    if manifest['columns'].get(PARTITION_COLUMN, {}).get('kind') != 'datetime':
+        return manifest
+    _, raw = _map_column(PARTITION_COLUMN, store_dir, manifest)
+    rows = manifest['rows']
+
+    counts = {}
+    for lo in range(0, rows, chunk_rows):
+        months, month_counts = np.unique(_month_ids(raw[lo:lo + chunk_rows]), return_counts=True)
+        for month, count in zip(months.tolist(), month_counts.tolist()):
+            counts[month] = counts.get(month, 0) + count
+    counts.pop(-1, None)
+
+    bounds, cursor, start = {}, {}, 0
+    for month in sorted(counts):
+        bounds[month] = (start, start + counts[month])
+        cursor[month] = start
+        start += counts[month]
+    index = np.lib.format.open_memmap(store_dir / PARTITIONS_FILE, mode='w+', dtype=np.int64, shape=(start,))
+    for lo in range(0, rows, chunk_rows):
+        month_ids = _month_ids(raw[lo:lo + chunk_rows])
+        order = np.argsort(month_ids, kind='stable')
+        sorted_ids = month_ids[order]
+        present, firsts = np.unique(sorted_ids, return_index=True)
+        lasts = np.r_[firsts[1:], len(sorted_ids)]
+        for month, first, last in zip(present.tolist(), firsts.tolist(), lasts.tolist()):
+            if month < 0:
+                continue
+            index[cursor[month]:cursor[month] + last - first] = lo + order[first:last]
+            cursor[month] += last - first
+    index.flush()
+    del index
+
+    manifest['partitions'] = {
+        'column': PARTITION_COLUMN,
+        'file': PARTITIONS_FILE,
+        'months': {f"{np.datetime64(month, 'M')}": list(bounds[month]) for month in sorted(bounds)},
+    }
+    with open(store_dir / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=2, default=str)
+    print(f"✓ Partitions: {len(bounds)} months of {PARTITION_COLUMN} ({start:,} rows indexed)")
+    return manifest
+
+
+def _new_duplicate_detector(store_dir):
+    state_dir = Path(store_dir) / f"{DUPLICATE_KEY}.dedup"
+    if state_dir.exists():
+        shutil.rmtree(state_dir)
+    return DuplicateDetector(state_dir)
+
+
+def write_duplicate_report(store_dir, manifest, detector, rows=False, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Confirm the detector's repeats against the stored ids (drops 64-bit hash collisions) and write
+    <key>.duplicates.csv: one line per repeated id with its first row and number of repeats.
+    rows=True also lists every repeated row in <key>.duplicate_rows.csv; a basket-level id repeats on
+    most rows of the store, so that list is opt-in. The summary is registered in the manifest under 'duplicates'
+    """
+    store_dir = Path(store_dir)
+    found = detector.duplicates()
+    _, ids = _map_column(DUPLICATE_KEY, store_dir, manifest)
+    repeat_rows, first_rows = found['row'].to_numpy(), found['first_row'].to_numpy()
+    # Compared as raw bytes in slices: nothing is decoded but the ids that are written
+    confirmed = np.concatenate([np.asarray(ids[repeat_rows[lo:lo + chunk_rows]]) == np.asarray(ids[first_rows[lo:lo + chunk_rows]])
+                                for lo in range(0, len(repeat_rows), chunk_rows)] or [np.empty(0, dtype=bool)])
+    repeat_rows, first_rows = repeat_rows[confirmed], first_rows[confirmed]
+    firsts, repeats = np.unique(first_rows, return_counts=True)
+    report = pd.DataFrame({
+        DUPLICATE_KEY: np.char.decode(np.asarray(ids[firsts]), 'utf-8').astype(object),
+        'first_row': firsts,
+        'repeats': repeats,
+    })
+    file_name = f"{DUPLICATE_KEY}.duplicates.csv"
+    report.to_csv(store_dir / file_name, index=False)
+    summary = {'rows': int(len(repeat_rows)), 'ids': int(len(report)), 'file': file_name,
+               'state': detector.state_dir.name}
+
+    rows_file = f"{DUPLICATE_KEY}.duplicate_rows.csv"
+    if rows:
+        pd.DataFrame({
+            DUPLICATE_KEY: np.char.decode(np.asarray(ids[repeat_rows]), 'utf-8').astype(object),
+            'row': repeat_rows,
+            'first_row': first_rows,
+        }).to_csv(store_dir / rows_file, index=False)
+        summary['rows_file'] = rows_file
+    elif (store_dir / rows_file).exists():
+        (store_dir / rows_file).unlink()
+    manifest.setdefault('duplicates', {})[DUPLICATE_KEY] = summary
+    print(f"✓ Duplicate {DUPLICATE_KEY}s: {summary['rows']:,} repeated rows of {summary['ids']:,} ids")
+    return report
+
+
+def detect_duplicates(store_dir=STORE_DIR, chunk_rows=None, rows=False):
+    """Rebuild the duplicate detector and report for an existing store in one pass over the id column"""
+    store_dir = Path(store_dir)
+    manifest = read_manifest(store_dir)
+    detector = _new_duplicate_detector(store_dir)
+    for chunk in iter_chunks([DUPLICATE_KEY], store_dir, chunk_rows or DEFAULT_CHUNK_ROWS):
+        detector.add(chunk[DUPLICATE_KEY].to_numpy(dtype=object))
+    detector.save()
+    write_duplicate_report(store_dir, manifest, detector, rows=rows)
+    with open(store_dir / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=2, default=str)
+    return manifest
+
+
+def duplicate_summary(store_dir=STORE_DIR):
+    """Manifest entry of the ingestion duplicate report (rows, ids, file), or None if the store has none"""
+    return read_manifest(store_dir).get('duplicates', {}).get(DUPLICATE_KEY)
+
+
+def load_duplicates(store_dir=STORE_DIR, nrows=None):
+    """The ingestion duplicate report (DataFrame of id, first_row, repeats), or None if the store has none"""
+    spec = duplicate_summary(store_dir)
+    if spec is None:
+        return None
+    return pd.read_csv(Path(store_dir) / spec['file'], dtype={DUPLICATE_KEY: str}, nrows=nrows)
+
+
+def read_manifest(store_dir=STORE_DIR):
+    manifest_path = Path(store_dir) / MANIFEST_NAME
+    if not manifest_path.exists():
+        raise FileNotFoundError(
+            f"No dataset store at {store_dir}. Run: python3 dataset_store.py <csv_path> <store_dir>"
+        )
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def _map_column(name, store_dir, manifest):
+    if name not in manifest['columns']:
+        raise KeyError(f"Column '{name}' not in dataset store {store_dir}")
+    spec = manifest['columns'][name]
+    dtype = np.int32 if spec['kind'] == 'category' else spec['dtype']
+    raw = np.memmap(Path(store_dir) / spec['file'], dtype=dtype, mode='r', shape=(manifest['rows'],))
+    return spec, raw
+
+
+@lru_cache(maxsize=None)
+def _lookup_dtype(path):
+    return pd.CategoricalDtype(np.load(path).tolist(), ordered=False)
+
+
+def _category_dtype(spec, store_dir):
+    if 'lookup' in spec:
+        return _lookup_dtype(str(Path(store_dir) / spec['lookup']))
+    return pd.CategoricalDtype(spec['categories'], ordered=False)
+
+
+def _decode_column(spec, raw, store_dir):
+    if spec['kind'] == 'category':
+        return pd.Categorical.from_codes(raw, dtype=_category_dtype(spec, store_dir))
+    if spec['kind'] == 'bytes':
+        return np.char.decode(raw, 'utf-8').astype(object)
+    return raw
+
+
+def load_column(name, store_dir=STORE_DIR, manifest=None):
+    """Memory-map a single column; numeric data and category codes are not copied"""
+    manifest = manifest or read_manifest(store_dir)
+    spec, raw = _map_column(name, store_dir, manifest)
+    return _decode_column(spec, raw, store_dir)
+
+
+def column_spec(name, store_dir=STORE_DIR):
+    """(kind, dtype) of a stored column; for 'category' columns the dtype is the store-wide CategoricalDtype"""
+    manifest = read_manifest(store_dir)
+    if name not in manifest['columns']:
+        raise KeyError(f"Column '{name}' not in dataset store {store_dir}")
+    spec = manifest['columns'][name]
+    return spec['kind'], _category_dtype(spec, store_dir) if spec['kind'] == 'category' else spec['dtype']
+
+
+def load_dataset(columns=None, store_dir=STORE_DIR):
+    """
+    Load only the requested columns from the dataset store.
+    String columns come back as pandas Categoricals, so group with observed=True.
+    """
+    manifest = read_manifest(store_dir)
+    names = list(manifest['columns']) if columns is None else list(columns)
+    data = {}
+    for name in names:
+        shared = _SHARED_COLUMNS.get((str(store_dir), name))
+        data[name] = shared if shared is not None else load_column(name, store_dir, manifest)
+    return pd.DataFrame(data, copy=False)
+
+
+def share_dataset(columns=None, store_dir=STORE_DIR):
+    """
+    Decode columns once and serve every later load_dataset() from memory: in this process and in
+    worker processes forked from it (the pipeline runner preloads the store this way)
+    """
+    manifest = read_manifest(store_dir)
+    names = list(manifest['columns']) if columns is None else list(columns)
+    for name in names:
+        key = (str(store_dir), name)
+        if key not in _SHARED_COLUMNS:
+            _SHARED_COLUMNS[key] = load_column(name, store_dir, manifest)
+    return len(names)
+
+
+def load_dimension(name, store_dir=STORE_DIR):
+    """
+    Entity attribute table indexed by id, one row per id code (so .iloc[code] and .loc[id] are O(1)).
+    Attributes come back as Categoricals sharing the store dictionaries.
+    """
+    manifest = read_manifest(store_dir)
+    spec = manifest.get('dimensions', {}).get(name)
+    if spec is None:
+        raise KeyError(f"No {name} in dataset store {store_dir}. Run: python3 dataset_store.py --dimensions {store_dir}")
+    arrays = np.load(Path(store_dir) / spec['file'])
+    key_dtype = _category_dtype(manifest['columns'][spec['key']], store_dir)
+    data = {
+        attribute: pd.Categorical.from_codes(arrays[attribute],
+                                             dtype=_category_dtype(manifest['columns'][attribute], store_dir))
+        for attribute in spec['attributes']
+    }
+    return pd.DataFrame(data, index=pd.Index(key_dtype.categories, name=spec['key']))
+
+
+def join_dimension(grouped, name, attributes=None, store_dir=STORE_DIR):
+    """
+    Attach dimension attributes to a frame indexed by the dimension key (e.g. groupby('store_id').agg(...)).
+    Same layout as grouping by [key, *attributes] followed by reset_index().
+    """
+    dimension = load_dimension(name, store_dir)
+    attributes = list(dimension.columns) if attributes is None else list(attributes)
+    positions = dimension.index.get_indexer(grouped.index)
+    result = grouped.reset_index()
+    for offset, attribute in enumerate(attributes, start=1):
+        result.insert(offset, attribute, dimension[attribute].to_numpy()[positions])
+    return result
+
+
+def bytes_dictionary(name, store_dir=STORE_DIR, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Sorted distinct values of a 'bytes' column (e.g. transaction_id), merged chunk by chunk so memory
+    stays bounded by the distinct count. Raw values, not decoded: search it with the column's bytes.
+    """
+    manifest = read_manifest(store_dir)
+    spec, raw = _map_column(name, store_dir, manifest)
+    if spec['kind'] != 'bytes':
+        raise ValueError(f"Column '{name}' is stored as {spec['kind']}, not bytes")
+    values = np.empty(0, dtype=spec['dtype'])
+    for lo in range(0, manifest['rows'], chunk_rows):
+        values = np.union1d(values, raw[lo:lo + chunk_rows])
+    return values
+
+
+def iter_chunks(columns=None, store_dir=STORE_DIR, chunk_rows=DEFAULT_CHUNK_ROWS, coded=()):
+    """
+    Yield the store as DataFrames of at most chunk_rows rows; only one slice is decoded at a time.
+    Categoricals share the store-wide dictionary, so codes line up across chunks.
+    Bytes columns named in `coded` come back as Categoricals too, over bytes_dictionary() (one
+    extra pass over the column), so exact distinct counts can use code bitmaps instead of hashes.
+    """
+    manifest = read_manifest(store_dir)
+    names = list(manifest['columns']) if columns is None else list(columns)
+    mapped = {name: _map_column(name, store_dir, manifest) for name in names}
+    dictionaries = {}
+    for name in coded:
+        values = bytes_dictionary(name, store_dir, chunk_rows)
+        dictionaries[name] = (values, pd.CategoricalDtype(np.char.decode(values, 'utf-8').astype(object)))
+    for lo in range(0, manifest['rows'], chunk_rows):
+        hi = min(lo + chunk_rows, manifest['rows'])
+        data = {}
+        for name, (spec, raw) in mapped.items():
+            if name in dictionaries:
+                values, dtype = dictionaries[name]
+                codes = np.searchsorted(values, raw[lo:hi]).astype(np.int32)
+                data[name] = pd.Categorical.from_codes(codes, dtype=dtype)
+            else:
+                data[name] = _decode_column(spec, raw[lo:hi], store_dir)
+        yield pd.DataFrame(data, index=pd.RangeIndex(lo, hi), copy=False)
+
+
+def _as_set(value):
+    return None if value is None else {int(v) for v in (value if np.iterable(value) else [value])}
+
+
+def partition_months(store_dir=STORE_DIR, year=None, quarter=None, month=None, start=None, end=None):
+    """
+    'YYYY-MM' partitions that can hold rows matching every given predicate: year / quarter / month
+    take a value or a collection, start / end a timestamp range (start inclusive, end exclusive)
+    """
+    spec = read_manifest(store_dir).get('partitions')
+    if spec is None:
+        raise KeyError(f"No partition index in dataset store {store_dir}. Run: python3 dataset_store.py --partitions {store_dir}")
+    years, quarters, months = _as_set(year), _as_set(quarter), _as_set(month)
+    start = None if start is None else pd.Timestamp(start)
+    end = None if end is None else pd.Timestamp(end)
+    selected = []
+    for name in spec['months']:
+        first = pd.Timestamp(name)
+        if ((years is None or first.year in years) and (quarters is None or first.quarter in quarters)
+                and (months is None or first.month in months)
+                and (start is None or first + pd.DateOffset(months=1) > start) and (end is None or first < end)):
+            selected.append(name)
+    return selected
+
+
+def partition_rows(store_dir=STORE_DIR, **predicates):
+    """
+    Ascending row ids matching the predicates of partition_months(). Whole partitions are slices
+    of the index; only the (at most two) months cut by start / end are filtered on the timestamp.
+    """
+    manifest = read_manifest(store_dir)
+    months = partition_months(store_dir, **predicates)
+    index = np.load(Path(store_dir) / manifest['partitions']['file'], mmap_mode='r')
+    start, end = predicates.get('start'), predicates.get('end')
+    parts = []
+    for name in months:
+        lo, hi = manifest['partitions']['months'][name]
+        rows = np.asarray(index[lo:hi])
+        first, after = pd.Timestamp(name), pd.Timestamp(name) + pd.DateOffset(months=1)
+        cut = (start is not None and pd.Timestamp(start) > first) or (end is not None and pd.Timestamp(end) < after)
+        if cut:
+            _, timestamps = _map_column(manifest['partitions']['column'], store_dir, manifest)
+            values = timestamps[rows]
+            keep = np.ones(len(rows), dtype=bool)
+            if start is not None:
+                keep &= values >= np.datetime64(pd.Timestamp(start))
+            if end is not None:
+                keep &= values < np.datetime64(pd.Timestamp(end))
+            rows = rows[keep]
+        parts.append(rows)
+    # Each partition is already sorted, so the stable sort only merges the runs
+    return np.sort(np.concatenate(parts), kind='stable') if parts else np.empty(0, dtype=np.int64)
+
+
+def load_partitions(columns=None, store_dir=STORE_DIR, **predicates):
+    """
+    load_dataset() restricted to the rows of the partitions matching the time predicates (see
+    partition_months), e.g. load_partitions(['total_amount'], year=2023, month=range(1, 7)).
+    Only those rows are read; the index holds their store row ids, in store order.
+    """
+    manifest = read_manifest(store_dir)
+    names = list(manifest['columns']) if columns is None else list(columns)
+    rows = partition_rows(store_dir, **predicates)
+    data = {}
+    for name in names:
+        shared = _SHARED_COLUMNS.get((str(store_dir), name))
+        if shared is not None:
+            data[name] = shared.take(rows) if hasattr(shared, 'take') else shared[rows]
+        else:
+            spec, raw = _map_column(name, store_dir, manifest)
+            data[name] = _decode_column(spec, raw[rows], store_dir)
+    return pd.DataFrame(data, index=pd.Index(rows), copy=False)
+
+
+def id_codes(series):
+    """(int32 codes, lookup labels) of a dictionary-encoded id column; -1 marks nulls"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    codes, labels = pd.factorize(series, sort=True)
+    return codes.astype(np.int32), pd.Index(labels)
+
+
+def sums_by_code(codes, values, size, mask=None):
+    """Per-code sums of `values` (optionally only rows where `mask`), as a dense array of length `size`"""
+    valid = codes >= 0 if mask is None else (codes >= 0) & mask
+    return np.bincount(codes[valid], weights=np.asarray(values, dtype=np.float64)[valid], minlength=size)
+
+
+def first_rows_by_code(codes, size):
+    """Row position of each code's first occurrence (-1 for codes that never occur)"""
+    first = np.full(size, -1, dtype=np.int64)
+    valid = np.flatnonzero(codes >= 0)
+    present, positions = np.unique(codes[valid], return_index=True)
+    first[present] = valid[positions]
+    return first
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--dimensions':
+        build_dimensions(sys.argv[2] if len(sys.argv) > 2 else STORE_DIR)
+    elif len(sys.argv) > 1 and sys.argv[1] == '--duplicates':
+        paths = [arg for arg in sys.argv[2:] if arg != '--rows']
+        detect_duplicates(paths[0] if paths else STORE_DIR, rows='--rows' in sys.argv)
+    elif len(sys.argv) > 1 and sys.argv[1] == '--partitions':
+        build_partitions(sys.argv[2] if len(sys.argv) > 2 else STORE_DIR)
+    else:
+        csv_arg = sys.argv[1] if len(sys.argv) > 1 else DATA_FILE
+        store_arg = sys.argv[2] if len(sys.argv) > 2 else STORE_DIR
+        ingest_csv(csv_arg, store_arg)
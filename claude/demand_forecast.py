@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Batch Demand Forecasting
+Unit demand forecasts for every store_id × product_id series, fitted over a 2-D NumPy
+array (series × periods) at once instead of one series at a time
+
+    matrix = demand_matrix(freq='W')                      # one streaming pass over the store
+    result = forecast_series(matrix.values, horizon=13, season=52)
+    write_forecasts(matrix, result)                       # columnar, metadata_ceo/demand_forecast/
+    forecasts = load_forecasts()                          # store_id, product_id, period, forecast, model
+
+Models (every one vectorized across series; smoothing parameters picked per series from a
+small grid, all grid points evaluated together):
+    seasonal_naive  the value one season earlier
+    ses             simple exponential smoothing (flat forecast)
+    holt_winters    additive level + trend + season
+Smoothing parameters are picked on one-step-ahead error; each series then keeps the model
+with the lowest MAE on a holdout of its last `horizon` periods, refitted on the full history.
+
+Blocks of series are fitted in a fork-based process pool; workers inherit the matrix
+copy-on-write and only receive block bounds.
+
+Usage: python3 demand_forecast.py [--freq W|M] [--horizon N] [--jobs N]
+"""
+
+import json
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import METADATA_CEO_DIR, STORE_DIR, iter_chunks
+from partition_executor import map_blocks
+
+FORECAST_DIR = METADATA_CEO_DIR / "demand_forecast"
+MANIFEST_NAME = 'manifest.json'
+
+# freq → (numpy period unit, season length, default horizon)
+FREQUENCIES = {
+    'W': ('W', 52, 13),
+    'M': ('M', 12, 3),
+}
+DEFAULT_FREQ = 'W'
+BLOCK_SERIES = 2048
+
+MODELS = ('seasonal_naive', 'ses', 'holt_winters')
+SES_ALPHAS = np.array([0.05, 0.1, 0.2, 0.3, 0.5, 0.7])
+HW_GRID = np.array([(alpha, beta, gamma)
+                    for alpha in (0.1, 0.3, 0.5) for beta in (0.01, 0.1) for gamma in (0.05, 0.2)])
+
+DemandMatrix = namedtuple('DemandMatrix', ['values', 'store_codes', 'product_codes', 'store_labels',
+                                           'product_labels', 'periods', 'freq'])
+# mae: the chosen model's error on the holdout periods
+ForecastResult = namedtuple('ForecastResult', ['forecast', 'model', 'mae'])
+
+# ----------------------------------------------------------------------
+# Series matrix
+# ----------------------------------------------------------------------
+def demand_matrix(freq=DEFAULT_FREQ, value='quantity', store_dir=STORE_DIR):
+    """
+    Units per store × product × period, dense (series × periods) for every series with any
+    sales. Partial periods at either end of the data are dropped.
+    """
+    unit = FREQUENCIES[freq][0]
+    first = last = None
+    for chunk in iter_chunks(['timestamp'], store_dir):
+        days = chunk['timestamp'].to_numpy().astype('datetime64[D]')
+        first = days.min() if first is None else min(first, days.min())
+        last = days.max() if last is None else max(last, days.max())
+    # Whole periods only: the first period starting on/after `first`, the last ending by `last`
+    start = first.astype(f'datetime64[{unit}]')
+    if start.astype('datetime64[D]') < first:
+        start += 1
+    stop = last.astype(f'datetime64[{unit}]')
+    if (stop + 1).astype('datetime64[D]') - 1 > last:
+        stop -= 1
+    n_periods = int((stop - start).astype(np.int64)) + 1
+
+    totals = store_labels = product_labels = None
+    for chunk in iter_chunks(['timestamp', 'store_id', 'product_id', value], store_dir):
+        if totals is None:
+            store_labels = chunk['store_id'].cat.categories
+            product_labels = chunk['product_id'].cat.categories
+            totals = np.zeros(len(store_labels) * len(product_labels) * n_periods)
+        period = (chunk['timestamp'].to_numpy().astype(f'datetime64[{unit}]') - start).astype(np.int64)
+        stores = chunk['store_id'].cat.codes.to_numpy().astype(np.int64)
+        products = chunk['product_id'].cat.codes.to_numpy().astype(np.int64)
+        keep = (period >= 0) & (period < n_periods) & (stores >= 0) & (products >= 0)
+        flat = (stores[keep] * len(product_labels) + products[keep]) * n_periods + period[keep]
+        totals += np.bincount(flat, weights=chunk[value].to_numpy(dtype=np.float64)[keep], minlength=len(totals))
+
+    values = totals.reshape(-1, n_periods)
+    active = np.flatnonzero(values.sum(axis=1) > 0)
+    periods = start + np.arange(n_periods)
+    return DemandMatrix(values[active], (active // len(product_labels)).astype(np.int32),
+                        (active % len(product_labels)).astype(np.int32), store_labels, product_labels,
+                        periods.astype('datetime64[D]'), freq)
+
+
+# ----------------------------------------------------------------------
+# Models: Y is (series × periods); each returns the forecast (series × horizon). Grid
+# parameters are chosen per series on one-step error over the last season of the history
+# (or as much of it as follows the initial season)
+# ----------------------------------------------------------------------
+def _window(T, season):
+    return min(season, T - season) if T > season else T - 1
+
+
+def seasonal_naive(Y, horizon, season):
+    T = Y.shape[1]
+    return Y[:, T - season + np.arange(horizon) % season]
+
+
+def ses(Y, horizon, season, alphas=SES_ALPHAS):
+    """Every alpha in the grid at once: level state is (alphas × series)"""
+    T = Y.shape[1]
+    window = _window(T, season)
+    a = alphas[:, None]
+    level = np.repeat(Y[None, :, 0], len(alphas), axis=0)
+    error = np.zeros_like(level)
+    for t in range(1, T):
+        y = Y[None, :, t]
+        if t >= T - window:
+            error += np.abs(y - level)
+        level = a * y + (1 - a) * level
+    best = error.argmin(axis=0)
+    series = np.arange(Y.shape[0])
+    return np.repeat(level[best, series][:, None], horizon, axis=1)
+
+
+def holt_winters(Y, horizon, season, grid=HW_GRID):
+    """
+    Additive Holt-Winters over every (alpha, beta, gamma) in the grid at once. Initialised from
+    the first season (level = its mean, trend = 0, season = deviations from the mean).
+    """
+    T = Y.shape[1]
+    window = _window(T, season)
+    a, b, g = (grid[:, i, None] for i in range(3))
+    level = np.repeat(Y[None, :, :season].mean(axis=2), len(grid), axis=0)
+    trend = np.zeros_like(level)
+    seasonal = np.repeat((Y[:, :season] - Y[:, :season].mean(axis=1, keepdims=True))[None], len(grid), axis=0)
+    error = np.zeros_like(level)
+    for t in range(season, T):
+        y = Y[None, :, t]
+        s = seasonal[:, :, t % season]
+        if t >= T - window:
+            error += np.abs(y - (level + trend + s))
+        new_level = a * (y - s) + (1 - a) * (level + trend)
+        trend = b * (new_level - level) + (1 - b) * trend
+        seasonal[:, :, t % season] = g * (y - new_level) + (1 - g) * s
+        level = new_level
+    best = error.argmin(axis=0)
+    series = np.arange(Y.shape[0])
+    steps = np.arange(1, horizon + 1)
+    return (level[best, series][:, None] + steps[None, :] * trend[best, series][:, None]
+            + seasonal[best, series][:, (T + steps - 1) % season])
+
+
+MODEL_FUNCTIONS = {'seasonal_naive': seasonal_naive, 'ses': ses, 'holt_winters': holt_winters}
+
+
+def forecast_block(Y, horizon, season, models=MODELS):
+    """Best model per series by MAE on the last `horizon` periods held out, refitted on all of Y"""
+    T = Y.shape[1]
+    holdout = min(horizon, T - 2)
+    if T - holdout <= season:
+        # Not enough history for a seasonal model on the shortened series
+        models = [model for model in models if model == 'ses'] or ['ses']
+    errors = np.vstack([
+        np.abs(MODEL_FUNCTIONS[model](Y[:, :T - holdout], holdout, season) - Y[:, T - holdout:]).mean(axis=1)
+        for model in models
+    ])
+    best = errors.argmin(axis=0)
+    series = np.arange(Y.shape[0])
+    forecasts = np.stack([MODEL_FUNCTIONS[model](Y, horizon, season) for model in models])
+    model_codes = np.array([MODELS.index(model) for model in models], dtype=np.int8)[best]
+    return ForecastResult(np.clip(forecasts[best, series], 0, None).astype(np.float32), model_codes,
+                          errors[best, series].astype(np.float32))
+
+
+def _forecast_block(bounds, shared):
+    start, stop = bounds
+    return forecast_block(shared['values'][start:stop], shared['horizon'], shared['season'], shared['models'])
+
+
+def forecast_series(values, horizon, season, models=MODELS, processes=None, block_series=BLOCK_SERIES):
+    """Forecast every row of `values`, in blocks across a process pool (serial for a single block/worker)"""
+    tasks = [(start, min(start + block_series, len(values))) for start in range(0, len(values), block_series)]
+    results = map_blocks(_forecast_block, tasks,
+                         {'values': values, 'horizon': horizon, 'season': season, 'models': models}, processes)
+    if not results:
+        return ForecastResult(np.empty((0, horizon), np.float32), np.empty(0, np.int8), np.empty(0, np.float32))
+    return ForecastResult(*(np.concatenate(parts) for parts in zip(*results)))
+
+
+# ----------------------------------------------------------------------
+# Columnar output
+# ----------------------------------------------------------------------
+def write_forecasts(matrix, result, out_dir=FORECAST_DIR, extra=None):
+    """
+    One row per series × forecast period, one .npy file per column; store_id / product_id /
+    model are int codes whose labels are kept in the manifest
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    n_series, horizon = result.forecast.shape
+    periods = (matrix.periods[-1].astype(f'datetime64[{FREQUENCIES[matrix.freq][0]}]')
+               + np.arange(1, horizon + 1)).astype('datetime64[D]')
+    columns = {
+        'store_id': np.repeat(matrix.store_codes, horizon),
+        'product_id': np.repeat(matrix.product_codes, horizon),
+        'period': np.tile(periods, n_series),
+        'forecast': result.forecast.ravel(),
+        'model': np.repeat(result.model, horizon),
+        'mae': np.repeat(result.mae, horizon),
+    }
+    for name, array in columns.items():
+        np.save(out_dir / f"{name}.npy", array)
+    manifest = {
+        'rows': int(n_series * horizon),
+        'series': int(n_series),
+        'freq': matrix.freq,
+        'horizon': int(horizon),
+        'history': [str(matrix.periods[0]), str(matrix.periods[-1])],
+        'columns': {name: str(array.dtype) for name, array in columns.items()},
+        'labels': {
+            'store_id': [str(label) for label in matrix.store_labels],
+            'product_id': [str(label) for label in matrix.product_labels],
+            'model': list(MODELS),
+        },
+        'models': {model: int((result.model == i).sum()) for i, model in enumerate(MODELS)},
+    }
+    manifest.update(extra or {})
+    with open(out_dir / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_forecasts(out_dir=FORECAST_DIR, columns=None):
+    """Forecast table as a DataFrame (columns memory-mapped; coded columns as Categoricals)"""
+    out_dir = Path(out_dir)
+    with open(out_dir / MANIFEST_NAME) as f:
+        manifest = json.load(f)
+    data = {}
+    for name in columns or manifest['columns']:
+        array = np.load(out_dir / f"{name}.npy", mmap_mode='r')
+        labels = manifest['labels'].get(name)
+        data[name] = pd.Categorical.from_codes(array, labels) if labels else array
+    return pd.DataFrame(data, copy=False)
+
+
+def demand_forecast(freq=DEFAULT_FREQ, horizon=None, processes=None, store_dir=STORE_DIR, out_dir=FORECAST_DIR):
+    print("=" * 80)
+    print("BATCH DEMAND FORECASTING (store × product)")
+    print("=" * 80)
+    _, season, default_horizon = FREQUENCIES[freq]
+    horizon = horizon or default_horizon
+
+    start = time.time()
+    matrix = demand_matrix(freq, store_dir=store_dir)
+    load_seconds = time.time() - start
+    print(f"✓ {len(matrix.values):,} series × {matrix.values.shape[1]} periods "
+          f"({matrix.periods[0]} … {matrix.periods[-1]}) in {load_seconds:.2f}s")
+
+    start = time.time()
+    result = forecast_series(matrix.values, horizon, season, processes=processes)
+    fit_seconds = time.time() - start
+    print(f"✓ Fitted {len(MODELS)} models per series, horizon {horizon} in {fit_seconds:.2f}s")
+
+    manifest = write_forecasts(matrix, result, out_dir,
+                               extra={'seconds': {'matrix': round(load_seconds, 3), 'fit': round(fit_seconds, 3)}})
+    for model, count in manifest['models'].items():
+        print(f"  {model:15s} best for {count:,} series")
+    total = result.forecast.sum(axis=0)
+    print(f"  Forecast units per period: " + ", ".join(f"{units:,.0f}" for units in total[:6])
+          + (" …" if horizon > 6 else ""))
+    print(f"✓ {manifest['rows']:,} forecast rows written (columnar) → {out_dir}")
+    return manifest
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    freq_arg = args[args.index('--freq') + 1] if '--freq' in args else DEFAULT_FREQ
+    horizon_arg = int(args[args.index('--horizon') + 1]) if '--horizon' in args else None
+    jobs_arg = int(args[args.index('--jobs') + 1]) if '--jobs' in args else None
+    demand_forecast(freq_arg, horizon_arg, jobs_arg)
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Distinct Counting
+Exact and approximate distinct counts that work chunk by chunk and merge across chunks,
+processes or days
+
+    HyperLogLog / GroupedHyperLogLog   approximate (~0.8% error at precision 14), bounded memory
+                                       per sketch, registers merge by element-wise max
+    RoaringBitmap / GroupedBitmap      exact sets of non-negative integers (factorized id codes),
+                                       split into 2^16-value containers that are sorted uint16
+                                       arrays while sparse and dense flags once full
+    distinct_count / distinct_counts_by  exact in-memory counts on id codes (no hashing)
+
+Grouped structures are keyed by 64-bit group hashes, so partial states built over different
+chunks line up when merged. Bitmaps need values from a shared dictionary (the dataset store
+categoricals, whose codes are stable across chunks); anything else goes through hash_values().
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_HLL_PRECISION = 14
+# Sparse containers switch to a dense flag array beyond this many values (as in Roaring bitmaps)
+ARRAY_CONTAINER_LIMIT = 4096
+CONTAINER_BITS = 16
+
+
+def hash_values(values):
+    """64-bit hash per value (nulls included; drop them first when they should not count)"""
+    if isinstance(values, pd.Series):
+        return pd.util.hash_pandas_object(values, index=False).to_numpy()
+    return pd.util.hash_array(np.asarray(values))
+
+
+def value_codes(series):
+    """(codes, width) for a column with a stable dictionary (categoricals), else None"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy().astype(np.int64), len(series.cat.categories)
+    return None
+
+
+def _bit_length(values):
+    """Vectorized int.bit_length() for uint64 arrays"""
+    values = values.copy()
+    length = np.zeros(len(values), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = values >= np.uint64(1 << shift)
+        length[big] += shift
+        values[big] >>= np.uint64(shift)
+    length += (values > 0).astype(np.uint8)
+    return length
+
+
+def _register_updates(hashes, precision):
+    """(register index, rank) per hash: top `precision` bits pick the register, rank = leading zeros + 1 of the rest"""
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    remaining = 64 - precision
+    index = (hashes >> np.uint64(remaining)).astype(np.int64)
+    rest = hashes & np.uint64((1 << remaining) - 1)
+    rank = (remaining - _bit_length(rest).astype(np.int64) + 1).astype(np.uint8)
+    return index, rank
+
+
+def _estimate(registers):
+    """HyperLogLog cardinality estimate per row of a (groups, m) register matrix, with small-range correction"""
+    registers = np.atleast_2d(registers)
+    m = registers.shape[1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)), axis=1)
+    zeros = np.count_nonzero(registers == 0, axis=1)
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+class HyperLogLog:
+    """Approximate distinct count of a stream of values"""
+
+    def __init__(self, precision=DEFAULT_HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, values):
+        return self.add_hashes(hash_values(values))
+
+    def add_hashes(self, hashes):
+        index, rank = _register_updates(hashes, self.precision)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge HyperLogLog sketches of precision {self.precision} and {other.precision}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        return int(round(_estimate(self.registers)[0]))
+
+
+class _GroupIndex:
+    """Dense row number per 64-bit group hash, assigned in first-seen order"""
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.uint64)      # row → group hash
+        self._sorted = np.empty(0, dtype=np.uint64)
+        self._sorted_rows = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, group_hashes):
+        """Rows of known groups; -1 for unknown ones"""
+        group_hashes = np.asarray(group_hashes, dtype=np.uint64)
+        if not len(self._sorted):
+            return np.full(len(group_hashes), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self._sorted, group_hashes), len(self._sorted) - 1)
+        found = self._sorted[pos] == group_hashes
+        rows = np.full(len(group_hashes), -1, dtype=np.int64)
+        rows[found] = self._sorted_rows[pos[found]]
+        return rows
+
+    def rows(self, group_hashes):
+        """Rows for `group_hashes`, registering new groups"""
+        rows = self.lookup(group_hashes)
+        if (rows < 0).any():
+            new_keys = pd.unique(np.asarray(group_hashes, dtype=np.uint64)[rows < 0])
+            new_rows = np.arange(len(self.keys), len(self.keys) + len(new_keys))
+            self.keys = np.concatenate([self.keys, new_keys])
+            keys = np.concatenate([self._sorted, new_keys])
+            order = np.argsort(keys, kind='stable')
+            self._sorted = keys[order]
+            self._sorted_rows = np.concatenate([self._sorted_rows, new_rows])[order]
+            rows = self.lookup(group_hashes)
+        return rows
+
+
+class GroupedHyperLogLog:
+    """
+    One HyperLogLog per group, keyed by group hash. Registers are stored sparsely as sorted
+    (group row × m + register) cells with their max rank, so many small groups stay cheap
+    """
+
+    def __init__(self, precision=DEFAULT_HLL_PRECISION):
+        self.precision = precision
+        self.groups = _GroupIndex()
+        self.cells = np.empty(0, dtype=np.int64)
+        self.ranks = np.empty(0, dtype=np.uint8)
+        self._pending = []
+        self._pending_rows = 0
+
+    def add_hashes(self, group_hashes, value_hashes):
+        rows = self.groups.rows(group_hashes)
+        index, rank = _register_updates(value_hashes, self.precision)
+        self._pending.append(((rows << self.precision) + index, rank))
+        self._pending_rows += len(rows)
+        # Amortized compaction, as in the streaming aggregator's per-group value bags
+        if self._pending_rows > max(len(self.cells), 1_000_000):
+            self.compact()
+        return self
+
+    def compact(self):
+        if not self._pending:
+            return
+        cells = np.concatenate([self.cells] + [c for c, _ in self._pending])
+        ranks = np.concatenate([self.ranks] + [r for _, r in self._pending])
+        self._pending, self._pending_rows = [], 0
+        # Max rank per register: sort by (cell, rank) and keep the last of each cell
+        order = np.lexsort((ranks, cells))
+        cells, ranks = cells[order], ranks[order]
+        last = np.r_[cells[1:] != cells[:-1], True] if len(cells) else np.empty(0, dtype=bool)
+        self.cells, self.ranks = cells[last], ranks[last]
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge HyperLogLog sketches of precision {self.precision} and {other.precision}")
+        other.compact()
+        rows = self.groups.rows(other.groups.keys)
+        other_rows = other.cells >> other.precision
+        registers = other.cells & ((1 << other.precision) - 1)
+        self._pending.append(((rows[other_rows] << self.precision) + registers, other.ranks))
+        self._pending_rows += len(other.cells)
+        return self
+
+    def counts(self, group_hashes):
+        """Estimated distinct count for each of `group_hashes` (0 for groups never seen)"""
+        self.compact()
+        m = 1 << self.precision
+        rows = self.cells >> self.precision
+        touched = np.bincount(rows, minlength=len(self.groups))
+        # Untouched registers are rank 0 and contribute 2^0 each
+        harmonic = np.bincount(rows, weights=np.ldexp(1.0, -self.ranks.astype(np.int64)), minlength=len(self.groups))
+        harmonic += m - touched
+        zeros = m - touched
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / harmonic
+        linear = m * np.log(m / np.maximum(zeros, 1))
+        estimates = np.round(np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)).astype(np.int64)
+        lookup = self.groups.lookup(group_hashes)
+        return np.where(lookup >= 0, estimates[np.maximum(lookup, 0)], 0) if len(estimates) else \
+            np.zeros(len(lookup), dtype=np.int64)
+
+
+def _union_container(container, low):
+    """Union of a container with sorted unique uint16 values; promotes to a dense container when full"""
+    if container is not None and container.dtype == bool:
+        container[low] = True
+        return container
+    merged = low if container is None else np.union1d(container, low)
+    if len(merged) > ARRAY_CONTAINER_LIMIT:
+        dense = np.zeros(1 << CONTAINER_BITS, dtype=bool)
+        dense[merged] = True
+        return dense
+    return merged.astype(np.uint16)
+
+
+class RoaringBitmap:
+    """Exact set of non-negative integers, stored as 2^16-value containers keyed by the high bits"""
+
+    def __init__(self):
+        self._containers = {}
+
+    def add(self, values):
+        values = np.unique(np.asarray(values, dtype=np.int64))
+        if len(values) and values[0] < 0:
+            raise ValueError("RoaringBitmap holds non-negative integers only")
+        high = values >> CONTAINER_BITS
+        low = (values & ((1 << CONTAINER_BITS) - 1)).astype(np.uint16)
+        starts = np.flatnonzero(np.r_[True, high[1:] != high[:-1]]) if len(values) else []
+        stops = np.r_[starts[1:], len(values)] if len(values) else []
+        for start, stop in zip(starts, stops):
+            key = int(high[start])
+            self._containers[key] = _union_container(self._containers.get(key), low[start:stop])
+        return self
+
+    def merge(self, other):
+        for key, container in other._containers.items():
+            low = np.flatnonzero(container).astype(np.uint16) if container.dtype == bool else container
+            self._containers[key] = _union_container(self._containers.get(key), low)
+        return self
+
+    def __len__(self):
+        return int(sum(np.count_nonzero(c) if c.dtype == bool else len(c) for c in self._containers.values()))
+
+    def to_array(self):
+        """All values, sorted"""
+        parts = []
+        for key in sorted(self._containers):
+            container = self._containers[key]
+            low = np.flatnonzero(container) if container.dtype == bool else container.astype(np.int64)
+            parts.append((np.int64(key) << CONTAINER_BITS) | low)
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+
+class GroupedBitmap:
+    """Exact distinct value codes per group: one bitmap over (group row × width + value code)"""
+
+    def __init__(self, width):
+        self.width = width
+        self.groups = _GroupIndex()
+        self.bitmap = RoaringBitmap()
+
+    def add(self, group_hashes, codes):
+        codes = np.asarray(codes, dtype=np.int64)
+        valid = codes >= 0
+        rows = self.groups.rows(np.asarray(group_hashes, dtype=np.uint64)[valid])
+        self.bitmap.add(rows * self.width + codes[valid])
+        return self
+
+    def _widen(self, width):
+        # Dictionaries only grow by appending values, so codes keep their meaning at the new width
+        values = self.bitmap.to_array()
+        self.bitmap = RoaringBitmap()
+        self.bitmap.add((values // self.width) * width + values % self.width)
+        self.width = width
+
+    def merge(self, other):
+        """Union with another state; codes must come from the same (possibly since extended) dictionary"""
+        if other.width > self.width:
+            self._widen(other.width)
+        values = other.bitmap.to_array()
+        return self.add(other.groups.keys[values // other.width], values % other.width)
+
+    def counts(self, group_hashes):
+        per_row = np.bincount(self.bitmap.to_array() // self.width, minlength=len(self.groups))
+        rows = self.groups.lookup(group_hashes)
+        return np.where(rows >= 0, per_row[np.maximum(rows, 0)], 0) if len(per_row) else np.zeros(len(rows), np.int64)
+
+
+def distinct_count(series):
+    """Exact number of distinct non-null values; id columns are counted on their codes with a presence bitmap"""
+    coded = value_codes(series)
+    if coded is None:
+        return int(series.nunique())
+    codes, width = coded
+    present = np.zeros(width, dtype=bool)
+    present[codes[codes >= 0]] = True
+    return int(np.count_nonzero(present))
+
+
+def distinct_counts_by(groups, values):
+    """Exact distinct `values` per observed group, indexed and sorted like groupby(groups, observed=True).nunique()"""
+    group_coded, value_coded = value_codes(groups), value_codes(values)
+    if group_coded is None or value_coded is None:
+        return values.groupby(groups, observed=True).nunique()
+    group_codes, group_width = group_coded
+    codes, width = value_coded
+    valid = (group_codes >= 0) & (codes >= 0)
+    pairs = np.unique(group_codes[valid] * width + codes[valid])
+    counts = np.bincount(pairs // width, minlength=group_width)
+    observed = np.zeros(group_width, dtype=bool)
+    observed[group_codes[group_codes >= 0]] = True
+    index = pd.CategoricalIndex(groups.cat.categories[observed], dtype=groups.dtype, name=groups.name)
+    return pd.Series(counts[observed], index=index, name=values.name)
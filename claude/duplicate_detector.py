@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Streaming Duplicate Detection
+Finds repeated ids (transaction_id) chunk by chunk with bounded memory, reporting the
+row offset of every repeat and of the id's first occurrence
+
+    detector = DuplicateDetector(store_dir / 'transaction_id.dedup')
+    for chunk in chunks:
+        detector.add(chunk['transaction_id'])
+    detector.save()
+    duplicates = detector.duplicates()        # id_hash, row, first_row
+
+How it works:
+    1. every id is hashed to 64 bits
+    2. a Bloom filter answers "possibly seen before" for each hash; only those hashes (and
+       hashes repeated inside the chunk) become candidates, everything else is new for sure
+    3. each chunk's (hash, row) pairs are sorted and spilled to disk as a run; candidates are
+       confirmed exactly by binary search over the memory-mapped runs
+
+The filter, runs and candidates persist in the state directory, so appending a new daily
+file continues from the existing rows (see seen() to drop already-ingested ids).
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Bloom filter sizing: ~29 MB of bits for 24M ids at a 1% false positive rate. Exceeding the
+# capacity only raises the candidate rate; confirmation stays exact.
+DEFAULT_CAPACITY = 24_000_000
+DEFAULT_ERROR_RATE = 0.01
+
+RUN_DTYPE = np.dtype([('hash', '<u8'), ('row', '<i8')])
+STATE_NAME = 'state.json'
+
+
+def hash_ids(ids):
+    """64-bit hash per id value"""
+    return pd.util.hash_array(np.asarray(ids, dtype=object))
+
+
+class BloomFilter:
+    """Bit array with k probe positions per 64-bit hash (double hashing on its two halves)"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE, size=None, probes=None, bits=None):
+        self.size = size or int(np.ceil(-capacity * np.log(error_rate) / np.log(2) ** 2))
+        self.probes = probes or max(1, int(round(self.size / capacity * np.log(2))))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8) if bits is None else bits
+
+    def _positions(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        h1 = (hashes & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        h2 = (hashes >> np.uint64(32)).astype(np.int64) | 1
+        probes = np.arange(self.probes, dtype=np.int64)
+        return (h1[:, None] + probes[None, :] * h2[:, None]) % self.size
+
+    def contains(self, hashes):
+        positions = self._positions(hashes)
+        present = self.bits[positions >> 3] & (np.uint8(1) << (positions & 7).astype(np.uint8))
+        return (present != 0).all(axis=1)
+
+    def add(self, hashes):
+        positions = self._positions(hashes).ravel()
+        np.bitwise_or.at(self.bits, positions >> 3, (np.uint8(1) << (positions & 7).astype(np.uint8)))
+
+
+class DuplicateDetector:
+
+    def __init__(self, state_dir, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+        self.state_dir = Path(state_dir)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        state_path = self.state_dir / STATE_NAME
+        if state_path.exists():
+            # Resume: continue row offsets and runs of earlier ingests
+            with open(state_path) as f:
+                state = json.load(f)
+            self.rows = state['rows']
+            self.runs = state['runs']
+            self.bloom = BloomFilter(size=state['bloom_size'], probes=state['probes'],
+                                     bits=np.load(self.state_dir / 'bloom.npy'))
+            self._candidates = [np.load(self.state_dir / 'candidates.npy')]
+        else:
+            self.rows = 0
+            self.runs = []
+            self.bloom = BloomFilter(capacity, error_rate)
+            self._candidates = []
+
+    def _write_run(self, hashes, rows):
+        run = np.empty(len(hashes), dtype=RUN_DTYPE)
+        order = np.argsort(hashes, kind='stable')
+        run['hash'], run['row'] = hashes[order], rows[order]
+        name = f"run_{len(self.runs):05d}.npy"
+        np.save(self.state_dir / name, run)
+        self.runs.append(name)
+
+    def add(self, ids):
+        """Record a chunk of ids at the next row offsets; returns the candidate (possible repeat) mask"""
+        hashes = hash_ids(ids)
+        rows = np.arange(self.rows, self.rows + len(hashes), dtype=np.int64)
+        maybe_seen = self.bloom.contains(hashes)
+        # Repeats inside the chunk are invisible to the filter until it is updated
+        _, inverse, counts = np.unique(hashes, return_inverse=True, return_counts=True)
+        candidates = maybe_seen | (counts[inverse] > 1)
+        self.bloom.add(hashes)
+        if candidates.any():
+            self._candidates.append(np.unique(hashes[candidates]))
+        if len(hashes):
+            self._write_run(hashes, rows)
+        self.rows += len(hashes)
+        return candidates
+
+    def _occurrences(self, hashes):
+        """(hash, row) of every recorded occurrence of `hashes`, found by binary search in each run"""
+        found_hashes, found_rows = [], []
+        for name in self.runs:
+            run = np.load(self.state_dir / name, mmap_mode='r')
+            left = np.searchsorted(run['hash'], hashes, side='left')
+            right = np.searchsorted(run['hash'], hashes, side='right')
+            hit = right > left
+            if not hit.any():
+                continue
+            lengths = (right - left)[hit]
+            within = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            positions = np.repeat(left[hit], lengths) + within
+            found_hashes.append(np.asarray(run['hash'][positions]))
+            found_rows.append(np.asarray(run['row'][positions]))
+        if not found_hashes:
+            return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+        return np.concatenate(found_hashes), np.concatenate(found_rows)
+
+    def seen(self, ids):
+        """Exact: which ids are already recorded (Bloom pre-check, then binary search of the candidates)"""
+        hashes = hash_ids(ids)
+        seen = np.zeros(len(hashes), dtype=bool)
+        maybe = np.flatnonzero(self.bloom.contains(hashes))
+        if len(maybe):
+            found, _ = self._occurrences(np.unique(hashes[maybe]))
+            seen[maybe] = np.isin(hashes[maybe], found)
+        return seen
+
+    def duplicates(self):
+        """Every repeated row: DataFrame of id_hash, row, first_row (the id's earliest row), ordered by row"""
+        candidates = np.unique(np.concatenate(self._candidates)) if self._candidates else np.empty(0, np.uint64)
+        hashes, rows = self._occurrences(candidates)
+        order = np.lexsort((rows, hashes))
+        hashes, rows = hashes[order], rows[order]
+        starts = np.r_[True, hashes[1:] != hashes[:-1]] if len(hashes) else np.empty(0, dtype=bool)
+        first_row = rows[np.flatnonzero(starts)][np.cumsum(starts) - 1] if len(hashes) else rows
+        repeat = ~starts
+        result = pd.DataFrame({'id_hash': hashes[repeat], 'row': rows[repeat], 'first_row': first_row[repeat]})
+        return result.sort_values('row', ignore_index=True)
+
+    def save(self):
+        np.save(self.state_dir / 'bloom.npy', self.bloom.bits)
+        candidates = np.unique(np.concatenate(self._candidates)) if self._candidates else np.empty(0, np.uint64)
+        np.save(self.state_dir / 'candidates.npy', candidates)
+        self._candidates = [candidates]
+        with open(self.state_dir / STATE_NAME, 'w') as f:
+            json.dump({'rows': self.rows, 'runs': self.runs, 'bloom_size': self.bloom.size,
+                       'probes': self.bloom.probes}, f, indent=2)
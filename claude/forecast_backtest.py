@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Rolling-Origin Forecast Backtesting
+Scores the demand_forecast models (plus predictive_analytics' average-growth method) on
+rolling-origin folds of the store × product series, per series and rolled up per region,
+per category and for the company total
+
+    python3 forecast_backtest.py                          # weekly units, default folds
+    python3 forecast_backtest.py --freq M --value total_amount --folds 8
+
+Fold k trains on periods [0, origin_k) and scores the next `horizon` periods; origins step
+back from the end of the history by `step` periods. Every (model, fold) pair is one task:
+tasks run in a fork-based process pool and each fits all series at once.
+
+Metrics (vectorized per series, then summed before dividing, so groups are weighted by volume):
+    MAPE  mean |error| / actual over periods with actual > 0, %
+    WAPE  Σ|error| / Σactual, %
+    bias  Σ(forecast - actual) / Σactual, % (positive = over-forecast)
+The total row scores the sum of the series forecasts against total actuals.
+
+Fold results are cached per (model code, data, fold), so adding or changing one model only
+evaluates that model.
+"""
+
+import hashlib
+import inspect
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import BASE_DIR, METADATA_CEO_DIR, STORE_DIR, MANIFEST_NAME, load_dimension
+import demand_forecast
+from demand_forecast import DEFAULT_FREQ, FREQUENCIES, MODEL_FUNCTIONS, demand_matrix
+from partition_executor import map_blocks
+
+CACHE_DIR = BASE_DIR / "claude" / ".backtest_cache"
+SUMMARY_PATH = METADATA_CEO_DIR / "forecast_backtest_summary.csv"
+REPORT_PATH = METADATA_CEO_DIR / "forecast_backtest_report.md"
+
+DEFAULT_FOLDS = 6
+# freq → periods between fold origins
+DEFAULT_STEP = {'W': 4, 'M': 1}
+METRIC_FIELDS = ('abs_error', 'actual', 'error', 'ape_sum', 'ape_count')
+
+
+def avg_growth(Y, horizon, season):
+    """predictive_analytics' revenue method: last period × (1 + mean period-over-period growth)^k"""
+    previous, current = Y[:, :-1], Y[:, 1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.where(previous > 0, (current - previous) / previous, np.nan)
+    counts = (~np.isnan(growth)).sum(axis=1)
+    rate = np.where(counts > 0, np.nansum(growth, axis=1) / np.maximum(counts, 1), 0.0)
+    return Y[:, -1:] * (1 + rate[:, None]) ** np.arange(1, horizon + 1)
+
+
+BACKTEST_MODELS = dict(MODEL_FUNCTIONS, avg_growth=avg_growth)
+
+def fold_origins(periods, horizon, folds=DEFAULT_FOLDS, step=1):
+    """Training lengths of the folds, oldest first (each leaves `horizon` periods to score)"""
+    last = periods - horizon
+    return [origin for origin in (last - i * step for i in reversed(range(folds))) if origin > 1]
+
+
+def fold_metrics(forecast, actual):
+    """Per-series error sums for one fold, plus the total-level forecast and actual per step"""
+    forecast = np.clip(forecast, 0, None)
+    error = forecast - actual
+    positive = actual > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ape = np.where(positive, np.abs(error) / actual, 0.0)
+    return {
+        'abs_error': np.abs(error).sum(axis=1),
+        'actual': actual.sum(axis=1),
+        'error': error.sum(axis=1),
+        'ape_sum': ape.sum(axis=1),
+        'ape_count': positive.sum(axis=1).astype(np.float64),
+        'total_forecast': forecast.sum(axis=0),
+        'total_actual': actual.sum(axis=0),
+    }
+
+
+def _run_fold(task, shared):
+    model, origin = task
+    Y, horizon, season = shared['values'], shared['horizon'], shared['season']
+    if model not in ('ses', 'avg_growth') and origin <= season:
+        # Seasonal models need more than one season of training history
+        return None
+    forecast = BACKTEST_MODELS[model](Y[:, :origin], horizon, season)
+    return fold_metrics(forecast, Y[:, origin:origin + horizon])
+
+
+def model_version(model):
+    """
+    Hash of the model's source, so editing a model invalidates only its cached folds. The
+    demand_forecast models hash all of demand_forecast.py: they share its helpers and parameter grids.
+    """
+    source = inspect.getsource(demand_forecast if model in MODEL_FUNCTIONS else BACKTEST_MODELS[model])
+    return hashlib.sha256(source.encode()).hexdigest()[:16]
+
+
+def data_version(freq, value, store_dir=STORE_DIR):
+    with open(Path(store_dir) / MANIFEST_NAME, 'rb') as f:
+        return hashlib.sha256(f.read() + f"|{freq}|{value}".encode()).hexdigest()[:16]
+
+
+def run_backtest(matrix, season, horizon, origins, models=None, processes=None, cache_dir=CACHE_DIR,
+                 data_key=''):
+    """{model: [fold metrics or None per origin]}; cached folds are loaded, only missing ones are run"""
+    models = list(models or BACKTEST_MODELS)
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def cache_path(model, origin):
+        return cache_dir / f"{model}-{model_version(model)}-{data_key}-h{horizon}-o{origin}.npz"
+
+    results, tasks = {model: {} for model in models}, []
+    for model in models:
+        for origin in origins:
+            path = cache_path(model, origin)
+            if path.exists():
+                with np.load(path) as cached:
+                    results[model][origin] = dict(cached) if cached.files else None
+            else:
+                tasks.append((model, origin))
+
+    computed = map_blocks(_run_fold, tasks, {'values': matrix.values, 'horizon': horizon, 'season': season},
+                          processes)
+
+    for (model, origin), metrics in zip(tasks, computed):
+        np.savez(cache_path(model, origin), **(metrics or {}))
+        results[model][origin] = metrics
+    print(f"  Folds: {len(tasks)} evaluated, {len(models) * len(origins) - len(tasks)} from cache")
+    return {model: [results[model][origin] for origin in origins] for model in models}
+
+
+def _rates(sums):
+    actual = sums['actual']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'mape_pct': np.where(sums['ape_count'] > 0, sums['ape_sum'] / sums['ape_count'] * 100, np.nan),
+            'wape_pct': np.where(actual > 0, sums['abs_error'] / actual * 100, np.nan),
+            'bias_pct': np.where(actual > 0, sums['error'] / actual * 100, np.nan),
+        }
+
+
+def summarize(matrix, fold_results, store_dir=STORE_DIR):
+    """One row per model × level (total, region, category, all series) × group"""
+    regions = load_dimension('store_dim', store_dir)['store_region'].astype(str).to_numpy()[matrix.store_codes]
+    categories = load_dimension('product_dim', store_dir)['category'].astype(str).to_numpy()[matrix.product_codes]
+    rows = []
+    for model, folds in fold_results.items():
+        folds = [fold for fold in folds if fold is not None]
+        if not folds:
+            continue
+        # Series-level sums over folds
+        sums = {field: np.sum([fold[field] for fold in folds], axis=0) for field in METRIC_FIELDS}
+
+        total_forecast = np.concatenate([fold['total_forecast'] for fold in folds])
+        total_actual = np.concatenate([fold['total_actual'] for fold in folds])
+        total = fold_metrics(total_forecast[None, :], total_actual[None, :])
+        rates = _rates({field: total[field] for field in METRIC_FIELDS})
+        rows.append({'model': model, 'level': 'total', 'group': 'All', 'series': len(sums['actual']),
+                     'folds': len(folds), **{k: float(v[0]) for k, v in rates.items()}})
+
+        for level, labels in (('region', regions), ('category', categories), ('series', None)):
+            if labels is None:
+                groups, inverse = np.array(['All']), np.zeros(len(sums['actual']), dtype=np.int64)
+            else:
+                groups, inverse = np.unique(labels, return_inverse=True)
+            grouped = {field: np.bincount(inverse, weights=values, minlength=len(groups))
+                       for field, values in sums.items()}
+            rates = _rates(grouped)
+            counts = np.bincount(inverse, minlength=len(groups))
+            for i, group in enumerate(groups):
+                rows.append({'model': model, 'level': level, 'group': str(group), 'series': int(counts[i]),
+                             'folds': len(folds), **{k: float(v[i]) for k, v in rates.items()}})
+    return pd.DataFrame(rows)
+
+
+def write_report(summary, settings, path=REPORT_PATH):
+    lines = ["# Forecast Backtest", "",
+             f"**Series**: {settings['series']:,} store × product ({settings['value']}, freq {settings['freq']})  ",
+             f"**Folds**: {len(settings['origins'])} rolling origins, horizon {settings['horizon']}, "
+             f"step {settings['step']}  ",
+             f"**Generated**: {pd.Timestamp.now():%Y-%m-%d %H:%M:%S}", ""]
+    for level, title in (('total', 'Company Total (sum of series forecasts)'),
+                         ('series', 'All Series (volume-weighted)')):
+        table = summary[summary['level'] == level].sort_values('wape_pct')
+        lines += [f"## {title}", "", "| Model | MAPE % | WAPE % | Bias % |", "|-------|--------|--------|--------|"]
+        lines += [f"| {r.model} | {r.mape_pct:.1f} | {r.wape_pct:.1f} | {r.bias_pct:+.1f} |" for r in table.itertuples()]
+        lines.append("")
+    for level in ('region', 'category'):
+        pivot = summary[summary['level'] == level].pivot(index='group', columns='model', values='wape_pct')
+        lines += [f"## WAPE % by {level.capitalize()}", "",
+                  "| " + level.capitalize() + " | " + " | ".join(pivot.columns) + " |",
+                  "|" + "---|" * (len(pivot.columns) + 1)]
+        lines += [f"| {group} | " + " | ".join(f"{v:.1f}" for v in row) + " |" for group, row in pivot.iterrows()]
+        lines.append("")
+    Path(path).write_text("\n".join(lines))
+
+
+def forecast_backtest(freq=DEFAULT_FREQ, value='quantity', folds=DEFAULT_FOLDS, step=None, horizon=None,
+                      models=None, processes=None, store_dir=STORE_DIR):
+    print("=" * 80)
+    print("ROLLING-ORIGIN FORECAST BACKTEST")
+    print("=" * 80)
+    _, season, default_horizon = FREQUENCIES[freq]
+    horizon = horizon or default_horizon
+    step = step or DEFAULT_STEP[freq]
+
+    start = time.time()
+    matrix = demand_matrix(freq, value=value, store_dir=store_dir)
+    origins = fold_origins(matrix.values.shape[1], horizon, folds, step)
+    print(f"✓ {len(matrix.values):,} series × {matrix.values.shape[1]} periods; "
+          f"{len(origins)} folds (origins {origins[0]}…{origins[-1]}, horizon {horizon})")
+
+    fold_results = run_backtest(matrix, season, horizon, origins, models, processes,
+                                data_key=data_version(freq, value, store_dir))
+    summary = summarize(matrix, fold_results, store_dir)
+    summary.to_csv(SUMMARY_PATH, index=False)
+    write_report(summary, {'series': len(matrix.values), 'value': value, 'freq': freq, 'origins': origins,
+                           'horizon': horizon, 'step': step})
+
+    for r in summary[summary['level'] == 'total'].sort_values('wape_pct').itertuples():
+        print(f"  {r.model:15s} total WAPE {r.wape_pct:6.1f}%  bias {r.bias_pct:+6.1f}%")
+    print(f"✓ Backtest in {time.time() - start:.2f}s → {SUMMARY_PATH.name}, {REPORT_PATH.name}")
+    return summary
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    option = lambda name, cast, default: cast(args[args.index(name) + 1]) if name in args else default
+    forecast_backtest(freq=option('--freq', str, DEFAULT_FREQ), value=option('--value', str, 'quantity'),
+                      folds=option('--folds', int, DEFAULT_FOLDS), step=option('--step', int, None),
+                      horizon=option('--horizon', int, None), processes=option('--jobs', int, None))
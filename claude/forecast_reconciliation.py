@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Hierarchical Forecast Reconciliation
+Makes forecasts add up along the revenue tree (build_revenue_tree.TREE_KEYS, cut to
+Region → Store → Category → SKU) plus the company-wide category and SKU totals
+
+    S = summing_matrix(store_codes, product_codes)        # bottom = store × SKU series
+    base = forecast_series(S.aggregate(history), ...)     # independent forecast per node
+    coherent = mint(base.forecast, S, variances)          # or bottom_up / top_down
+
+The summing matrix S (nodes × bottom series) is never materialized: each aggregation level
+is one array mapping bottom series to that level's node, so
+
+    S @ b      = one np.bincount per level
+    Sᵀ @ x     = one gather per level, summed
+
+Methods:
+    bottom_up  bottom forecasts summed up: S b̂
+    top_down   total forecast split by the bottom series' historical shares
+    mint       MinT with a diagonal W (each node's forecast error variance, "WLS"):
+               S (SᵀW⁻¹S)⁻¹ SᵀW⁻¹ ŷ, solved through a system the size of the aggregate
+               nodes only (Woodbury), so it scales with the tree, not the SKU count
+
+Usage: python3 forecast_reconciliation.py [--freq W|M] [--horizon N] [--jobs N]
+"""
+
+import json
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+from build_revenue_tree import TREE_KEYS
+from dataset_store import METADATA_CEO_DIR, STORE_DIR, load_dimension
+from demand_forecast import DEFAULT_FREQ, FREQUENCIES, demand_matrix, forecast_series
+
+RECONCILED_DIR = METADATA_CEO_DIR / "reconciled_forecast"
+MANIFEST_NAME = 'manifest.json'
+
+# Hierarchy levels as prefixes of these keys (store_region → store_id → category → product_id)
+HIERARCHY_KEYS = [key for key in TREE_KEYS if key in ('store_region', 'store_id', 'category', 'product_id')]
+LEVEL_NAMES = ['total', 'region', 'store', 'store_category']
+# Company-wide levels that cut across the tree (a grouped hierarchy)
+CROSS_LEVELS = {'category_total': ['category'], 'sku_total': ['product_id']}
+
+
+Level = namedtuple('Level', ['name', 'codes', 'labels'])
+
+
+class SummingMatrix:
+    """
+    S for m bottom series: rows are the aggregate nodes level by level, then the bottom series
+    themselves. Stored as one (m,) code array per aggregate level.
+    """
+
+    def __init__(self, levels, bottom_labels):
+        self.levels = levels
+        self.bottom_labels = np.asarray(bottom_labels)
+        self.m = len(self.bottom_labels)
+        self.offsets = np.cumsum([0] + [len(level.labels) for level in levels] + [self.m])
+        self.n = int(self.offsets[-1])
+
+    def __repr__(self):
+        shape = ", ".join(f"{level.name}={len(level.labels)}" for level in self.levels)
+        return f"SummingMatrix({self.n} × {self.m}: {shape}, bottom={self.m})"
+
+    def aggregate(self, bottom):
+        """S @ bottom, for bottom of shape (m,) or (m, h)"""
+        bottom = np.asarray(bottom, dtype=np.float64)
+        flat = bottom.reshape(self.m, -1)
+        width = flat.shape[1]
+        parts = []
+        for level in self.levels:
+            index = (level.codes[:, None] * width + np.arange(width)[None, :]).ravel()
+            parts.append(np.bincount(index, weights=flat.ravel(), minlength=len(level.labels) * width)
+                         .reshape(len(level.labels), width))
+        parts.append(flat)
+        result = np.vstack(parts)
+        return result if bottom.ndim == 2 else result[:, 0]
+
+    def transpose_dot(self, nodes):
+        """Sᵀ @ nodes, for nodes of shape (n,) or (n, h)"""
+        nodes = np.asarray(nodes, dtype=np.float64)
+        result = nodes[self.offsets[-2]:].copy()
+        for i, level in enumerate(self.levels):
+            result += nodes[self.offsets[i]:self.offsets[i + 1]][level.codes]
+        return result
+
+    def node_level(self):
+        """Level index of every row (len(levels) for the bottom series)"""
+        return np.repeat(np.arange(len(self.levels) + 1), np.diff(self.offsets))
+
+    def node_labels(self):
+        return np.concatenate([np.asarray(level.labels, dtype=str) for level in self.levels]
+                              + [self.bottom_labels.astype(str)])
+
+    def level_names(self):
+        return [level.name for level in self.levels] + ['bottom']
+
+    def coherence_error(self, nodes):
+        """Largest |aggregate node - sum of its bottom series| (0 for coherent forecasts)"""
+        nodes = np.asarray(nodes, dtype=np.float64)
+        return float(np.abs(self.aggregate(nodes[self.offsets[-2]:]) - nodes).max())
+
+
+def _level(name, keys, attributes):
+    """Level whose nodes are the distinct combinations of `keys` over the bottom series"""
+    if not keys:
+        return Level(name, np.zeros(len(next(iter(attributes.values()))), dtype=np.int64), np.array(['Total']))
+    joined = np.asarray(attributes[keys[0]], dtype=object)
+    for key in keys[1:]:
+        joined = joined + '/' + np.asarray(attributes[key], dtype=object)
+    labels, codes = np.unique(joined.astype(str), return_inverse=True)
+    return Level(name, codes.astype(np.int64), labels)
+
+
+def summing_matrix(store_codes, product_codes, store_dir=STORE_DIR, cross_levels=True):
+    """S for store × SKU bottom series along HIERARCHY_KEYS (plus CROSS_LEVELS)"""
+    store_dim = load_dimension('store_dim', store_dir)
+    product_dim = load_dimension('product_dim', store_dir)
+    attributes = {
+        'store_region': store_dim['store_region'].astype(str).to_numpy()[store_codes],
+        'store_id': store_dim.index.astype(str).to_numpy()[store_codes],
+        'category': product_dim['category'].astype(str).to_numpy()[product_codes],
+        'product_id': product_dim.index.astype(str).to_numpy()[product_codes],
+    }
+    levels = [_level(name, HIERARCHY_KEYS[:depth], attributes) for depth, name in enumerate(LEVEL_NAMES)]
+    if cross_levels:
+        levels += [_level(name, keys, attributes) for name, keys in CROSS_LEVELS.items()]
+    bottom = _level('bottom', HIERARCHY_KEYS, attributes)
+    order = np.argsort(bottom.codes)
+    if not (bottom.codes[order] == np.arange(len(order))).all():
+        raise ValueError("Bottom series are not unique store × SKU pairs")
+    return SummingMatrix(levels, bottom.labels[bottom.codes])
+
+
+# ----------------------------------------------------------------------
+# Reconciliation methods: base is (n, h) for every node of S; each returns a coherent (n, h)
+# ----------------------------------------------------------------------
+def bottom_up(base, S):
+    return S.aggregate(base[S.offsets[-2]:])
+
+
+def top_down(base, S, history):
+    """Total forecast split by each bottom series' share of the history (proportions of historical averages)"""
+    totals = np.asarray(history, dtype=np.float64).reshape(S.m, -1).sum(axis=1)
+    shares = totals / totals.sum() if totals.sum() > 0 else np.full(S.m, 1 / S.m)
+    return S.aggregate(shares[:, None] * base[0][None, :])
+
+
+def aggregate_gram(S, bottom_weights):
+    """C diag(bottom_weights) Cᵀ over the aggregate rows C of S: entry (i, j) sums the weights of the
+    bottom series under both node i and node j, one bincount per pair of levels"""
+    k = int(S.offsets[-2])
+    gram = np.zeros((k, k))
+    for a, first in enumerate(S.levels):
+        for b, second in enumerate(S.levels[a:], start=a):
+            size_a, size_b = len(first.labels), len(second.labels)
+            block = np.bincount(first.codes * size_b + second.codes, weights=bottom_weights,
+                                minlength=size_a * size_b).reshape(size_a, size_b)
+            gram[S.offsets[a]:S.offsets[a + 1], S.offsets[b]:S.offsets[b + 1]] = block
+            gram[S.offsets[b]:S.offsets[b + 1], S.offsets[a]:S.offsets[a + 1]] = block.T
+    return gram
+
+
+def mint(base, S, variances):
+    """
+    MinT with W = diag(variances): S (SᵀW⁻¹S)⁻¹ SᵀW⁻¹ ŷ. SᵀW⁻¹S = D + CᵀΛC splits into the
+    bottom series' (diagonal) weights D and the aggregate rows C weighted by Λ, so by Woodbury
+    only a k × k system over the k aggregate nodes is solved, never one over the bottom series.
+    """
+    weights = 1 / np.asarray(variances, dtype=np.float64)
+    k = int(S.offsets[-2])
+    bottom_variances = 1 / weights[k:]
+    rhs = S.transpose_dot(weights[:, None] * base)
+    x = bottom_variances[:, None] * rhs
+    # (Λ⁻¹ + C D⁻¹ Cᵀ) z = C D⁻¹ rhs;  x = D⁻¹ (rhs - Cᵀ z)
+    system = aggregate_gram(S, bottom_variances)
+    system[np.diag_indices(k)] += 1 / weights[:k]
+    z = np.linalg.solve(system, S.aggregate(x)[:k])
+    correction = S.transpose_dot(np.vstack([z, np.zeros((S.m, z.shape[1]))]))
+    return S.aggregate(x - bottom_variances[:, None] * correction)
+
+
+# ----------------------------------------------------------------------
+# Phase
+# ----------------------------------------------------------------------
+def write_reconciled(S, forecasts, periods, out_dir=RECONCILED_DIR, extra=None):
+    """One row per node × period, one .npy column per field (level as codes, labels in the manifest)"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    horizon = len(periods)
+    columns = {
+        'level': np.repeat(S.node_level().astype(np.int8), horizon),
+        'node': np.repeat(S.node_labels(), horizon),
+        'period': np.tile(periods, S.n),
+    }
+    for method, values in forecasts.items():
+        columns[method] = values.astype(np.float32).ravel()
+    for name, array in columns.items():
+        np.save(out_dir / f"{name}.npy", array)
+    manifest = {
+        'rows': int(S.n * horizon),
+        'nodes': int(S.n),
+        'bottom_series': int(S.m),
+        'horizon': horizon,
+        'columns': {name: str(array.dtype) for name, array in columns.items()},
+        'labels': {'level': S.level_names()},
+    }
+    manifest.update(extra or {})
+    with open(out_dir / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def forecast_reconciliation(freq=DEFAULT_FREQ, horizon=None, processes=None, store_dir=STORE_DIR,
+                            out_dir=RECONCILED_DIR):
+    print("=" * 80)
+    print("HIERARCHICAL FORECAST RECONCILIATION")
+    print("=" * 80)
+    _, season, default_horizon = FREQUENCIES[freq]
+    horizon = horizon or default_horizon
+
+    matrix = demand_matrix(freq, store_dir=store_dir)
+    S = summing_matrix(matrix.store_codes, matrix.product_codes, store_dir)
+    print(f"✓ {S}")
+
+    # Independent base forecasts for every node (aggregates forecast from their own history)
+    start = time.time()
+    history = S.aggregate(matrix.values)
+    base = forecast_series(history, horizon, season, processes=processes)
+    print(f"✓ Base forecasts for {S.n:,} nodes in {time.time() - start:.2f}s "
+          f"(incoherence: {S.coherence_error(base.forecast):,.1f} units)")
+
+    base_forecast = base.forecast.astype(np.float64)
+    # Holdout MAE² as each node's error variance, floored so exact fits do not dominate
+    variances = base.mae.astype(np.float64) ** 2
+    variances = np.maximum(variances, 1e-6 * max(variances.mean(), 1e-12))
+    forecasts = {'base': base_forecast}
+    seconds = {}
+    for method, reconcile in (('bottom_up', lambda: bottom_up(base_forecast, S)),
+                              ('top_down', lambda: top_down(base_forecast, S, matrix.values)),
+                              ('mint', lambda: mint(base_forecast, S, variances))):
+        start = time.time()
+        forecasts[method] = reconcile()
+        seconds[method] = round(time.time() - start, 4)
+        print(f"  {method:10s} {seconds[method]:7.3f}s  incoherence {S.coherence_error(forecasts[method]):.2e}  "
+              f"total next period {forecasts[method][0, 0]:,.0f}")
+
+    periods = (matrix.periods[-1].astype(f'datetime64[{FREQUENCIES[freq][0]}]')
+               + np.arange(1, horizon + 1)).astype('datetime64[D]')
+    manifest = write_reconciled(S, forecasts, periods, out_dir, extra={'freq': freq, 'seconds': seconds})
+    print(f"✓ {manifest['rows']:,} rows ({', '.join(forecasts)}) → {out_dir}")
+    return manifest
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    freq_arg = args[args.index('--freq') + 1] if '--freq' in args else DEFAULT_FREQ
+    horizon_arg = int(args[args.index('--horizon') + 1]) if '--horizon' in args else None
+    jobs_arg = int(args[args.index('--jobs') + 1]) if '--jobs' in args else None
+    forecast_reconciliation(freq_arg, horizon_arg, jobs_arg)
@@ -8,6 +8,216 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 
+from dataset_store import load_dataset, load_partitions, join_dimension, id_codes, sums_by_code
+from rule_engine import load_rules, classify
+from partition_executor import map_partitions
+from distinct_count import distinct_count, distinct_counts_by
+
+def yoy_growth_by_id(id_column, ids):
+    """2022 → 2023 revenue growth % for each of `ids` (0 without 2022 revenue), summed on int32 id codes of the two year partitions"""
+    revenue = {}
+    for year in (2022, 2023):
+        partition = load_partitions([id_column, 'total_amount'], year=year)
+        codes, labels = id_codes(partition[id_column])
+        revenue[year] = sums_by_code(codes, partition['total_amount'].to_numpy(), len(labels))
+    positions = labels.get_indexer(ids)
+    rev_2022, rev_2023 = revenue[2022][positions], revenue[2023][positions]
+    growth = (rev_2023 - rev_2022) / np.where(rev_2022 > 0, rev_2022, 1) * 100
+    return np.where(rev_2022 > 0, growth, 0)
+
+def regional_statistics(df):
+    """Revenue, store/customer counts, revenue per store and YoY growth for every region, in one grouped pass"""
+    regional = df.groupby('store_region', observed=True)[['total_amount']].sum()
+    regional.columns = ['revenue']
+    regional['store_count'] = distinct_counts_by(df['store_region'], df['store_id'])
+    regional['customer_count'] = distinct_counts_by(df['store_region'], df['customer_id'])
+    by_year = df.groupby(['store_region', 'year'], observed=True)['total_amount'].sum().unstack(fill_value=0)
+    by_year = by_year.reindex(index=regional.index, columns=[2022, 2023], fill_value=0)
+    regional['revenue_2022'] = by_year[2022]
+    regional['revenue_2023'] = by_year[2023]
+    regional['revenue_per_store'] = regional['revenue'] / regional['store_count']
+    rev_2022 = regional['revenue_2022']
+    regional['yoy_growth_pct'] = np.where(
+        rev_2022 > 0, (regional['revenue_2023'] - rev_2022) / rev_2022.where(rev_2022 > 0, 1) * 100, 0
+    )
+    return regional
+
+class DerivedStatistics:
+    """Run-scoped memo: each named statistic is computed on first use and reused afterwards"""
+
+    def __init__(self):
+        self._values = {}
+
+    def get(self, name, compute):
+        if name not in self._values:
+            self._values[name] = compute()
+        return self._values[name]
+
+def render_segment_section(segment, seg_df, context):
+    """Markdown profile of one customer segment (one partition of the frame by customer_type)"""
+    insights = {
+        'segment_name': segment,
+        'customer_count': distinct_count(seg_df['customer_id']),
+        'total_revenue': float(seg_df['total_amount'].sum()),
+        'total_transactions': int(len(seg_df)),
+        'avg_transaction_value': float(seg_df['total_amount'].mean()),
+        'avg_basket_size': float(seg_df['basket_size'].mean()),
+        'avg_discount_used': float(seg_df['discount_percentage'].mean()),
+        'loyalty_program_usage_pct': float((seg_df['loyalty_points_used'] > 0).sum() / len(seg_df) * 100),
+        'organic_preference_pct': float((seg_df['is_organic'] == True).sum() / len(seg_df) * 100),
+        'home_delivery_pct': float((seg_df['delivery_method'] == 'Home Delivery').sum() / len(seg_df) * 100),
+        'weekend_shopping_pct': float(seg_df['is_weekend'].sum() / len(seg_df) * 100),
+    }
+
+    # Top categories for this segment
+    top_cats = seg_df.groupby('category', observed=True)['total_amount'].sum().nlargest(5)
+    insights['top_categories'] = {cat: float(rev) for cat, rev in top_cats.items()}
+
+    # Behavioral patterns
+    insights['preferred_time_slot'] = seg_df.groupby('time_slot', observed=True).size().idxmax()
+    insights['preferred_payment_method'] = seg_df.groupby('payment_method', observed=True).size().idxmax()
+
+    section = f"""## {segment} Customers
+
+### Profile
+- **Customer Count**: {insights['customer_count']:,}
+- **Total Revenue**: ${insights['total_revenue']:,.2f} ({insights['total_revenue']/context['total_revenue']*100:.1f}% of total)
+- **Avg Transaction Value**: ${insights['avg_transaction_value']:.2f}
+- **Avg Basket Size**: {insights['avg_basket_size']:.1f} items
+
+### Behavior
+- **Loyalty Usage**: {insights['loyalty_program_usage_pct']:.1f}%
+- **Organic Preference**: {insights['organic_preference_pct']:.1f}%
+- **Home Delivery**: {insights['home_delivery_pct']:.1f}%
+- **Weekend Shopping**: {insights['weekend_shopping_pct']:.1f}%
+- **Preferred Time**: {insights['preferred_time_slot']}
+- **Preferred Payment**: {insights['preferred_payment_method']}
+
+### Top Categories
+"""
+    for i, (cat, rev) in enumerate(insights['top_categories'].items(), 1):
+        section += f"{i}. {cat}: ${rev:,.2f}\n"
+
+    section += "\n---\n\n"
+    return section
+
+def render_category_section(category, cat_df, context):
+    """Markdown deep-dive of one category (one partition of the frame by category)"""
+    # Category metrics
+    total_rev = cat_df['total_amount'].sum()
+    total_rev_pct = total_rev / context['total_revenue'] * 100
+    transactions = len(cat_df)
+    unique_customers = distinct_count(cat_df['customer_id'])
+
+    # YoY growth
+    cat_2022 = cat_df.loc[cat_df['year'] == 2022, 'total_amount'].sum()
+    cat_2023 = cat_df.loc[cat_df['year'] == 2023, 'total_amount'].sum()
+    yoy_growth = ((cat_2023 - cat_2022) / cat_2022 * 100) if cat_2022 > 0 else 0
+
+    # Sub-categories
+    subcats = cat_df.groupby('sub_category', observed=True)['total_amount'].sum().sort_values(ascending=False)
+
+    # Top brands
+    top_brands = cat_df.groupby('brand', observed=True)['total_amount'].sum().nlargest(5)
+
+    # Strategic positioning
+    if yoy_growth > 5:
+        status = "GROWING - Expand and invest"
+    elif yoy_growth > 0:
+        status = "STABLE - Maintain market share"
+    else:
+        status = "DECLINING - Intervention needed"
+
+    section = f"""## {category}
+
+### Overview
+- **Total Revenue**: ${total_rev:,.2f} ({total_rev_pct:.1f}% of total)
+- **YoY Growth**: {yoy_growth:.1f}%
+- **Transactions**: {transactions:,}
+- **Unique Customers**: {unique_customers:,}
+- **Strategic Status**: {status}
+
+### Sub-Category Breakdown
+"""
+    for subcat, rev in subcats.items():
+        subcat_pct = rev / total_rev * 100
+        section += f"- **{subcat}**: ${rev:,.2f} ({subcat_pct:.1f}% of category)\n"
+
+    section += "\n### Top 5 Brands\n"
+    for brand, rev in top_brands.items():
+        section += f"- {brand}: ${rev:,.2f}\n"
+
+    section += "\n---\n\n"
+    return section
+
+def render_region_section(region, reg_df, context):
+    """Markdown market analysis of one region; regional metrics come from the shared regional statistics table"""
+    region_stats = context['regional'].loc[region]
+    median_revenue_per_store = context['median_revenue_per_store']
+
+    # Regional metrics
+    total_rev = region_stats['revenue']
+    total_rev_pct = total_rev / context['total_revenue'] * 100
+    store_count = int(region_stats['store_count'])
+    customer_count = int(region_stats['customer_count'])
+    revenue_per_store = region_stats['revenue_per_store']
+
+    # YoY growth
+    yoy_growth = region_stats['yoy_growth_pct']
+
+    # Store performance distribution
+    store_perf = reg_df.groupby('store_id', observed=True)['total_amount'].sum()
+    top_store_rev = store_perf.max()
+    bottom_store_rev = store_perf.min()
+
+    # Top categories in region
+    top_categories = reg_df.groupby('category', observed=True)['total_amount'].sum().nlargest(5)
+
+    # Strategic assessment
+    if revenue_per_store > median_revenue_per_store:
+        market_position = "STRONG - High revenue per store"
+    else:
+        market_position = "MODERATE - Room for optimization"
+
+    if yoy_growth > 3:
+        growth_status = "EXPANDING"
+    elif yoy_growth > -2:
+        growth_status = "STABLE"
+    else:
+        growth_status = "CONTRACTING"
+
+    section = f"""## {region} Region
+
+### Market Overview
+- **Total Revenue**: ${total_rev:,.2f} ({total_rev_pct:.1f}% of company)
+- **Store Count**: {store_count}
+- **Customer Base**: {customer_count:,}
+- **Revenue per Store**: ${revenue_per_store:,.2f}
+- **YoY Growth**: {yoy_growth:.1f}%
+
+### Market Position
+- **Competitive Position**: {market_position}
+- **Growth Status**: {growth_status}
+- **Store Performance Range**: ${bottom_store_rev:,.0f} - ${top_store_rev:,.0f}
+
+### Top 5 Categories
+"""
+    for cat, rev in top_categories.items():
+        section += f"- {cat}: ${rev:,.2f}\n"
+
+    # Strategic recommendations
+    if yoy_growth > 5 and revenue_per_store > median_revenue_per_store:
+        recommendation = "🚀 EXPAND AGGRESSIVELY - Open 3-5 new stores, high growth + strong performance"
+    elif yoy_growth > 0:
+        recommendation = "📈 SELECTIVE EXPANSION - Open 1-2 stores in underserved areas"
+    elif yoy_growth < -5:
+        recommendation = "⚠️ OPTIMIZE - Focus on improving existing stores before expansion"
+    else:
+        recommendation = "🔄 MAINTAIN - Steady state, focus on operational efficiency"
+
+    section += f"\n### Strategic Recommendation\n{recommendation}\n\n---\n\n"
+    return section
+
 def granular_insights():
     print("=" * 80)
     print("PHASE 1.5: GRANULAR DEEP-DIVE INSIGHTS")
@@ -16,18 +226,29 @@ def granular_insights():
 
     # Load dataset
     print("Loading dataset...")
-    df = pd.read_csv('/Users/arghya.mukherjee/Downloads/cursor/sd ceo/grocery_dataset.csv')
+    df = load_dataset(columns=[
+        'transaction_id', 'timestamp', 'store_id', 'store_region', 'store_type',
+        'product_id', 'category', 'sub_category', 'brand', 'quantity',
+        'unit_price', 'discount_percentage', 'final_price', 'total_amount',
+        'payment_method', 'customer_id', 'customer_type', 'loyalty_points_used',
+        'age_group', 'gender', 'basket_size', 'is_weekend', 'delivery_method',
+        'time_slot', 'checkout_duration_sec', 'is_organic'
+    ])
     df['timestamp'] = pd.to_datetime(df['timestamp'])
     df['year'] = df['timestamp'].dt.year
     print(f"✓ Loaded {len(df):,} rows")
     print()
 
+    stats = DerivedStatistics()
+    total_revenue = stats.get('total_revenue', lambda: df['total_amount'].sum())
+    rules = load_rules()
+
     # ========================================================================
     # 1. STORE-LEVEL INSIGHTS
     # ========================================================================
     print("1. Store-Level Insights (Top 50 + Bottom 50)...")
 
-    store_analysis = df.groupby(['store_id', 'store_region', 'store_type']).agg({
+    store_analysis = join_dimension(df.groupby('store_id', observed=True).agg({
         'total_amount': 'sum',
         'transaction_id': 'count',
         'customer_id': 'nunique',
@@ -35,7 +256,7 @@ def granular_insights():
         'discount_percentage': 'mean',
         'basket_size': 'mean',
         'checkout_duration_sec': 'mean'
-    }).reset_index()
+    }), 'store_dim')
 
     store_analysis.columns = ['store_id', 'region', 'store_type', 'revenue', 'transactions',
                                'unique_customers', 'units_sold', 'avg_discount_pct',
@@ -45,42 +266,20 @@ def granular_insights():
     store_analysis['revenue_per_customer'] = store_analysis['revenue'] / store_analysis['unique_customers']
 
     # YoY growth for stores
-    store_2022 = df[df['year'] == 2022].groupby('store_id')['total_amount'].sum()
-    store_2023 = df[df['year'] == 2023].groupby('store_id')['total_amount'].sum()
-
-    store_analysis['yoy_growth_pct'] = store_analysis['store_id'].apply(
-        lambda x: ((store_2023.get(x, 0) - store_2022.get(x, 0)) / store_2022.get(x, 1) * 100)
-        if store_2022.get(x, 0) > 0 else 0
-    )
+    store_analysis['yoy_growth_pct'] = yoy_growth_by_id('store_id', store_analysis['store_id'])
 
     # Top 50 stores
     top_50_stores = store_analysis.nlargest(50, 'revenue').copy()
     top_50_stores['performance_tier'] = 'TOP_50'
 
-    # Add strategic recommendations for top stores
-    def get_store_recommendation(row):
-        if row['yoy_growth_pct'] > 5:
-            return "EXPAND - High growth momentum, consider opening similar format store in region"
-        elif row['revenue_per_customer'] > store_analysis['revenue_per_customer'].median():
-            return "OPTIMIZE - Strong customer value, increase customer acquisition"
-        else:
-            return "MAINTAIN - Stable performance, focus on operational efficiency"
-
-    top_50_stores['recommendation'] = top_50_stores.apply(get_store_recommendation, axis=1)
+    # Strategic recommendations: vectorized rules, thresholds taken over all stores
+    top_50_stores['recommendation'] = classify(top_50_stores, rules['top_store'], reference=store_analysis)
 
     # Bottom 50 stores
     bottom_50_stores = store_analysis.nsmallest(50, 'revenue').copy()
     bottom_50_stores['performance_tier'] = 'BOTTOM_50'
 
-    def get_bottom_store_recommendation(row):
-        if row['yoy_growth_pct'] < -10:
-            return "CRITICAL - Severe decline, conduct immediate intervention or consider closure"
-        elif row['revenue_per_transaction'] < store_analysis['revenue_per_transaction'].quantile(0.25):
-            return "IMPROVE - Low transaction value, enhance product mix and upsell strategies"
-        else:
-            return "MONITOR - Underperforming but stable, implement 90-day improvement plan"
-
-    bottom_50_stores['recommendation'] = bottom_50_stores.apply(get_bottom_store_recommendation, axis=1)
+    bottom_50_stores['recommendation'] = classify(bottom_50_stores, rules['bottom_store'], reference=store_analysis)
 
     # Save
     top_50_path = '/Users/arghya.mukherjee/Downloads/cursor/sd ceo/claude/metadata_ceo/store_insights_top_50.csv'
@@ -96,7 +295,7 @@ def granular_insights():
     # ========================================================================
     print("\n2. Product-Level Insights (Top 100)...")
 
-    product_analysis = df.groupby(['product_id', 'product_name', 'category', 'sub_category', 'brand']).agg({
+    product_analysis = join_dimension(df.groupby('product_id', observed=True).agg({
         'total_amount': 'sum',
         'transaction_id': 'count',
         'customer_id': 'nunique',
@@ -104,20 +303,14 @@ def granular_insights():
         'unit_price': 'mean',
         'discount_percentage': 'mean',
         'final_price': 'mean'
-    }).reset_index()
+    }), 'product_dim')
 
     product_analysis.columns = ['product_id', 'product_name', 'category', 'sub_category', 'brand',
                                  'revenue', 'transactions', 'unique_customers', 'units_sold',
                                  'avg_unit_price', 'avg_discount_pct', 'avg_final_price']
 
     # Growth analysis
-    prod_2022 = df[df['year'] == 2022].groupby('product_id')['total_amount'].sum()
-    prod_2023 = df[df['year'] == 2023].groupby('product_id')['total_amount'].sum()
-
-    product_analysis['yoy_growth_pct'] = product_analysis['product_id'].apply(
-        lambda x: ((prod_2023.get(x, 0) - prod_2022.get(x, 0)) / prod_2022.get(x, 1) * 100)
-        if prod_2022.get(x, 0) > 0 else 0
-    )
+    product_analysis['yoy_growth_pct'] = yoy_growth_by_id('product_id', product_analysis['product_id'])
 
     # Margin calculation
     product_analysis['gross_margin_pct'] = (
@@ -126,19 +319,7 @@ def granular_insights():
     )
 
     # Strategic classification
-    def classify_product(row):
-        if row['revenue'] > product_analysis['revenue'].quantile(0.8) and row['yoy_growth_pct'] > 5:
-            return "STAR - High revenue, high growth"
-        elif row['revenue'] > product_analysis['revenue'].quantile(0.8):
-            return "CASH_COW - High revenue, stable"
-        elif row['yoy_growth_pct'] > 10:
-            return "RISING_STAR - Growing fast"
-        elif row['yoy_growth_pct'] < -5:
-            return "DECLINING - Consider discontinuation"
-        else:
-            return "STEADY - Maintain"
-
-    product_analysis['classification'] = product_analysis.apply(classify_product, axis=1)
+    product_analysis['classification'] = classify(product_analysis, rules['product'])
 
     # Top 100 products
     top_100_products = product_analysis.nlargest(100, 'revenue')
@@ -152,74 +333,14 @@ def granular_insights():
     # ========================================================================
     print("\n3. Customer Segment Deep Dive...")
 
-    segment_insights = {}
-
-    for segment in df['customer_type'].unique():
-        seg_df = df[df['customer_type'] == segment]
-
-        insights = {
-            'segment_name': segment,
-            'customer_count': int(seg_df['customer_id'].nunique()),
-            'total_revenue': float(seg_df['total_amount'].sum()),
-            'total_transactions': int(len(seg_df)),
-            'avg_transaction_value': float(seg_df['total_amount'].mean()),
-            'avg_basket_size': float(seg_df['basket_size'].mean()),
-            'avg_discount_used': float(seg_df['discount_percentage'].mean()),
-            'loyalty_program_usage_pct': float((seg_df['loyalty_points_used'] > 0).sum() / len(seg_df) * 100),
-            'organic_preference_pct': float((seg_df['is_organic'] == True).sum() / len(seg_df) * 100),
-            'home_delivery_pct': float((seg_df['delivery_method'] == 'Home Delivery').sum() / len(seg_df) * 100),
-            'weekend_shopping_pct': float(seg_df['is_weekend'].sum() / len(seg_df) * 100),
-        }
-
-        # Top categories for this segment
-        top_cats = seg_df.groupby('category')['total_amount'].sum().nlargest(5)
-        insights['top_categories'] = {cat: float(rev) for cat, rev in top_cats.items()}
-
-        # Demographics
-        age_dist = seg_df.groupby('age_group').size()
-        insights['age_distribution'] = {age: int(count) for age, count in age_dist.items()}
-
-        gender_dist = seg_df.groupby('gender').size()
-        insights['gender_distribution'] = {gender: int(count) for gender, count in gender_dist.items()}
-
-        # Behavioral patterns
-        time_pref = seg_df.groupby('time_slot').size().idxmax()
-        insights['preferred_time_slot'] = time_pref
-
-        payment_pref = seg_df.groupby('payment_method').size().idxmax()
-        insights['preferred_payment_method'] = payment_pref
-
-        segment_insights[segment] = insights
-
-    # Create markdown summary
     segment_md = f"""# Customer Segment Deep Dive
 Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 """
-
-    for segment, insights in segment_insights.items():
-        segment_md += f"""## {segment} Customers
-
-### Profile
-- **Customer Count**: {insights['customer_count']:,}
-- **Total Revenue**: ${insights['total_revenue']:,.2f} ({insights['total_revenue']/df['total_amount'].sum()*100:.1f}% of total)
-- **Avg Transaction Value**: ${insights['avg_transaction_value']:.2f}
-- **Avg Basket Size**: {insights['avg_basket_size']:.1f} items
-
-### Behavior
-- **Loyalty Usage**: {insights['loyalty_program_usage_pct']:.1f}%
-- **Organic Preference**: {insights['organic_preference_pct']:.1f}%
-- **Home Delivery**: {insights['home_delivery_pct']:.1f}%
-- **Weekend Shopping**: {insights['weekend_shopping_pct']:.1f}%
-- **Preferred Time**: {insights['preferred_time_slot']}
-- **Preferred Payment**: {insights['preferred_payment_method']}
-
-### Top Categories
-"""
-        for i, (cat, rev) in enumerate(insights['top_categories'].items(), 1):
-            segment_md += f"{i}. {cat}: ${rev:,.2f}\n"
-
-        segment_md += "\n---\n\n"
+    context = {'total_revenue': total_revenue}
+    segment_sections = map_partitions(df, 'customer_type', render_segment_section, context)
+    for _, section in segment_sections:
+        segment_md += section
 
     segment_md_path = '/Users/arghya.mukherjee/Downloads/cursor/sd ceo/claude/metadata_ceo/customer_segment_deep_dive.md'
     with open(segment_md_path, 'w') as f:
@@ -235,55 +356,8 @@ Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 """
-
-    for category in df['category'].unique():
-        cat_df = df[df['category'] == category]
-
-        # Category metrics
-        total_rev = cat_df['total_amount'].sum()
-        total_rev_pct = total_rev / df['total_amount'].sum() * 100
-        transactions = len(cat_df)
-        unique_customers = cat_df['customer_id'].nunique()
-
-        # YoY growth
-        cat_2022 = df[(df['category'] == category) & (df['year'] == 2022)]['total_amount'].sum()
-        cat_2023 = df[(df['category'] == category) & (df['year'] == 2023)]['total_amount'].sum()
-        yoy_growth = ((cat_2023 - cat_2022) / cat_2022 * 100) if cat_2022 > 0 else 0
-
-        # Sub-categories
-        subcats = cat_df.groupby('sub_category')['total_amount'].sum().sort_values(ascending=False)
-
-        # Top brands
-        top_brands = cat_df.groupby('brand')['total_amount'].sum().nlargest(5)
-
-        # Strategic positioning
-        if yoy_growth > 5:
-            status = "GROWING - Expand and invest"
-        elif yoy_growth > 0:
-            status = "STABLE - Maintain market share"
-        else:
-            status = "DECLINING - Intervention needed"
-
-        category_md += f"""## {category}
-
-### Overview
-- **Total Revenue**: ${total_rev:,.2f} ({total_rev_pct:.1f}% of total)
-- **YoY Growth**: {yoy_growth:.1f}%
-- **Transactions**: {transactions:,}
-- **Unique Customers**: {unique_customers:,}
-- **Strategic Status**: {status}
-
-### Sub-Category Breakdown
-"""
-        for subcat, rev in subcats.items():
-            subcat_pct = rev / total_rev * 100
-            category_md += f"- **{subcat}**: ${rev:,.2f} ({subcat_pct:.1f}% of category)\n"
-
-        category_md += "\n### Top 5 Brands\n"
-        for brand, rev in top_brands.items():
-            category_md += f"- {brand}: ${rev:,.2f}\n"
-
-        category_md += "\n---\n\n"
+    for _, section in map_partitions(df, 'category', render_category_section, context):
+        category_md += section
 
     category_md_path = '/Users/arghya.mukherjee/Downloads/cursor/sd ceo/claude/metadata_ceo/category_deep_dive_all.md'
     with open(category_md_path, 'w') as f:
@@ -300,72 +374,15 @@ Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 """
 
-    for region in df['store_region'].unique():
-        reg_df = df[df['store_region'] == region]
-
-        # Regional metrics
-        total_rev = reg_df['total_amount'].sum()
-        total_rev_pct = total_rev / df['total_amount'].sum() * 100
-        store_count = reg_df['store_id'].nunique()
-        customer_count = reg_df['customer_id'].nunique()
-        revenue_per_store = total_rev / store_count
-
-        # YoY growth
-        reg_2022 = df[(df['store_region'] == region) & (df['year'] == 2022)]['total_amount'].sum()
-        reg_2023 = df[(df['store_region'] == region) & (df['year'] == 2023)]['total_amount'].sum()
-        yoy_growth = ((reg_2023 - reg_2022) / reg_2022 * 100) if reg_2022 > 0 else 0
-
-        # Store performance distribution
-        store_perf = reg_df.groupby('store_id')['total_amount'].sum()
-        top_store_rev = store_perf.max()
-        bottom_store_rev = store_perf.min()
-
-        # Top categories in region
-        top_categories = reg_df.groupby('category')['total_amount'].sum().nlargest(5)
-
-        # Strategic assessment
-        if revenue_per_store > df.groupby('store_region').apply(lambda x: x['total_amount'].sum() / x['store_id'].nunique()).median():
-            market_position = "STRONG - High revenue per store"
-        else:
-            market_position = "MODERATE - Room for optimization"
-
-        if yoy_growth > 3:
-            growth_status = "EXPANDING"
-        elif yoy_growth > -2:
-            growth_status = "STABLE"
-        else:
-            growth_status = "CONTRACTING"
-
-        regional_md += f"""## {region} Region
-
-### Market Overview
-- **Total Revenue**: ${total_rev:,.2f} ({total_rev_pct:.1f}% of company)
-- **Store Count**: {store_count}
-- **Customer Base**: {customer_count:,}
-- **Revenue per Store**: ${revenue_per_store:,.2f}
-- **YoY Growth**: {yoy_growth:.1f}%
-
-### Market Position
-- **Competitive Position**: {market_position}
-- **Growth Status**: {growth_status}
-- **Store Performance Range**: ${bottom_store_rev:,.0f} - ${top_store_rev:,.0f}
-
-### Top 5 Categories
-"""
-        for cat, rev in top_categories.items():
-            category_md += f"- {cat}: ${rev:,.2f}\n"
-
-        # Strategic recommendations
-        if yoy_growth > 5 and revenue_per_store > df.groupby('store_region').apply(lambda x: x['total_amount'].sum() / x['store_id'].nunique()).median():
-            recommendation = "🚀 EXPAND AGGRESSIVELY - Open 3-5 new stores, high growth + strong performance"
-        elif yoy_growth > 0:
-            recommendation = "📈 SELECTIVE EXPANSION - Open 1-2 stores in underserved areas"
-        elif yoy_growth < -5:
-            recommendation = "⚠️ OPTIMIZE - Focus on improving existing stores before expansion"
-        else:
-            recommendation = "🔄 MAINTAIN - Steady state, focus on operational efficiency"
-
-        regional_md += f"\n### Strategic Recommendation\n{recommendation}\n\n---\n\n"
+    # Regional statistics: computed once in a grouped pass, shared with every region's renderer
+    regional = stats.get('regional_statistics', lambda: regional_statistics(df))
+    context = {
+        'total_revenue': total_revenue,
+        'regional': regional,
+        'median_revenue_per_store': stats.get('median_revenue_per_store', lambda: regional['revenue_per_store'].median())
+    }
+    for _, section in map_partitions(df, 'store_region', render_region_section, context):
+        regional_md += section
 
     regional_md_path = '/Users/arghya.mukherjee/Downloads/cursor/sd ceo/claude/metadata_ceo/regional_market_analysis.md'
     with open(regional_md_path, 'w') as f:
@@ -381,7 +398,7 @@ Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
     print("=" * 80)
     print(f"Store Insights: Top 50 + Bottom 50 analyzed")
     print(f"Product Insights: Top 100 analyzed")
-    print(f"Customer Segments: {len(segment_insights)} segments profiled")
+    print(f"Customer Segments: {len(segment_sections)} segments profiled")
     print(f"Categories: {df['category'].nunique()} categories analyzed")
     print(f"Regions: {df['store_region'].nunique()} regions analyzed")
     print(f"Files Created: 6 (2 store CSVs, 1 product CSV, 3 MDs)")
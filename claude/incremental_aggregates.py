@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Incremental Daily Aggregates
+Keeps the revenue tree, CEO dashboard and daily/monthly KPI aggregates as mergeable partial
+states per day and per month, so a nightly file of new transactions only aggregates itself
+
+    python3 incremental_aggregates.py --backfill            # once: partition the dataset store by day
+    python3 incremental_aggregates.py --append day.csv      # nightly: aggregate the new rows, merge, write outputs
+    python3 incremental_aggregates.py --remerge             # rebuild the running total from the partitions
+
+State directory (.incremental_state):
+    days/YYYY-MM-DD.pkl     partial state of each day of the open (latest) month
+    months/YYYY-MM.pkl      partial state of each closed month (its days merged, day files removed)
+    total.pkl               merge of every partition: what the outputs are written from
+    dictionaries.json       values unseen by the dataset store, appended after its dictionaries
+    line_items.dedup/       line items (transaction_id × product_id) already aggregated; re-delivered
+                            rows are skipped, late items of an already loaded basket are not
+    state.json              partitions, row count and the dashboard's product growth sample
+
+A partial state is the StreamingAggregator of build_revenue_tree (plus the KPI aggregations)
+and the FusedAggregator of create_ceo_dashboard over the same rows; both merge exactly
+(sums, counts, distinct-count bitmaps), so the outputs match a full recompute.
+"""
+
+import json
+import os
+import pickle
+import shutil
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import pandas as pd
+
+from build_revenue_tree import REVENUE_COLUMNS, build_revenue_tree, declare_revenue_aggregates
+from create_ceo_dashboard import (DASHBOARD_COLUMNS, GROWTH_SAMPLE_SIZE, create_ceo_dashboard,
+                                  declare_dashboard_aggregates, prepare_dashboard_frame)
+from dataset_store import BASE_DIR, METADATA_CEO_DIR, STORE_DIR, column_spec, iter_chunks, load_dataset
+from duplicate_detector import DuplicateDetector
+from fused_aggregation import FusedAggregator
+from partition_executor import map_partitions
+from streaming_aggregation import StreamingAggregator
+
+STATE_DIR = BASE_DIR / "claude" / ".incremental_state"
+KPI_DAILY_PATH = METADATA_CEO_DIR / "kpi_daily_performance.csv"
+KPI_MONTHLY_PATH = METADATA_CEO_DIR / "kpi_monthly_performance.csv"
+
+STATE_NAME = 'state.json'
+DICTIONARIES_NAME = 'dictionaries.json'
+DEDUP_NAME = 'line_items.dedup'
+# A transaction_id is a basket spanning several rows; a row is one product of a basket
+LINE_ITEM_KEY = ['transaction_id', 'product_id']
+SOURCE_COLUMNS = list(dict.fromkeys(REVENUE_COLUMNS + DASHBOARD_COLUMNS))
+
+# KPI table name → (group key, output key column)
+KPI_LEVELS = {'daily': ('date', 'date'), 'monthly': ('year_month', 'year_month')}
+
+Partial = namedtuple('Partial', ['revenue', 'dashboard', 'rows'])
+
+
+def declare_kpi_aggregates(engine):
+    for name, (key, _) in KPI_LEVELS.items():
+        engine.add(name, [key],
+                   revenue=('total_amount', 'sum'),
+                   transactions=('total_amount', 'size'),
+                   unique_customers=('customer_id', 'nunique'),
+                   total_quantity=('quantity', 'sum'),
+                   avg_basket_size=('basket_size', 'mean'))
+    return engine
+
+
+def line_item_keys(frame):
+    """One string per row identifying its line item (LINE_ITEM_KEY), for duplicate detection"""
+    keys = frame[LINE_ITEM_KEY[0]].astype(str)
+    for column in LINE_ITEM_KEY[1:]:
+        keys = keys + '|' + frame[column].astype(str)
+    return keys.to_numpy(dtype=object)
+
+
+def add_partition_columns(frame):
+    """Dashboard columns plus the day (partition key) and month (year × 100 + month)"""
+    frame = prepare_dashboard_frame(frame)
+    frame['date'] = frame['timestamp'].dt.normalize()
+    frame['year_month'] = frame['year'] * 100 + frame['month']
+    return frame
+
+
+def partial_state(frame):
+    """Partial state of a frame prepared by add_partition_columns"""
+    revenue = declare_kpi_aggregates(declare_revenue_aggregates(StreamingAggregator())).update(frame)
+    dashboard = declare_dashboard_aggregates(FusedAggregator(frame)).run()
+    return Partial(revenue, dashboard, len(frame))
+
+
+def merge_partials(partial, other):
+    partial.revenue.merge(other.revenue)
+    partial.dashboard.merge(other.dashboard)
+    return partial._replace(rows=partial.rows + other.rows)
+
+
+def _dump(obj, path):
+    # Write-then-rename so an interrupted refresh never leaves a truncated partition behind
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _load(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _day_name(day):
+    return f"{pd.Timestamp(day):%Y-%m-%d}"
+
+
+def _write_day(day, partition, context):
+    # Runs in a forked worker: the state goes straight to disk, only the row count comes back
+    partial = partial_state(partition)
+    _dump(partial, Path(context['state_dir']) / 'days' / f"{_day_name(day)}.pkl")
+    return partial.rows
+
+
+class IncrementalAggregates:
+
+    def __init__(self, state_dir=STATE_DIR, store_dir=STORE_DIR):
+        self.state_dir = Path(state_dir)
+        self.store_dir = Path(store_dir)
+        state_path = self.state_dir / STATE_NAME
+        if state_path.exists():
+            with open(state_path) as f:
+                self.state = json.load(f)
+            with open(self.state_dir / DICTIONARIES_NAME) as f:
+                self.dictionaries = json.load(f)
+        else:
+            self.state = {'days': [], 'months': [], 'rows': 0, 'sample_products': []}
+            self.dictionaries = {}
+
+    def _path(self, kind, name):
+        return self.state_dir / kind / f"{name}.pkl"
+
+    def _save_state(self):
+        with open(self.state_dir / DICTIONARIES_NAME, 'w') as f:
+            json.dump(self.dictionaries, f)
+        self.state['updated'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        with open(self.state_dir / STATE_NAME, 'w') as f:
+            json.dump(self.state, f, indent=2)
+
+    # ------------------------------------------------------------------
+    # Partitions
+    # ------------------------------------------------------------------
+    def backfill(self, processes=None):
+        """Partition the whole dataset store by day (in parallel), then close every month but the latest"""
+        if self.state_dir.exists():
+            shutil.rmtree(self.state_dir)
+        self.state_dir.mkdir(parents=True)
+        self.__init__(self.state_dir, self.store_dir)
+
+        frame = add_partition_columns(load_dataset(SOURCE_COLUMNS, self.store_dir))
+        days = map_partitions(frame, 'date', _write_day, context={'state_dir': str(self.state_dir)},
+                              processes=processes)
+        self.state['days'] = sorted(_day_name(day) for day, _ in days)
+        self.state['rows'] = int(sum(rows for _, rows in days))
+        self.state['sample_products'] = [str(p) for p in frame['product_id'].unique()[:GROWTH_SAMPLE_SIZE]]
+
+        detector = DuplicateDetector(self.state_dir / DEDUP_NAME)
+        for chunk in iter_chunks(LINE_ITEM_KEY, self.store_dir):
+            detector.add(line_item_keys(chunk))
+        detector.save()
+
+        self._close_months()
+        self.remerge()
+        print(f"✓ Backfilled {self.state['rows']:,} rows into {len(days)} day partitions "
+              f"({len(self.state['months'])} closed months)")
+
+    def _close_months(self):
+        """Fold the days of every month before the latest into one month partition"""
+        if not self.state['days']:
+            return
+        open_month = max(self.state['days'])[:7]
+        for month in sorted({day[:7] for day in self.state['days'] if day[:7] < open_month}):
+            days = [day for day in self.state['days'] if day[:7] == month]
+            partial = _load(self._path('months', month)) if month in self.state['months'] else None
+            for day in days:
+                day_partial = _load(self._path('days', day))
+                partial = day_partial if partial is None else merge_partials(partial, day_partial)
+            _dump(partial, self._path('months', month))
+            for day in days:
+                self._path('days', day).unlink()
+            self.state['days'] = [day for day in self.state['days'] if day not in days]
+            self.state['months'] = sorted(set(self.state['months']) | {month})
+
+    def partitions(self):
+        return [self._path('months', m) for m in self.state['months']] + [self._path('days', d) for d in self.state['days']]
+
+    def remerge(self):
+        """Rebuild total.pkl from the partitions (after a backfill or a partition was replaced)"""
+        total = None
+        for path in self.partitions():
+            partial = _load(path)
+            total = partial if total is None else merge_partials(total, partial)
+        _dump(total, self.state_dir / 'total.pkl')
+        self._save_state()
+        return total
+
+    # ------------------------------------------------------------------
+    # Nightly append
+    # ------------------------------------------------------------------
+    def encode(self, frame):
+        """Cast a raw transactions frame to the store's types; unseen category values extend the dictionaries"""
+        frame = frame[SOURCE_COLUMNS].copy()
+        for name in SOURCE_COLUMNS:
+            kind, dtype = column_spec(name, self.store_dir)
+            if kind == 'category':
+                extra = self.dictionaries.setdefault(name, [])
+                known = set(dtype.categories) | set(extra)
+                values = frame[name].astype(object)
+                extra += [value for value in pd.unique(values.dropna()) if value not in known]
+                frame[name] = pd.Categorical(values, categories=list(dtype.categories) + extra)
+            elif kind == 'datetime':
+                # Same resolution as the store (to_datetime may infer µs): day keys must hash alike
+                frame[name] = pd.to_datetime(frame[name]).astype(dtype)
+            elif kind == 'bytes':
+                frame[name] = frame[name].astype(str)
+            else:
+                frame[name] = frame[name].astype(dtype)
+        return frame
+
+    def append(self, frame):
+        """Aggregate new transactions into their day partitions and the running total; returns rows added"""
+        if not (self.state_dir / STATE_NAME).exists():
+            raise FileNotFoundError(f"No incremental state at {self.state_dir}. Run: python3 incremental_aggregates.py --backfill")
+        detector = DuplicateDetector(self.state_dir / DEDUP_NAME)
+        ids = line_item_keys(frame)
+        # Skip line items of earlier loads and repeats within this file (first delivery kept)
+        new = ~detector.seen(ids) & ~pd.Series(ids).duplicated().to_numpy()
+        if not new.any():
+            print("✓ Nothing new (every line item was already aggregated)")
+            return 0
+        frame = add_partition_columns(self.encode(frame[new].reset_index(drop=True)))
+
+        total = _load(self.state_dir / 'total.pkl')
+        for day, day_frame in frame.groupby('date', sort=True):
+            name = _day_name(day)
+            partial = partial_state(day_frame.reset_index(drop=True))
+            total = merge_partials(total, partial)
+            # Late rows for an existing day (or an already closed month) merge into that partition
+            target = (self._path('months', name[:7]) if name[:7] in self.state['months']
+                      else self._path('days', name))
+            if target.exists():
+                partial = merge_partials(_load(target), partial)
+            _dump(partial, target)
+            if name[:7] not in self.state['months'] and name not in self.state['days']:
+                self.state['days'] = sorted(self.state['days'] + [name])
+            print(f"  {name}: {len(day_frame):,} rows")
+
+        detector.add(ids[new])
+        detector.save()
+        self.state['rows'] += int(new.sum())
+        self._close_months()
+        _dump(total, self.state_dir / 'total.pkl')
+        self._save_state()
+        return int(new.sum())
+
+    # ------------------------------------------------------------------
+    # Outputs
+    # ------------------------------------------------------------------
+    def write_outputs(self):
+        """Revenue tree CSVs, CEO dashboard and KPI tables from the running total"""
+        total = _load(self.state_dir / 'total.pkl')
+        build_revenue_tree(engine=total.revenue)
+        create_ceo_dashboard(engine=total.dashboard, sample_products=self.state['sample_products'])
+        for name, path in (('daily', KPI_DAILY_PATH), ('monthly', KPI_MONTHLY_PATH)):
+            kpis = total.revenue.result(name).reset_index()
+            key, column = KPI_LEVELS[name]
+            if name == 'daily':
+                kpis[column] = kpis[key].dt.strftime('%Y-%m-%d')
+            else:
+                kpis[column] = [f"{value // 100}-{value % 100:02d}" for value in kpis[key].tolist()]
+            kpis['avg_transaction_value'] = (kpis['revenue'] / kpis['transactions']).round(2)
+            kpis['avg_basket_size'] = kpis['avg_basket_size'].round(2)
+            kpis.to_csv(path, index=False)
+            print(f"✓ {path.name} ({len(kpis):,} rows)")
+
+
+def incremental_aggregates(mode='--append', csv_path=None, processes=None):
+    print("=" * 80)
+    print("INCREMENTAL DAILY AGGREGATES")
+    print("=" * 80)
+    start = time.time()
+    aggregates = IncrementalAggregates()
+    if mode == '--backfill':
+        aggregates.backfill(processes)
+    elif mode == '--remerge':
+        aggregates.remerge()
+    else:
+        rows = aggregates.append(pd.read_csv(csv_path, low_memory=False))
+        print(f"✓ Appended {rows:,} rows ({aggregates.state['rows']:,} total)")
+    aggregates.write_outputs()
+    print(f"✓ Refreshed in {time.time() - start:.2f}s")
+    return aggregates
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args or args[0] not in ('--backfill', '--append', '--remerge') or (args[0] == '--append' and len(args) < 2):
+        print(__doc__)
+        sys.exit(1)
+    jobs_arg = int(args[args.index('--jobs') + 1]) if '--jobs' in args else None
+    incremental_aggregates(args[0], args[1] if args[0] == '--append' else None, jobs_arg)
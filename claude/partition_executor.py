@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Partition-Parallel Executor
+Splits a frame once by a partition key (stable sort on the key codes, then contiguous
+slices) and maps a render function over the partitions in a fork-based process pool
+
+    sections = map_partitions(df, 'category', render_category_section, context={'total_revenue': total})
+    markdown = ''.join(section for _, section in sections)
+
+`render(key, partition, context)` must be a module-level function (it is sent to the workers
+by reference). The frame itself is never pickled: workers inherit it copy-on-write and only
+receive slice bounds. Results come back in first-appearance order of the key, like
+df[key].unique().
+
+map_blocks() is the pool underneath, for any work split into small task descriptors over
+large shared data (e.g. series blocks of a forecast matrix):
+
+    results = map_blocks(fit_block, [(0, 1000), (1000, 2000)], {'values': matrix})   # fit_block(task, shared)
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Set in the parent just before forking; read by the workers
+_SHARED = {}
+
+
+def partition_slices(series):
+    """(row order, [(key, start, stop), ...]): rows of each key are order[start:stop], keys in first-appearance order"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, labels = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, labels = pd.factorize(series)
+    valid = np.flatnonzero(codes >= 0)
+    order = valid[np.argsort(codes[valid], kind='stable')]
+    counts = np.bincount(codes[valid], minlength=len(labels))
+    stops = np.cumsum(counts)
+    starts = stops - counts
+    # First row of each key decides the output order (matches Series.unique())
+    first_rows = np.full(len(labels), len(series))
+    first_rows[counts > 0] = order[starts[counts > 0]]
+    present = np.flatnonzero(counts > 0)
+    present = present[np.argsort(first_rows[present], kind='stable')]
+    return order, [(labels[code], int(starts[code]), int(stops[code])) for code in present]
+
+
+def _run_task(task):
+    return _SHARED['func'](task, _SHARED['shared'])
+
+
+def map_blocks(func, tasks, shared, processes=None):
+    """
+    [func(task, shared), ...] in task order, over a fork-based process pool (serial for a single
+    task or worker). `func` must be module-level; `shared` is inherited by the workers, never pickled.
+    """
+    tasks = list(tasks)
+    workers = min(processes or os.cpu_count() or 1, len(tasks))
+    # A serial func may call map_blocks itself: restore the caller's state afterwards
+    previous = dict(_SHARED)
+    _SHARED.update(func=func, shared=shared)
+    try:
+        if workers <= 1:
+            return [_run_task(task) for task in tasks]
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+            return list(pool.map(_run_task, tasks))
+    finally:
+        _SHARED.clear()
+        _SHARED.update(previous)
+
+
+def _render_partition(task, shared):
+    key, start, stop = task
+    return shared['render'](key, shared['frame'].take(shared['order'][start:stop]), shared['context'])
+
+
+def map_partitions(frame, key, render, context=None, processes=None):
+    """[(key value, render(key value, partition, context)), ...] over every partition of `frame` by `key`"""
+    order, slices = partition_slices(frame[key])
+    tasks = [(value, start, stop) for value, start, stop in slices]
+    results = map_blocks(_render_partition, tasks,
+                         {'frame': frame, 'order': order, 'render': render, 'context': context}, processes)
+    return [(value, result) for (value, _, _), result in zip(tasks, results)]
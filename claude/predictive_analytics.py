@@ -9,6 +9,121 @@ import numpy as np
 from datetime import datetime, timedelta
 import json
 
+from dataset_store import load_dataset, partition_rows, load_dimension, id_codes, sums_by_code, first_rows_by_code
+from distinct_count import distinct_counts_by
+
+# Years compared by the YoY product, store and category growth
+YOY_YEARS = (2022, 2023)
+
+# Default churn comparison: H1 2023 activity vs H2 2023 activity, as (label, start, end) windows
+CHURN_WINDOWS = (('h1_2023', '2023-01-01', '2023-07-01'), ('h2_2023', '2023-07-01', '2024-01-01'))
+
+def detect_churn_risk(df, baseline_window=CHURN_WINDOWS[0], comparison_window=CHURN_WINDOWS[1],
+                      decline_threshold=0.5, high_risk_pct=75):
+    """
+    Customers whose transaction count in comparison_window fell below decline_threshold × their
+    baseline_window count. Windows are (label, start, end) with end exclusive; counts are taken
+    on int32 customer codes in one pass. Returns a typed frame sorted by decline_pct descending.
+    """
+    baseline_label, baseline_start, baseline_end = baseline_window
+    comparison_label, comparison_start, comparison_end = comparison_window
+    codes, labels = id_codes(df['customer_id'])
+    timestamps = df['timestamp'].to_numpy()
+
+    def window_counts(start, end):
+        in_window = (timestamps >= np.datetime64(pd.Timestamp(start))) & (timestamps < np.datetime64(pd.Timestamp(end)))
+        return np.bincount(codes[in_window & (codes >= 0)], minlength=len(labels))
+
+    baseline = window_counts(baseline_start, baseline_end)
+    comparison = window_counts(comparison_start, comparison_end)
+
+    at_risk = np.flatnonzero((baseline > 0) & (comparison < baseline * decline_threshold))
+    decline_pct = (baseline[at_risk] - comparison[at_risk]) / baseline[at_risk] * 100
+    churn = pd.DataFrame({
+        'customer_id': pd.Categorical.from_codes(at_risk, categories=labels),
+        f'{baseline_label}_transactions': baseline[at_risk].astype(np.int32),
+        f'{comparison_label}_transactions': comparison[at_risk].astype(np.int32),
+        'decline_pct': decline_pct.astype(np.float64),
+        'churn_risk': pd.Categorical(np.where(decline_pct > high_risk_pct, 'HIGH', 'MEDIUM'),
+                                     categories=['HIGH', 'MEDIUM'])
+    })
+    return churn.sort_values('decline_pct', ascending=False, kind='stable', ignore_index=True)
+
+def rolling_churn_risk(df, window_months=6, step_months=1, **kwargs):
+    """detect_churn_risk over consecutive equal-length windows sliding across the data, keyed by comparison label"""
+    first = df['timestamp'].min().to_period('M').to_timestamp()
+    last = df['timestamp'].max()
+    results = {}
+    start = first
+    while start + pd.DateOffset(months=2 * window_months) <= last + pd.DateOffset(months=1):
+        middle = start + pd.DateOffset(months=window_months)
+        end = middle + pd.DateOffset(months=window_months)
+        baseline = (f"{start:%Y_%m}", start, middle)
+        comparison = (f"{middle:%Y_%m}", middle, end)
+        results[comparison[0]] = detect_churn_risk(df, baseline, comparison, **kwargs)
+        start += pd.DateOffset(months=step_months)
+    return results
+
+def yearly_sums_by_code(partition, id_column, size):
+    """Revenue per id code within one year partition (codes share the store dictionary)"""
+    codes, _ = id_codes(partition[id_column])
+    return sums_by_code(codes, partition['total_amount'].to_numpy(), size)
+
+def segments_by_year(df, segment_column='customer_type'):
+    """{year: int32 segment code per customer code (-1 = not active that year)}, plus customer and segment labels"""
+    customer_codes, customer_labels = id_codes(df['customer_id'])
+    segment_codes, segment_labels = id_codes(df[segment_column])
+    years = df['year'].to_numpy()
+    by_year = {}
+    for year in np.unique(years):
+        # First non-null segment of each customer within the year (as groupby(...).first())
+        rows = np.flatnonzero((years == year) & (customer_codes >= 0) & (segment_codes >= 0))
+        customers, first = np.unique(customer_codes[rows], return_index=True)
+        segment = np.full(len(customer_labels), -1, dtype=np.int32)
+        segment[customers] = segment_codes[rows[first]]
+        by_year[int(year)] = segment
+    return by_year, customer_labels, segment_labels
+
+def segment_migration_matrix(from_segments, to_segments, segment_labels):
+    """Exact from-segment × to-segment customer counts for customers active in both years"""
+    both = (from_segments >= 0) & (to_segments >= 0)
+    k = len(segment_labels)
+    counts = np.bincount(from_segments[both] * k + to_segments[both], minlength=k * k).reshape(k, k)
+    return pd.DataFrame(counts, index=pd.Index(segment_labels, name='from_segment'),
+                        columns=pd.Index(segment_labels, name='to_segment'))
+
+def segment_migration_matrices(df, segment_column='customer_type'):
+    """Transition matrix for every (earlier year, later year) pair, keyed like '2022→2023'"""
+    by_year, _, segment_labels = segments_by_year(df, segment_column)
+    years = sorted(by_year)
+    return {
+        f"{from_year}→{to_year}": segment_migration_matrix(by_year[from_year], by_year[to_year], segment_labels)
+        for i, from_year in enumerate(years) for to_year in years[i + 1:]
+    }
+
+def migration_summary(matrix):
+    """Off-diagonal transitions as {'From → To': customers}"""
+    return {
+        f"{from_segment} → {to_segment}": int(count)
+        for from_segment, row in matrix.iterrows()
+        for to_segment, count in row.items()
+        if from_segment != to_segment and count > 0
+    }
+
+def _churn_records(churn):
+    """JSON-ready dicts for a churn frame (numpy scalars converted)"""
+    records = []
+    for row in churn.itertuples(index=False):
+        record = {}
+        for column, value in zip(churn.columns, row):
+            if isinstance(value, (np.integer, int)) and not isinstance(value, bool):
+                value = int(value)
+            elif isinstance(value, (np.floating, float)):
+                value = float(value)
+            record[column] = value
+        records.append(record)
+    return records
+
 def predictive_analytics():
     print("=" * 80)
     print("PHASE 1.3: PREDICTIVE ANALYTICS")
@@ -17,13 +132,21 @@ def predictive_analytics():
 
     # Load dataset
     print("Loading dataset...")
-    df = pd.read_csv('/Users/arghya.mukherjee/Downloads/cursor/sd ceo/grocery_dataset.csv')
+    df = load_dataset(columns=[
+        'timestamp', 'store_id', 'product_id', 'category', 'total_amount',
+        'customer_id', 'customer_type',
+        'season'
+    ])
     df['timestamp'] = pd.to_datetime(df['timestamp'])
     df['year'] = df['timestamp'].dt.year
     df['quarter'] = df['timestamp'].dt.quarter
     df['month'] = df['timestamp'].dt.month
     df['year_quarter'] = df['year'].astype(str) + '-Q' + df['quarter'].astype(str)
     print(f"✓ Loaded {len(df):,} rows")
+    # The two comparison years: their partitions' row ids index the frame already loaded, so the
+    # store is read once and the years are gathered without a mask over every row
+    yearly = {year: df[['store_id', 'product_id', 'category', 'total_amount']].take(partition_rows(year=year))
+              for year in YOY_YEARS}
     print()
 
     predictions = {}
@@ -34,7 +157,7 @@ def predictive_analytics():
     print("1. Revenue Forecasting...")
 
     # Quarterly revenue trend
-    quarterly = df.groupby('year_quarter')['total_amount'].sum().sort_index()
+    quarterly = df.groupby('year_quarter', observed=True)['total_amount'].sum().sort_index()
     print(f"\nHistorical Quarterly Revenue:")
     for quarter, rev in quarterly.items():
         print(f"  {quarter}: ${rev:,.2f}")
@@ -63,8 +186,8 @@ def predictive_analytics():
 
     # Annual projection
     annual_2024_forecast = sum(f['forecasted_revenue'] for f in forecasts_q)
-    annual_2023 = df[df['year'] == 2023]['total_amount'].sum()
-    annual_2022 = df[df['year'] == 2022]['total_amount'].sum()
+    annual_2023 = yearly[2023]['total_amount'].sum()
+    annual_2022 = yearly[2022]['total_amount'].sum()
 
     print(f"\nAnnual Revenue:")
     print(f"  2022 (Actual): ${annual_2022:,.2f}")
@@ -73,7 +196,7 @@ def predictive_analytics():
     print(f"  2024 YoY Growth: {((annual_2024_forecast - annual_2023) / annual_2023 * 100):.2f}%")
 
     # Seasonality patterns
-    seasonal = df.groupby('season')['total_amount'].sum()
+    seasonal = df.groupby('season', observed=True)['total_amount'].sum()
     seasonal_pct = (seasonal / seasonal.sum() * 100)
 
     predictions['revenue_forecasting'] = {
@@ -94,70 +217,39 @@ def predictive_analytics():
     # ========================================================================
     print("\n2. Customer Behavior Prediction...")
 
-    # Customer frequency analysis
-    customer_txn_count = df.groupby('customer_id').size()
-
     # Churn risk (customers with declining frequency)
-    h1_2023 = df[(df['year'] == 2023) & (df['month'] <= 6)].groupby('customer_id').size()
-    h2_2023 = df[(df['year'] == 2023) & (df['month'] > 6)].groupby('customer_id').size()
-
-    # Find customers with declining activity
-    declining_customers = []
-    for cid in h1_2023.index:
-        h1_count = h1_2023.get(cid, 0)
-        h2_count = h2_2023.get(cid, 0)
-        if h2_count < h1_count * 0.5:  # 50% decline
-            decline_pct = ((h1_count - h2_count) / h1_count * 100)
-            declining_customers.append({
-                'customer_id': cid,
-                'h1_2023_transactions': int(h1_count),
-                'h2_2023_transactions': int(h2_count),
-                'decline_pct': float(decline_pct),
-                'churn_risk': 'HIGH' if decline_pct > 75 else 'MEDIUM'
-            })
+    churn = detect_churn_risk(df)
+    high_churn_risk_count = int((churn['churn_risk'] == 'HIGH').sum())
 
-    declining_customers = sorted(declining_customers, key=lambda x: x['decline_pct'], reverse=True)
-    high_churn_risk_count = len([c for c in declining_customers if c['churn_risk'] == 'HIGH'])
-
-    print(f"  Customers at Churn Risk: {len(declining_customers):,}")
+    print(f"  Customers at Churn Risk: {len(churn):,}")
     print(f"  High Churn Risk: {high_churn_risk_count:,}")
 
-    # Customer segment migration
-    segment_2022 = df[df['year'] == 2022].groupby('customer_id')['customer_type'].first()
-    segment_2023 = df[df['year'] == 2023].groupby('customer_id')['customer_type'].first()
-
-    # Common customers
-    common_custs = set(segment_2022.index) & set(segment_2023.index)
-    migrations = []
-    for cid in list(common_custs)[:1000]:  # Sample
-        seg_2022 = segment_2022[cid]
-        seg_2023 = segment_2023[cid]
-        if seg_2022 != seg_2023:
-            migrations.append({
-                'from_segment': seg_2022,
-                'to_segment': seg_2023
-            })
-
-    migration_summary = {}
-    for m in migrations:
-        key = f"{m['from_segment']} → {m['to_segment']}"
-        migration_summary[key] = migration_summary.get(key, 0) + 1
+    # Customer segment migration (all customers, every year pair)
+    migration_matrices = segment_migration_matrices(df)
+    migration_2022_2023 = migration_matrices['2022→2023']
+    migrations = migration_summary(migration_2022_2023)
 
-    print(f"  Customer Segment Migrations: {len(migrations)} (sample)")
+    print(f"  Customer Segment Migrations: {sum(migrations.values()):,} of "
+          f"{int(migration_2022_2023.to_numpy().sum()):,} returning customers")
 
     # CLV projections
-    avg_clv_by_segment = df.groupby('customer_type').apply(
-        lambda x: x['total_amount'].sum() / x['customer_id'].nunique()
-    )
+    avg_clv_by_segment = (df.groupby('customer_type', observed=True)['total_amount'].sum() /
+                          distinct_counts_by(df['customer_type'], df['customer_id']))
 
     predictions['customer_behavior'] = {
         'churn_risk_analysis': {
-            'total_at_risk': len(declining_customers),
+            'total_at_risk': len(churn),
             'high_risk_count': high_churn_risk_count,
-            'medium_risk_count': len(declining_customers) - high_churn_risk_count,
-            'top_20_at_risk': declining_customers[:20]
+            'medium_risk_count': len(churn) - high_churn_risk_count,
+            'top_20_at_risk': _churn_records(churn.head(20))
+        },
+        'segment_migration': migrations,
+        'segment_migration_matrices': {
+            pair: {
+                from_segment: {to_segment: int(count) for to_segment, count in row.items()}
+                for from_segment, row in matrix.iterrows()
+            } for pair, matrix in migration_matrices.items()
         },
-        'segment_migration': migration_summary,
         'clv_by_segment': {seg: float(clv) for seg, clv in avg_clv_by_segment.items()}
     }
 
@@ -166,23 +258,26 @@ def predictive_analytics():
     # ========================================================================
     print("\n3. Product Demand Forecasting...")
 
-    # Top products with growth trends
-    product_2022 = df[df['year'] == 2022].groupby('product_id')['total_amount'].sum()
-    product_2023 = df[df['year'] == 2023].groupby('product_id')['total_amount'].sum()
+    # Top products with growth trends (aggregated on int32 product codes, decoded only for output)
+    product_codes, product_labels = id_codes(df['product_id'])
+    product_2022, product_2023 = (yearly_sums_by_code(yearly[year], 'product_id', len(product_labels))
+                                  for year in YOY_YEARS)
+    product_first_rows = first_rows_by_code(product_codes, len(product_labels))
+    product_dim = load_dimension('product_dim')
 
     product_forecasts = []
-    for pid in df['product_id'].unique():
-        rev_2022 = product_2022.get(pid, 0)
-        rev_2023 = product_2023.get(pid, 0)
+    for code in np.argsort(product_first_rows, kind='stable'):  # first-appearance order
+        rev_2022 = product_2022[code]
+        rev_2023 = product_2023[code]
 
-        if rev_2022 > 0:
+        if product_first_rows[code] >= 0 and rev_2022 > 0:
             growth = ((rev_2023 - rev_2022) / rev_2022)
             forecast_2024 = rev_2023 * (1 + growth)
 
             product_forecasts.append({
-                'product_id': pid,
-                'product_name': df[df['product_id'] == pid]['product_name'].iloc[0],
-                'category': df[df['product_id'] == pid]['category'].iloc[0],
+                'product_id': product_labels[code],
+                'product_name': product_dim['product_name'].iat[code],
+                'category': product_dim['category'].iat[code],
                 'revenue_2022': float(rev_2022),
                 'revenue_2023': float(rev_2023),
                 'growth_pct': float(growth * 100),
@@ -198,8 +293,8 @@ def predictive_analytics():
         print(f"    {p['product_name']}: {p['growth_pct']:.1f}% growth")
 
     # Category growth predictions
-    category_2022 = df[df['year'] == 2022].groupby('category')['total_amount'].sum()
-    category_2023 = df[df['year'] == 2023].groupby('category')['total_amount'].sum()
+    category_2022 = yearly[2022].groupby('category', observed=True)['total_amount'].sum()
+    category_2023 = yearly[2023].groupby('category', observed=True)['total_amount'].sum()
 
     category_forecasts = {}
     for cat in df['category'].unique():
@@ -226,20 +321,28 @@ def predictive_analytics():
     print("\n4. Risk Identification...")
 
     # Declining stores
-    store_2022 = df[df['year'] == 2022].groupby('store_id')['total_amount'].sum()
-    store_2023 = df[df['year'] == 2023].groupby('store_id')['total_amount'].sum()
+    store_codes, store_labels = id_codes(df['store_id'])
+    store_2022, store_2023 = (yearly_sums_by_code(yearly[year], 'store_id', len(store_labels)) for year in YOY_YEARS)
+    store_first_rows = first_rows_by_code(store_codes, len(store_labels))
+    store_order = [code for code in np.argsort(store_first_rows, kind='stable') if store_first_rows[code] >= 0]
+    store_dim = load_dimension('store_dim')
+
+    def store_attributes(code):
+        return {
+            'store_id': store_labels[code],
+            'region': store_dim['store_region'].iat[code],
+            'store_type': store_dim['store_type'].iat[code]
+        }
 
     declining_stores = []
-    for sid in df['store_id'].unique():
-        rev_2022 = store_2022.get(sid, 0)
-        rev_2023 = store_2023.get(sid, 0)
+    for code in store_order:
+        rev_2022 = store_2022[code]
+        rev_2023 = store_2023[code]
         if rev_2022 > 0:
             change = ((rev_2023 - rev_2022) / rev_2022 * 100)
             if change < -5:  # Declining by more than 5%
                 declining_stores.append({
-                    'store_id': sid,
-                    'region': df[df['store_id'] == sid]['store_region'].iloc[0],
-                    'store_type': df[df['store_id'] == sid]['store_type'].iloc[0],
+                    **store_attributes(code),
                     'revenue_2022': float(rev_2022),
                     'revenue_2023': float(rev_2023),
                     'decline_pct': float(change),
@@ -274,7 +377,7 @@ def predictive_analytics():
             'declining_stores': declining_stores
         },
         'customers_at_risk': {
-            'total_count': len(declining_customers),
+            'total_count': len(churn),
             'high_risk_count': high_churn_risk_count
         },
         'declining_categories': declining_categories
@@ -287,16 +390,14 @@ def predictive_analytics():
 
     # High-growth potential stores
     growing_stores = []
-    for sid in df['store_id'].unique():
-        rev_2022 = store_2022.get(sid, 0)
-        rev_2023 = store_2023.get(sid, 0)
+    for code in store_order:
+        rev_2022 = store_2022[code]
+        rev_2023 = store_2023[code]
         if rev_2022 > 0:
             growth = ((rev_2023 - rev_2022) / rev_2022 * 100)
             if growth > 10:  # Growing by more than 10%
                 growing_stores.append({
-                    'store_id': sid,
-                    'region': df[df['store_id'] == sid]['store_region'].iloc[0],
-                    'store_type': df[df['store_id'] == sid]['store_type'].iloc[0],
+                    **store_attributes(code),
                     'revenue_2023': float(rev_2023),
                     'growth_pct': float(growth),
                     'growth_potential': 'HIGH' if growth > 20 else 'MEDIUM'
@@ -309,7 +410,7 @@ def predictive_analytics():
         print(f"  Top Growth Store: {growing_stores[0]['store_id']} ({growing_stores[0]['growth_pct']:.1f}%)")
 
     # Cross-sell opportunities (customers buying only from few categories)
-    customer_categories = df.groupby('customer_id')['category'].nunique()
+    customer_categories = df.groupby('customer_id', observed=True)['category'].nunique()
     low_diversity_customers = customer_categories[customer_categories <= 3]
 
     print(f"  Cross-sell Opportunities: {len(low_diversity_customers):,} customers")
@@ -346,9 +447,8 @@ def predictive_analytics():
     print(f"✓ Quarterly forecast CSV saved: {forecast_csv}")
 
     # Save churn risk CSV
-    churn_df = pd.DataFrame(declining_customers)
     churn_csv = '/Users/arghya.mukherjee/Downloads/cursor/sd ceo/claude/metadata_ceo/customer_churn_risk.csv'
-    churn_df.to_csv(churn_csv, index=False)
+    churn.to_csv(churn_csv, index=False)
     print(f"✓ Churn risk CSV saved: {churn_csv}")
 
     # Create summary markdown
@@ -370,9 +470,9 @@ Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
     summary += f"""
 ## Customer Behavior Predictions
 
-- **Customers at Churn Risk**: {len(declining_customers):,}
+- **Customers at Churn Risk**: {len(churn):,}
   - High Risk: {high_churn_risk_count:,}
-  - Medium Risk: {len(declining_customers) - high_churn_risk_count:,}
+  - Medium Risk: {len(churn) - high_churn_risk_count:,}
 
 - **Cross-sell Opportunities**: {len(low_diversity_customers):,} customers with low category diversity
 
@@ -403,7 +503,7 @@ Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
     print("✅ PREDICTIVE ANALYTICS COMPLETE!")
     print("=" * 80)
     print(f"2024 Revenue Forecast: ${annual_2024_forecast:,.2f}")
-    print(f"Customers at Risk: {len(declining_customers):,}")
+    print(f"Customers at Risk: {len(churn):,}")
     print(f"Growth Opportunities: {len(growing_stores)} stores")
     print(f"Files Created: 4 (JSON, 2 CSVs, MD)")
 
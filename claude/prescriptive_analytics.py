@@ -9,6 +9,9 @@ import numpy as np
 from datetime import datetime
 import json
 
+from dataset_store import load_dataset, join_dimension
+from distinct_count import distinct_count
+
 def prescriptive_analytics():
     print("=" * 80)
     print("PHASE 1.4: PRESCRIPTIVE ANALYTICS")
@@ -17,7 +20,12 @@ def prescriptive_analytics():
 
     # Load dataset
     print("Loading dataset...")
-    df = pd.read_csv('/Users/arghya.mukherjee/Downloads/cursor/sd ceo/grocery_dataset.csv')
+    df = load_dataset(columns=[
+        'transaction_id', 'timestamp', 'store_id', 'store_region', 'store_type',
+        'product_id', 'category', 'brand', 'quantity', 'total_amount', 'customer_id',
+        'customer_type', 'loyalty_points_used', 'stock_level_at_sale', 'delivery_method',
+        'employee_id', 'checkout_duration_sec', 'is_organic'
+    ])
     df['timestamp'] = pd.to_datetime(df['timestamp'])
     df['year'] = df['timestamp'].dt.year
     print(f"✓ Loaded {len(df):,} rows")
@@ -40,11 +48,11 @@ def prescriptive_analytics():
     print("1. Revenue Optimization Recommendations...")
 
     # Identify stores to expand
-    store_performance = df.groupby(['store_id', 'store_region', 'store_type']).agg({
+    store_performance = join_dimension(df.groupby('store_id', observed=True).agg({
         'total_amount': 'sum',
         'customer_id': 'nunique',
         'transaction_id': 'count'
-    }).reset_index()
+    }), 'store_dim')
     store_performance['revenue_per_customer'] = (store_performance['total_amount'] /
                                                    store_performance['customer_id'])
 
@@ -80,7 +88,7 @@ def prescriptive_analytics():
         })
 
     # Category expansion
-    category_revenue = df.groupby('category')['total_amount'].sum().sort_values(ascending=False)
+    category_revenue = df.groupby('category', observed=True)['total_amount'].sum().sort_values(ascending=False)
     top_category = category_revenue.index[0]
     top_category_rev = category_revenue.iloc[0]
 
@@ -101,7 +109,7 @@ def prescriptive_analytics():
     print("2. Customer Strategy Recommendations...")
 
     # Customer segmentation analysis
-    segment_analysis = df.groupby('customer_type').agg({
+    segment_analysis = df.groupby('customer_type', observed=True).agg({
         'customer_id': 'nunique',
         'total_amount': 'sum',
         'transaction_id': 'count'
@@ -188,7 +196,7 @@ def prescriptive_analytics():
     })
 
     # Staffing optimization
-    emp_productivity = df.groupby('employee_id')['transaction_id'].count().mean()
+    emp_productivity = df.groupby('employee_id', observed=True)['transaction_id'].count().mean()
 
     recommendations['operational_improvements'].append({
         'initiative': "Dynamic Staffing Model",
@@ -207,7 +215,7 @@ def prescriptive_analytics():
     print("4. Product Strategy Recommendations...")
 
     # Private label opportunity
-    brand_revenue = df.groupby('brand')['total_amount'].sum().sort_values(ascending=False)
+    brand_revenue = df.groupby('brand', observed=True)['total_amount'].sum().sort_values(ascending=False)
     total_brand_rev = brand_revenue.sum()
 
     recommendations['product_strategy'].append({
@@ -222,11 +230,11 @@ def prescriptive_analytics():
     })
 
     # Product mix optimization
-    slow_movers = df.groupby('product_id')['quantity'].sum().nsmallest(10)
+    slow_movers = df.groupby('product_id', observed=True)['quantity'].sum().nsmallest(10)
 
     recommendations['product_strategy'].append({
         'initiative': "SKU Rationalization Program",
-        'current_state': f"{df['product_id'].nunique()} SKUs, bottom 20% contribute <5% revenue",
+        'current_state': f"{distinct_count(df['product_id'])} SKUs, bottom 20% contribute <5% revenue",
         'gap_analysis': "Excessive SKU count increasing complexity and costs",
         'recommended_action': "Discontinue bottom 15% SKUs, reinvest shelf space in top performers and new products",
         'expected_impact': f"5% inventory cost reduction (${total_revenue * 0.25 * 0.05:,.0f}), improved shelf productivity",
@@ -255,7 +263,7 @@ def prescriptive_analytics():
     # ========================================================================
     print("5. Regional Strategy Recommendations...")
 
-    regional = df.groupby('store_region').agg({
+    regional = df.groupby('store_region', observed=True).agg({
         'total_amount': 'sum',
         'store_id': 'nunique',
         'customer_id': 'nunique'
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Retrieval Index
+Prebuilt BM25 / TF-IDF index over the CEO question bank, the story files and the prompt
+templates, persisted as NumPy arrays and memory-mapped on load, so the passages relevant to
+a question are found without reading every file
+
+    index = open_index()                      # builds (or rebuilds when a source changed)
+    for hit in index.search("why is revenue declining?", k=5):
+        print(hit.score, hit.source, hit.title)
+    context = index.context("why is revenue declining?", k=5, max_chars=4000)
+
+Documents:
+    question bank   one per entry: question / answer / data_source / drill_down (+ category)
+    story/templates one per section: split at headings (#, Q1 —, ===== banners), long sections
+                    cut at paragraph boundaries into passages of ~MAX_PASSAGE_CHARS
+
+On disk (retrieval_index/): index.json (terms, document metadata, source hashes) plus
+CSR postings (offsets / docs / term frequencies / TF-IDF weights), document lengths, idf and
+the passage text, all .npy / .bin files opened with mmap.
+
+Usage: python3 retrieval_index.py [--rebuild] ["question" [k]]
+"""
+
+import hashlib
+import json
+import re
+import sys
+import time
+from collections import Counter, namedtuple
+from pathlib import Path
+
+import numpy as np
+
+from dataset_store import BASE_DIR, METADATA_CEO_DIR
+
+INDEX_DIR = METADATA_CEO_DIR / "retrieval_index"
+QUESTION_BANK_PATH = METADATA_CEO_DIR / "ceo_question_bank.json"
+TEXT_SOURCES = [
+    BASE_DIR / "claude" / "ceo_ultimate" / "ceo_story_ultimate.txt",
+    BASE_DIR / "claude" / "ceo_ultimate" / "ceo_prompt_template_ultimate.txt",
+    BASE_DIR / "claude" / "ceo_ultimate" / "ceo_prompt_template_ultimate_v3.txt",
+    BASE_DIR / "ceo_final" / "ceo_prompt_template.txt",
+    BASE_DIR / "metadata" / "store_manager_story_improved.txt",
+    BASE_DIR / "metadata" / "store_manager_prompt_template.txt",
+]
+QA_FIELDS = ('question', 'answer', 'data_source', 'drill_down')
+
+INDEX_VERSION = 1
+MAX_PASSAGE_CHARS = 1500
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have how i in is it its me my of on or our so that the
+their them then there these this to was we were what when where which who why will with you your
+""".split())
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+HEADING_PATTERN = re.compile(r"^(#{1,6}\s+\S.*|\s*Q\d+\s*[—:\-.].*|\s*ACT \d+:.*|[A-Z][A-Z0-9 &/'’\-]{6,}:?)$")
+RULE_PATTERN = re.compile(r"^\s*([=\-─━*])\1{9,}\s*$")
+
+Hit = namedtuple('Hit', ['score', 'doc', 'source', 'title', 'text'])
+
+
+def _stem(token):
+    """Light plural folding so 'customers' matches 'customer'"""
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    return [_stem(token) for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+# ----------------------------------------------------------------------
+# Documents
+# ----------------------------------------------------------------------
+def question_bank_documents(path=QUESTION_BANK_PATH):
+    with open(path) as f:
+        bank = json.load(f)
+    documents = []
+    for category, entries in bank.items():
+        for entry in entries:
+            text = "\n".join(f"{field}: {entry[field]}" for field in QA_FIELDS if entry.get(field))
+            documents.append({'source': Path(path).name, 'title': entry.get('question', category),
+                              'category': category, 'data_source': entry.get('data_source'), 'text': text})
+    return documents
+
+
+def _passages(lines):
+    """Cut a section's lines into passages of at most MAX_PASSAGE_CHARS, at blank lines where possible"""
+    passages, current, size = [], [], 0
+    for line in lines:
+        if current and size + len(line) > MAX_PASSAGE_CHARS and (not line.strip() or size > 2 * MAX_PASSAGE_CHARS):
+            passages.append("\n".join(current).strip())
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        passages.append("\n".join(current).strip())
+    return [passage for passage in passages if passage]
+
+
+def text_documents(path):
+    """One document per heading-delimited section (long sections split into passages)"""
+    sections, title, lines = [], Path(path).stem, []
+    for line in Path(path).read_text(encoding='utf-8').splitlines():
+        if RULE_PATTERN.match(line):
+            continue
+        if HEADING_PATTERN.match(line.strip()) and any(l.strip() for l in lines):
+            sections.append((title, lines))
+            lines = []
+        if HEADING_PATTERN.match(line.strip()):
+            title = line.strip().lstrip('#').strip()
+        lines.append(line)
+    sections.append((title, lines))
+
+    documents = []
+    for title, section_lines in sections:
+        for passage in _passages(section_lines):
+            documents.append({'source': Path(path).name, 'title': title, 'text': passage})
+    return documents
+
+
+def source_paths(question_bank=QUESTION_BANK_PATH, text_sources=TEXT_SOURCES):
+    return [Path(p) for p in [question_bank] + list(text_sources) if Path(p).exists()]
+
+
+def source_hashes(paths):
+    return {str(path): hashlib.sha256(path.read_bytes()).hexdigest() for path in paths}
+
+
+# ----------------------------------------------------------------------
+# Build
+# ----------------------------------------------------------------------
+def build_index(index_dir=INDEX_DIR, question_bank=QUESTION_BANK_PATH, text_sources=TEXT_SOURCES):
+    """Tokenize every source into documents and write the index arrays; returns the document count"""
+    start = time.time()
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    paths = source_paths(question_bank, text_sources)
+
+    documents = []
+    for path in paths:
+        documents.extend(question_bank_documents(path) if path.suffix == '.json' else text_documents(path))
+
+    counts = [Counter(tokenize(doc['title'] + "\n" + doc['text'])) for doc in documents]
+    terms = sorted(set().union(*counts)) if counts else []
+    term_ids = {term: i for i, term in enumerate(terms)}
+
+    # CSR postings, term-major: term t's documents are docs[offsets[t]:offsets[t + 1]]
+    term_col, doc_col, tf_col = [], [], []
+    for doc, counter in enumerate(counts):
+        term_col.extend(term_ids[term] for term in counter)
+        doc_col.extend([doc] * len(counter))
+        tf_col.extend(counter.values())
+    term_col = np.asarray(term_col, dtype=np.int64)
+    order = np.lexsort((np.asarray(doc_col, dtype=np.int64), term_col))
+    postings_docs = np.asarray(doc_col, dtype=np.int32)[order]
+    postings_tf = np.asarray(tf_col, dtype=np.float32)[order]
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_col, minlength=len(terms)), out=offsets[1:])
+
+    n_docs = len(documents)
+    document_frequency = np.diff(offsets).astype(np.float64)
+    doc_lengths = np.asarray([sum(counter.values()) for counter in counts], dtype=np.float32)
+    # BM25 idf (non-negative variant)
+    idf = np.log(1 + (n_docs - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+
+    # TF-IDF: (1 + log tf) × idf, L2-normalised per document
+    weights = (1 + np.log(postings_tf)) * np.repeat(idf, np.diff(offsets))
+    norms = np.sqrt(np.bincount(postings_docs, weights=weights.astype(np.float64) ** 2, minlength=n_docs))
+    postings_tfidf = (weights / np.where(norms > 0, norms, 1)[postings_docs]).astype(np.float32)
+
+    encoded = [doc['text'].encode('utf-8') for doc in documents]
+    text_offsets = np.zeros(n_docs + 1, dtype=np.int64)
+    np.cumsum([len(text) for text in encoded], out=text_offsets[1:])
+    with open(index_dir / 'text.bin', 'wb') as f:
+        f.write(b''.join(encoded))
+
+    np.save(index_dir / 'offsets.npy', offsets)
+    np.save(index_dir / 'postings_docs.npy', postings_docs)
+    np.save(index_dir / 'postings_tf.npy', postings_tf)
+    np.save(index_dir / 'postings_tfidf.npy', postings_tfidf)
+    np.save(index_dir / 'doc_lengths.npy', doc_lengths)
+    np.save(index_dir / 'idf.npy', idf)
+    np.save(index_dir / 'text_offsets.npy', text_offsets)
+
+    meta = {
+        'version': INDEX_VERSION,
+        'sources': source_hashes(paths),
+        'documents': [{key: value for key, value in doc.items() if key != 'text'} for doc in documents],
+        'terms': terms,
+        'avg_length': float(doc_lengths.mean()) if n_docs else 0.0,
+        'k1': BM25_K1,
+        'b': BM25_B,
+    }
+    with open(index_dir / 'index.json', 'w') as f:
+        json.dump(meta, f)
+
+    print(f"✓ Retrieval index: {n_docs:,} documents, {len(terms):,} terms from {len(paths)} sources "
+          f"({time.time() - start:.2f}s) → {index_dir}")
+    return n_docs
+
+
+# ----------------------------------------------------------------------
+# Search
+# ----------------------------------------------------------------------
+class RetrievalIndex:
+
+    def __init__(self, index_dir=INDEX_DIR):
+        self.index_dir = Path(index_dir)
+        with open(self.index_dir / 'index.json') as f:
+            meta = json.load(f)
+        self.sources = meta['sources']
+        self.documents = meta['documents']
+        self.term_ids = {term: i for i, term in enumerate(meta['terms'])}
+        self.avg_length = meta['avg_length']
+        self.k1, self.b = meta['k1'], meta['b']
+        load = lambda name: np.load(self.index_dir / name, mmap_mode='r')
+        self.offsets = load('offsets.npy')
+        self.postings_docs = load('postings_docs.npy')
+        self.postings_tf = load('postings_tf.npy')
+        self.postings_tfidf = load('postings_tfidf.npy')
+        self.doc_lengths = load('doc_lengths.npy')
+        self.idf = load('idf.npy')
+        self.text_offsets = load('text_offsets.npy')
+        self.text_bytes = np.memmap(self.index_dir / 'text.bin', dtype=np.uint8, mode='r') \
+            if self.text_offsets[-1] else np.empty(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def is_stale(self, paths=None):
+        """True when a source file changed (or appeared/disappeared) since the index was built"""
+        paths = source_paths() if paths is None else [Path(p) for p in paths]
+        return source_hashes(paths) != self.sources
+
+    def text(self, doc):
+        start, end = self.text_offsets[doc], self.text_offsets[doc + 1]
+        return self.text_bytes[start:end].tobytes().decode('utf-8')
+
+    def scores(self, query, method='bm25'):
+        """Score of every document for `query` ('bm25' or 'tfidf' cosine)"""
+        scores = np.zeros(len(self.documents), dtype=np.float64)
+        query_terms = Counter(term for term in tokenize(query) if term in self.term_ids)
+        if method == 'tfidf':
+            weights = {term: (1 + np.log(count)) * self.idf[self.term_ids[term]] for term, count in query_terms.items()}
+            norm = np.sqrt(sum(w * w for w in weights.values())) or 1.0
+        elif method != 'bm25':
+            raise ValueError(f"Unknown retrieval method '{method}' (use 'bm25' or 'tfidf')")
+        for term in query_terms:
+            t = self.term_ids[term]
+            start, end = self.offsets[t], self.offsets[t + 1]
+            docs = self.postings_docs[start:end]
+            # A term's postings hold each document once, so plain fancy-index accumulation is safe
+            if method == 'bm25':
+                tf = self.postings_tf[start:end]
+                lengths = self.doc_lengths[docs] / self.avg_length
+                scores[docs] += self.idf[t] * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * lengths))
+            else:
+                scores[docs] += weights[term] / norm * self.postings_tfidf[start:end]
+        return scores
+
+    def search(self, query, k=5, method='bm25', source=None):
+        """Top-k Hits, best first (only documents sharing at least one term with the query)"""
+        scores = self.scores(query, method)
+        if source is not None:
+            scores[[doc['source'] != source for doc in self.documents]] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [Hit(float(scores[doc]), int(doc), self.documents[doc]['source'], self.documents[doc]['title'],
+                    self.text(doc)) for doc in candidates]
+
+    def context(self, query, k=5, max_chars=4000, method='bm25'):
+        """Top hits joined into a prompt context block, cut at max_chars"""
+        blocks, size = [], 0
+        for hit in self.search(query, k, method):
+            block = f"[{hit.source} › {hit.title}]\n{hit.text}"
+            if blocks and size + len(block) > max_chars:
+                break
+            blocks.append(block[:max_chars - size])
+            size += len(blocks[-1])
+        return "\n\n".join(blocks)
+
+
+def load_index(index_dir=INDEX_DIR):
+    return RetrievalIndex(index_dir)
+
+
+def open_index(index_dir=INDEX_DIR):
+    """Load the index, building it first when it is missing, from an older version, or stale"""
+    index_path = Path(index_dir) / 'index.json'
+    if index_path.exists():
+        with open(index_path) as f:
+            version = json.load(f).get('version')
+        if version == INDEX_VERSION:
+            index = RetrievalIndex(index_dir)
+            if not index.is_stale():
+                return index
+    build_index(index_dir)
+    return RetrievalIndex(index_dir)
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != '--rebuild']
+    if '--rebuild' in sys.argv[1:] or not args:
+        build_index()
+    if args:
+        index = open_index()
+        k = int(args[1]) if len(args) > 1 else 5
+        start = time.perf_counter()
+        hits = index.search(args[0], k)
+        print(f"Top {len(hits)} for \"{args[0]}\" ({(time.perf_counter() - start) * 1000:.2f} ms):")
+        for hit in hits:
+            print(f"  {hit.score:7.3f}  {hit.source} › {hit.title}")
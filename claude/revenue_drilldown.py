@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Revenue Tree Drill-Down Service
+Lazy, on-demand access to the Region → Store → Category → Sub-Category → Brand → SKU tree,
+backed by the compact revenue_tree_aggregates.csv written by build_revenue_tree.py
+
+Usage: python3 revenue_drilldown.py [North/STR_000017/Beverages] [top_n] [offset]
+"""
+
+import sys
+import time
+
+import pandas as pd
+
+from build_revenue_tree import AGGREGATES_PATH, TREE_KEYS, rollup_revenue_level
+
+LEVEL_NAMES = ['region', 'store', 'category', 'sub_category', 'brand', 'sku']
+
+
+class RevenueTreeDrillDown:
+    """Children of any node path in milliseconds; levels are rolled up the first time they are visited"""
+
+    def __init__(self, aggregates_path=AGGREGATES_PATH):
+        self.leaves = pd.read_csv(aggregates_path, dtype={key: str for key in TREE_KEYS + ['store_type']})
+        self.total_revenue = float(self.leaves['revenue'].sum())
+        self.total_transactions = int(self.leaves['transaction_count'].sum())
+        self.store_types = dict(zip(self.leaves['store_id'], self.leaves['store_type']))
+        self._levels = {}
+        self._children_index = {}
+
+    def _level(self, depth):
+        """Rollup table for the first `depth` keys, sorted by revenue descending"""
+        if depth not in self._levels:
+            if depth == len(TREE_KEYS):
+                level = self.leaves.sort_values('revenue', ascending=False, kind='mergesort', ignore_index=True)
+            else:
+                level = rollup_revenue_level(self.leaves, depth)
+            self._levels[depth] = level
+        return self._levels[depth]
+
+    def _children_positions(self, depth):
+        """Parent path tuple → row positions of its children at `depth`, already in revenue order"""
+        if depth not in self._children_index:
+            level = self._level(depth)
+            if depth == 1:
+                self._children_index[depth] = {(): list(range(len(level)))}
+            else:
+                parent_keys = TREE_KEYS[:depth - 1]
+                groups = level.groupby(parent_keys, sort=False).indices
+                self._children_index[depth] = {
+                    (key if isinstance(key, tuple) else (key,)): sorted(positions)
+                    for key, positions in groups.items()
+                }
+        return self._children_index[depth]
+
+    @staticmethod
+    def _split(path):
+        if isinstance(path, (list, tuple)):
+            return tuple(path)
+        return tuple(part for part in path.strip('/').split('/') if part)
+
+    def node(self, path=''):
+        """Revenue summary for a single node ('' is the company total)"""
+        parts = self._split(path)
+        if not parts:
+            return {
+                'path': '',
+                'level': 'total',
+                'revenue': self.total_revenue,
+                'revenue_formatted': f"${self.total_revenue:,.2f}",
+                'transaction_count': self.total_transactions,
+                'avg_transaction_value': self.total_revenue / self.total_transactions
+            }
+        if len(parts) > len(TREE_KEYS):
+            raise KeyError(f"Path too deep: {'/'.join(parts)}")
+        depth = len(parts)
+        positions = self._children_positions(depth).get(parts[:-1], [])
+        level = self._level(depth)
+        for pos in positions:
+            if level.at[pos, TREE_KEYS[depth - 1]] == parts[-1]:
+                return self._format_row(level, pos, depth, None)
+        raise KeyError(f"No such node: {'/'.join(parts)}")
+
+    def children(self, path='', top_n=None, offset=0):
+        """Revenue-ranked children of `path`, paginated with top_n/offset"""
+        parts = self._split(path)
+        depth = len(parts) + 1
+        if depth > len(TREE_KEYS):
+            raise KeyError(f"SKU nodes have no children: {'/'.join(parts)}")
+        parent = self.node(parts)
+        positions = self._children_positions(depth).get(parts)
+        if positions is None:
+            raise KeyError(f"No such node: {'/'.join(parts)}")
+        page = positions[offset:] if top_n is None else positions[offset:offset + top_n]
+        level = self._level(depth)
+        return {
+            'path': '/'.join(parts),
+            'level': LEVEL_NAMES[depth - 1],
+            'parent_revenue': parent['revenue'],
+            'total_children': len(positions),
+            'offset': offset,
+            'children': [self._format_row(level, pos, depth, parent['revenue']) for pos in page]
+        }
+
+    def top(self, level_name, top_n=10, offset=0):
+        """Company-wide top-N nodes at one level (e.g. top stores or top SKUs by revenue)"""
+        depth = LEVEL_NAMES.index(level_name) + 1
+        level = self._level(depth)
+        if depth == len(TREE_KEYS):
+            # The same SKU appears under every store; rank SKUs company-wide
+            level = level.groupby(['product_id', 'product_name'], sort=False)[
+                ['revenue', 'transaction_count', 'quantity']
+            ].sum().reset_index().sort_values('revenue', ascending=False, kind='mergesort', ignore_index=True)
+        elif depth > 2:
+            level = level.groupby(TREE_KEYS[2:depth], sort=False)[
+                ['revenue', 'transaction_count', 'quantity']
+            ].sum().reset_index().sort_values('revenue', ascending=False, kind='mergesort', ignore_index=True)
+        rows = level.iloc[offset:offset + top_n]
+        result = []
+        for record in rows.to_dict('records'):
+            record['revenue_formatted'] = f"${record['revenue']:,.2f}"
+            record['percentage_of_total'] = record['revenue'] / self.total_revenue * 100
+            result.append(record)
+        return result
+
+    def _format_row(self, level, pos, depth, parent_revenue):
+        row = level.iloc[pos]
+        key_path = [row[key] for key in TREE_KEYS[:depth]]
+        revenue = float(row['revenue'])
+        node = {
+            'name': key_path[-1],
+            'path': '/'.join(key_path),
+            'revenue': revenue,
+            'revenue_formatted': f"${revenue:,.2f}",
+            'percentage_of_total': revenue / self.total_revenue * 100,
+            'transaction_count': int(row['transaction_count']),
+            'avg_transaction_value': revenue / int(row['transaction_count']),
+            'has_children': depth < len(TREE_KEYS)
+        }
+        if parent_revenue is not None:
+            node['percentage_of_parent'] = revenue / parent_revenue * 100
+        if depth == 2:
+            node['store_type'] = self.store_types.get(key_path[-1])
+        if depth == len(TREE_KEYS):
+            node['product_name'] = row['product_name']
+            node['quantity_sold'] = int(row['quantity'])
+        return node
+
+
+if __name__ == "__main__":
+    path_arg = sys.argv[1] if len(sys.argv) > 1 else ''
+    top_n_arg = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    offset_arg = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+    service = RevenueTreeDrillDown()
+    start = time.time()
+    result = service.children(path_arg, top_n=top_n_arg, offset=offset_arg)
+    elapsed_ms = (time.time() - start) * 1000
+
+    print(f"{result['path'] or 'TOTAL'} → {result['level']} "
+          f"({result['total_children']} children, showing {offset_arg + 1}-{offset_arg + len(result['children'])})")
+    for child in result['children']:
+        print(f"  {child['name']:30s} {child['revenue_formatted']:>18s} ({child['percentage_of_parent']:5.2f}% of parent)")
+    print(f"Answered in {elapsed_ms:.1f} ms")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Vectorized Rule Engine
+Declarative first-match classification rules (classification_rules.json), compiled to
+NumPy masks and evaluated with np.select, so every row of a frame is labelled in one shot
+
+    rules = load_rules()
+    stores['recommendation'] = classify(stores, rules['top_store'], reference=all_stores)
+
+A rule set has:
+    statistics   named thresholds computed once over the reference frame (median, mean, quantile)
+    rules        ordered {"when": [[column, op, value], ...], "then": label}; conditions are ANDed,
+                 a value of "$name" refers to a statistic, the first matching rule wins
+    default      label for rows no rule matches
+"""
+
+import json
+import operator
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RULES_PATH = Path(__file__).resolve().parent / 'classification_rules.json'
+
+OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+
+def load_rules(path=RULES_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def rule_statistics(ruleset, reference):
+    """Named thresholds of a rule set, evaluated once over the reference frame"""
+    values = {}
+    for name, spec in ruleset.get('statistics', {}).items():
+        column = reference[spec['column']]
+        if spec['stat'] == 'quantile':
+            values[name] = column.quantile(spec['q'])
+        elif spec['stat'] in ('median', 'mean', 'min', 'max'):
+            values[name] = getattr(column, spec['stat'])()
+        else:
+            raise ValueError(f"Unsupported rule statistic '{spec['stat']}' for {name}")
+    return values
+
+
+def compile_conditions(frame, ruleset, statistics):
+    """One boolean mask per rule (its conditions ANDed); NaN compares False, like the row-wise checks"""
+    masks = []
+    for rule in ruleset['rules']:
+        mask = np.ones(len(frame), dtype=bool)
+        for column, op, value in rule['when']:
+            if op not in OPERATORS:
+                raise ValueError(f"Unsupported rule operator '{op}' in rule '{rule['then']}'")
+            if isinstance(value, str) and value.startswith('$'):
+                value = statistics[value[1:]]
+            mask &= OPERATORS[op](frame[column].to_numpy(dtype=np.float64), value)
+        masks.append(mask)
+    return masks
+
+
+def classify(frame, ruleset, reference=None):
+    """Label every row of `frame` with the first matching rule; thresholds come from `reference` (default `frame`)"""
+    statistics = rule_statistics(ruleset, frame if reference is None else reference)
+    masks = compile_conditions(frame, ruleset, statistics)
+    labels = np.array([rule['then'] for rule in ruleset['rules']] + [ruleset['default']], dtype=object)
+    # np.select over label positions, then one take: keeps the labels as Python strings
+    choice = np.select(masks, np.arange(len(masks)), default=len(masks)) if masks else np.full(len(frame), 0)
+    return pd.Series(labels[choice], index=frame.index, name=ruleset.get('output'))
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Phase 1.x Pipeline Runner
+Runs the CEO metadata phases as a dependency graph over their metadata_ceo/ artifacts:
+- a phase is skipped when the content hashes of its inputs (dataset manifest, upstream
+  artifacts, its own code) and outputs match the last successful run
+- phases whose dependencies are satisfied run in parallel worker processes
+- the dataset store is decoded once in the runner and inherited by every forked worker
+
+Usage: python3 run_pipeline.py [--force] [--jobs N] [phase ...]
+       (naming phases runs them plus whatever they depend on)
+"""
+
+import ast
+import contextlib
+import hashlib
+import importlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+from dataset_store import BASE_DIR, METADATA_CEO_DIR, STORE_DIR, MANIFEST_NAME, share_dataset
+from retrieval_index import INDEX_DIR, TEXT_SOURCES
+from rule_engine import RULES_PATH
+
+CODE_DIR = Path(__file__).resolve().parent
+STORY_PATH = BASE_DIR / "claude" / "ceo_ultimate" / "ceo_story_ultimate.txt"
+PIPELINE_DIR = BASE_DIR / "claude" / ".pipeline"
+STATE_PATH = PIPELINE_DIR / "state.json"
+DATASET = 'dataset'
+
+REVENUE_TREE_CSVS = ['revenue_by_region.csv', 'revenue_by_store.csv', 'revenue_by_category.csv',
+                     'revenue_by_subcategory.csv', 'revenue_by_brand.csv', 'revenue_by_sku.csv']
+
+# name → module, entry point, inputs (DATASET or metadata_ceo artifacts), outputs
+PHASES = {
+    'validate_dataset': {
+        'module': 'validate_dataset', 'entry': 'validate_dataset',
+        'inputs': [DATASET],
+        'outputs': ['data_validation_report.md', 'dataset_stats.json'],
+    },
+    'build_revenue_tree': {
+        'module': 'build_revenue_tree', 'entry': 'build_revenue_tree',
+        'inputs': [DATASET],
+        'outputs': REVENUE_TREE_CSVS + ['revenue_tree_aggregates.csv'],
+    },
+    'create_ceo_dashboard': {
+        'module': 'create_ceo_dashboard', 'entry': 'create_ceo_dashboard',
+        'inputs': [DATASET],
+        'outputs': ['ceo_executive_dashboard.json', 'ceo_executive_dashboard.csv', 'descriptive_analytics_summary.md'],
+    },
+    'granular_insights': {
+        'module': 'granular_insights', 'entry': 'granular_insights',
+        'inputs': [DATASET, str(RULES_PATH)],
+        'outputs': ['store_insights_top_50.csv', 'store_insights_bottom_50.csv', 'product_insights_top_100.csv',
+                    'customer_segment_deep_dive.md', 'category_deep_dive_all.md', 'regional_market_analysis.md'],
+    },
+    'predictive_analytics': {
+        'module': 'predictive_analytics', 'entry': 'predictive_analytics',
+        'inputs': [DATASET],
+        'outputs': ['predictive_analytics_forecasts.json', 'revenue_forecast_next_4_quarters.csv',
+                    'customer_churn_risk.csv', 'predictive_insights_summary.md'],
+    },
+    'prescriptive_analytics': {
+        'module': 'prescriptive_analytics', 'entry': 'prescriptive_analytics',
+        'inputs': [DATASET],
+        'outputs': ['prescriptive_recommendations.json', 'strategic_initiatives_roadmap.csv',
+                    'investment_opportunities.csv', 'prescriptive_recommendations.md'],
+    },
+    'demand_forecast': {
+        'module': 'demand_forecast', 'entry': 'demand_forecast',
+        'inputs': [DATASET],
+        'outputs': ['demand_forecast/manifest.json'],
+    },
+    'forecast_backtest': {
+        'module': 'forecast_backtest', 'entry': 'forecast_backtest',
+        'inputs': [DATASET],
+        'outputs': ['forecast_backtest_summary.csv', 'forecast_backtest_report.md'],
+    },
+    'forecast_reconciliation': {
+        'module': 'forecast_reconciliation', 'entry': 'forecast_reconciliation',
+        'inputs': [DATASET],
+        'outputs': ['reconciled_forecast/manifest.json'],
+    },
+    'ceo_metadata_layer': {
+        'module': 'ceo_metadata_layer', 'entry': 'ceo_metadata_layer',
+        'inputs': [DATASET, 'ceo_executive_dashboard.json'],
+        'outputs': ['ceo_executive_summary.md', 'board_meeting_briefing_pack.md', 'ceo_question_bank.json',
+                    'strategic_decision_support.md', 'business_context_metadata_ceo.json'],
+    },
+    'data_validation': {
+        'module': 'data_validation', 'entry': 'data_validation',
+        'inputs': [DATASET, 'revenue_by_region.csv', 'revenue_by_store.csv', 'revenue_by_category.csv',
+                   'ceo_executive_dashboard.json'],
+        'outputs': ['data_validation_report_final.md', 'reconciliation_summary.csv'],
+    },
+    'generate_ceo_story_ultimate': {
+        'module': 'generate_ceo_story_ultimate', 'entry': 'main',
+        'inputs': ['ceo_executive_dashboard.json', 'predictive_analytics_forecasts.json',
+                   'prescriptive_recommendations.json', 'business_context_metadata_ceo.json',
+                   'revenue_by_region.csv', 'revenue_by_store.csv', 'revenue_by_category.csv',
+                   'product_insights_top_100.csv', 'store_insights_top_50.csv', 'customer_churn_risk.csv'],
+        'outputs': [str(STORY_PATH)],
+    },
+    'add_operational_questions': {
+        'module': 'add_operational_questions', 'entry': 'main',
+        # Rewrites the story in place, so it always runs after (and only after) a fresh story
+        'inputs': ['ceo_executive_dashboard.json', 'predictive_analytics_forecasts.json',
+                   'revenue_by_category.csv', 'revenue_by_subcategory.csv', 'product_insights_top_100.csv',
+                   str(STORY_PATH)],
+        'outputs': [str(STORY_PATH)],
+        'after': ['generate_ceo_story_ultimate'],
+    },
+    'retrieval_index': {
+        'module': 'retrieval_index', 'entry': 'build_index',
+        'inputs': ['ceo_question_bank.json'] + [str(path) for path in TEXT_SOURCES],
+        'outputs': [str(INDEX_DIR / 'index.json')],
+        # Indexes the story as rewritten by add_operational_questions
+        'after': ['add_operational_questions'],
+    },
+}
+
+
+def artifact_path(name):
+    return Path(name) if os.path.isabs(name) else METADATA_CEO_DIR / name
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_files(module):
+    """The phase module plus every local module it imports (transitively)"""
+    seen, pending = set(), [module]
+    while pending:
+        name = pending.pop()
+        path = CODE_DIR / f"{name}.py"
+        if name in seen or not path.exists():
+            continue
+        seen.add(name)
+        for node in ast.walk(ast.parse(path.read_text())):
+            if isinstance(node, ast.ImportFrom) and node.module:
+                pending.append(node.module.split('.')[0])
+            elif isinstance(node, ast.Import):
+                pending.extend(alias.name.split('.')[0] for alias in node.names)
+    return sorted(CODE_DIR / f"{name}.py" for name in seen)
+
+
+def producers():
+    """artifact → phase that writes it (the first writer; in-place rewriters chain through 'after')"""
+    produced = {}
+    for name, phase in PHASES.items():
+        for output in phase['outputs']:
+            produced.setdefault(output, name)
+    return produced
+
+
+def dependencies():
+    produced = producers()
+    deps = {}
+    for name, phase in PHASES.items():
+        upstream = {produced[i] for i in phase['inputs'] if i in produced and produced[i] != name}
+        upstream.update(phase.get('after', []))
+        deps[name] = upstream
+    return deps
+
+
+def input_hashes(name):
+    phase = PHASES[name]
+    hashes = {}
+    for item in phase['inputs']:
+        if item == DATASET:
+            hashes[DATASET] = file_hash(Path(STORE_DIR) / MANIFEST_NAME)
+        else:
+            path = artifact_path(item)
+            hashes[item] = file_hash(path) if path.exists() else None
+    for path in code_files(phase['module']):
+        hashes[path.name] = file_hash(path)
+    return hashes
+
+
+def output_hashes(name):
+    hashes = {}
+    for item in PHASES[name]['outputs']:
+        path = artifact_path(item)
+        hashes[item] = file_hash(path) if path.exists() else None
+    return hashes
+
+
+def load_state():
+    if STATE_PATH.exists():
+        with open(STATE_PATH) as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state):
+    PIPELINE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(STATE_PATH, 'w') as f:
+        json.dump(state, f, indent=2)
+
+
+def is_up_to_date(name, state):
+    record = state.get(name)
+    if not record:
+        return False
+    if record['inputs'] != input_hashes(name):
+        return False
+    outputs = output_hashes(name)
+    return None not in outputs.values() and outputs == record['outputs']
+
+
+def _run_phase(name):
+    """Worker: import the phase module and call its entry point, logging stdout to .pipeline/<phase>.log"""
+    phase = PHASES[name]
+    PIPELINE_DIR.mkdir(parents=True, exist_ok=True)
+    start = time.time()
+    with open(PIPELINE_DIR / f"{name}.log", 'w') as log, contextlib.redirect_stdout(log):
+        module = importlib.import_module(phase['module'])
+        getattr(module, phase['entry'])()
+    return time.time() - start
+
+
+def run_pipeline(targets=None, force=False, jobs=None):
+    deps = dependencies()
+    selected = set(targets or PHASES)
+    unknown = selected - set(PHASES)
+    if unknown:
+        raise KeyError(f"Unknown phase(s): {', '.join(sorted(unknown))}. Known: {', '.join(PHASES)}")
+    pending = list(selected)
+    while pending:
+        for dep in deps[pending.pop()]:
+            if dep not in selected:
+                selected.add(dep)
+                pending.append(dep)
+
+    print("=" * 80)
+    print("PHASE 1.x PIPELINE")
+    print("=" * 80)
+
+    state = load_state()
+    done, rerun, failed = set(), set(), set()
+    waiting = [name for name in PHASES if name in selected]
+
+    def ready(name):
+        return deps[name] <= done
+
+    def decide(name):
+        # Any upstream rerun invalidates; otherwise compare content hashes with the last run
+        return force or bool(deps[name] & rerun) or not is_up_to_date(name, state)
+
+    context = multiprocessing.get_context('fork')
+    shared = False
+    running = {}
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count(), mp_context=context) as pool:
+        while waiting or running:
+            for name in [n for n in waiting if ready(n)]:
+                waiting.remove(name)
+                if not decide(name):
+                    print(f"  ↷ {name:30s} up to date, skipped")
+                    done.add(name)
+                    continue
+                if not shared and DATASET in PHASES[name]['inputs']:
+                    # Decode once before the first fork; workers inherit the columns copy-on-write
+                    print(f"  Sharing dataset store with workers ({share_dataset()} columns)...")
+                    shared = True
+                state[name] = {'inputs': input_hashes(name)}
+                running[pool.submit(_run_phase, name)] = name
+                print(f"  ▶ {name}")
+
+            blocked = [n for n in waiting if deps[n] & failed]
+            for name in blocked:
+                waiting.remove(name)
+                failed.add(name)
+                print(f"  ✗ {name:30s} not run (upstream failed)")
+            if not running:
+                if waiting and not any(ready(n) for n in waiting):
+                    raise RuntimeError(f"Dependency cycle among: {', '.join(waiting)}")
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    elapsed = future.result()
+                except Exception as exc:
+                    failed.add(name)
+                    state.pop(name, None)
+                    print(f"  ✗ {name:30s} failed: {exc!r} (log: {PIPELINE_DIR / (name + '.log')})")
+                    continue
+                record = state[name]
+                outputs = output_hashes(name)
+                # In-place rewrites (the operational questions appended to the story): record the rewritten
+                # file as this phase's input and as the original producer's output, so neither reruns next time
+                record['inputs'].update({item: h for item, h in outputs.items() if item in record['inputs']})
+                for other, other_record in state.items():
+                    if other != name and 'outputs' in other_record:
+                        other_record['outputs'].update(
+                            {item: h for item, h in outputs.items() if item in other_record['outputs']})
+                record['outputs'] = outputs
+                record['finished'] = time.strftime('%Y-%m-%d %H:%M:%S')
+                record['seconds'] = round(elapsed, 2)
+                save_state(state)
+                done.add(name)
+                rerun.add(name)
+                print(f"  ✓ {name:30s} {elapsed:7.1f}s")
+
+    save_state(state)
+    print()
+    print(f"Ran {len(rerun)}, skipped {len(done) - len(rerun)}, failed {len(failed)}")
+    return not failed
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    force_arg = '--force' in args
+    jobs_arg = None
+    if '--jobs' in args:
+        jobs_arg = int(args[args.index('--jobs') + 1])
+        del args[args.index('--jobs'):args.index('--jobs') + 2]
+    targets_arg = [a for a in args if not a.startswith('--')]
+    sys.exit(0 if run_pipeline(targets_arg or None, force=force_arg, jobs=jobs_arg) else 1)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Streaming Aggregation Engine
+Group-by aggregates computed chunk by chunk with mergeable partial states, so a full
+pass over the dataset needs memory proportional to the number of groups, not rows
+
+    engine = StreamingAggregator()
+    engine.add('by_region', ['store_region'],
+               revenue=('total_amount', 'sum'),
+               customers=('customer_id', 'nunique'),
+               largest_baskets=('total_amount', 'top_k', 5))
+    engine.consume(iter_chunks(columns=['store_region', 'total_amount', 'customer_id']))
+    by_region = engine.result('by_region')
+
+Supported aggregates (named like pandas named aggregation):
+    sum, count, size, mean, min, max, first, last   per-group scalars, merged by sum/min/max/first/last
+    nunique                                         exact distinct count: a bitmap of dictionary codes for
+                                                    categorical columns, a set of value hashes otherwise
+    approx_nunique                                  HyperLogLog per group, (column, 'approx_nunique', precision)
+    top_k                                           k largest values per group, (column, 'top_k', k)
+
+Partial states of two aggregators over disjoint rows merge with merge(), so chunks can
+be processed in separate processes (or separate days) and combined afterwards.
+"""
+
+import numpy as np
+import pandas as pd
+
+from distinct_count import DEFAULT_HLL_PRECISION, GroupedBitmap, GroupedHyperLogLog, value_codes
+
+DEFAULT_TOP_K = 10
+
+# Partial columns each scalar aggregate keeps, and how partials of the same group merge
+SCALAR_PARTIALS = {
+    'sum': [('sum', 'sum')],
+    'count': [('count', 'sum')],
+    'size': [('size', 'sum')],
+    'mean': [('sum', 'sum'), ('count', 'sum')],
+    'min': [('min', 'min')],
+    'max': [('max', 'max')],
+    'first': [('first', 'first')],
+    'last': [('last', 'last')],
+}
+HASHED_AGGREGATES = ('nunique', 'approx_nunique', 'top_k')
+
+# Stand-in group key for aggregations declared with no keys
+ALL_ROWS_KEY = '__all__'
+
+
+def _hash_rows(frame):
+    """64-bit hash per row of `frame` (all columns combined)"""
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+class _PerGroupValues:
+    """
+    Per-group bag of (group hash, value) pairs kept sorted by group then value.
+    limit=None keeps every distinct value (exact nunique of hashed values); otherwise only
+    the `limit` smallest are kept (a top-k, with negated values).
+    """
+
+    def __init__(self, limit=None, distinct=True):
+        self.limit = limit
+        self.distinct = distinct
+        self.groups = np.empty(0, dtype=np.uint64)
+        self.values = np.empty(0)
+        self._pending = []
+        self._pending_rows = 0
+
+    def add(self, groups, values):
+        self._pending.append((groups, values))
+        self._pending_rows += len(groups)
+        # Amortized compaction: only re-sort once the backlog outgrows the compacted state
+        if self._pending_rows > max(len(self.groups), 1_000_000):
+            self.compact()
+
+    def merge(self, other):
+        other.compact()
+        self.add(other.groups, other.values)
+
+    def compact(self):
+        if not self._pending:
+            return
+        keep_state = [(self.groups, self.values)] if len(self.groups) else []
+        groups = np.concatenate([g for g, _ in keep_state + self._pending])
+        values = np.concatenate([v for _, v in keep_state + self._pending])
+        self._pending, self._pending_rows = [], 0
+        order = np.lexsort((values, groups))
+        groups, values = groups[order], values[order]
+        if self.distinct and len(groups):
+            keep = np.ones(len(groups), dtype=bool)
+            keep[1:] = (groups[1:] != groups[:-1]) | (values[1:] != values[:-1])
+            groups, values = groups[keep], values[keep]
+        if self.limit is not None and len(groups):
+            starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+            rank = np.arange(len(groups)) - np.repeat(starts, np.diff(np.r_[starts, len(groups)]))
+            keep = rank < self.limit
+            groups, values = groups[keep], values[keep]
+        self.groups, self.values = groups, values
+
+    def by_group(self):
+        """group hash → (start, stop) slice into the compacted arrays"""
+        self.compact()
+        if not len(self.groups):
+            return {}
+        starts = np.flatnonzero(np.r_[True, self.groups[1:] != self.groups[:-1]])
+        stops = np.r_[starts[1:], len(self.groups)]
+        return dict(zip(self.groups[starts].tolist(), zip(starts.tolist(), stops.tolist())))
+
+
+class _GroupedAggregation:
+
+    def __init__(self, keys, aggregations):
+        self.keys = list(keys) or [ALL_ROWS_KEY]
+        self.has_keys = bool(keys)
+        self.aggregations = {}
+        for output, spec in aggregations.items():
+            column, func = spec[0], spec[1]
+            param = spec[2] if len(spec) > 2 else None
+            if func not in SCALAR_PARTIALS and func not in HASHED_AGGREGATES:
+                raise ValueError(f"Unsupported streaming aggregate '{func}' for {output}")
+            self.aggregations[output] = (column, func, param)
+
+        # Partial scalar columns; every aggregation keeps a row count so each group has an index entry
+        self.partials = {'__rows__': ('__rows__', 'size', 'sum')}
+        self.hashed = {}
+        for output, (column, func, param) in self.aggregations.items():
+            if func in SCALAR_PARTIALS:
+                for suffix, merge in SCALAR_PARTIALS[func]:
+                    self.partials[f"{output}__{suffix}"] = (column, suffix, merge)
+            elif func == 'nunique':
+                # Bitmap or hash set, decided by the column type of the first chunk
+                self.hashed[output] = None
+            elif func == 'approx_nunique':
+                self.hashed[output] = GroupedHyperLogLog(precision=param or DEFAULT_HLL_PRECISION)
+            else:
+                self.hashed[output] = _PerGroupValues(limit=param or DEFAULT_TOP_K, distinct=False)
+        self._pending = []
+        self._state = None
+
+    def _with_group_key(self, chunk):
+        if self.has_keys:
+            return chunk
+        return chunk.assign(**{ALL_ROWS_KEY: np.zeros(len(chunk), dtype=np.int8)})
+
+    def update(self, chunk):
+        chunk = self._with_group_key(chunk)
+        grouped = chunk.groupby(self.keys, observed=True, sort=False)
+        partial = grouped.agg(**{
+            name: ((column if column != '__rows__' else self.keys[0]), suffix)
+            for name, (column, suffix, _) in self.partials.items()
+        })
+        self._pending.append(partial)
+        if len(self._pending) >= 16:
+            self._compact()
+
+        if self.hashed:
+            key_frame = chunk[self.keys]
+            valid_keys = key_frame.notna().all(axis=1).to_numpy()
+            group_hashes = _hash_rows(key_frame)
+            for output, state in self.hashed.items():
+                column, func, _ = self.aggregations[output]
+                values = chunk[column]
+                valid = valid_keys & values.notna().to_numpy()
+                coded = value_codes(values) if func == 'nunique' else None
+                if state is None:
+                    state = GroupedBitmap(coded[1]) if coded else _PerGroupValues(limit=None, distinct=True)
+                    self.hashed[output] = state
+                if func == 'top_k':
+                    state.add(group_hashes[valid], -values.to_numpy(dtype=np.float64)[valid])
+                elif func == 'approx_nunique':
+                    state.add_hashes(group_hashes[valid], _hash_rows(values[valid].to_frame()))
+                elif isinstance(state, GroupedBitmap):
+                    state.add(group_hashes[valid], coded[0][valid])
+                else:
+                    state.add(group_hashes[valid], _hash_rows(values[valid].to_frame()))
+
+    def _compact(self, sort=False):
+        frames = ([self._state] if self._state is not None else []) + self._pending
+        if not frames:
+            return
+        combined = pd.concat(frames)
+        self._state = combined.groupby(level=list(range(len(self.keys))), observed=True, sort=sort).agg(
+            {name: merge for name, (_, _, merge) in self.partials.items()}
+        )
+        self._pending = []
+
+    def merge(self, other):
+        other._compact()
+        if other._state is not None:
+            self._pending.append(other._state)
+        for output, state in self.hashed.items():
+            if other.hashed[output] is None:
+                continue
+            if state is None:
+                self.hashed[output] = other.hashed[output]
+            else:
+                state.merge(other.hashed[output])
+
+    def result(self):
+        self._compact(sort=True)
+        if self._state is None:
+            return pd.DataFrame(columns=list(self.aggregations))
+        state = self._state
+        out = pd.DataFrame(index=state.index)
+        group_hashes = _hash_rows(state.index.to_frame(index=False)) if self.hashed else None
+        for output, (column, func, param) in self.aggregations.items():
+            if func == 'mean':
+                out[output] = state[f"{output}__sum"] / state[f"{output}__count"]
+            elif func in SCALAR_PARTIALS:
+                out[output] = state[f"{output}__{func}"]
+            else:
+                out[output] = self._finalize_hashed(self.hashed[output], func, group_hashes)
+        if not self.has_keys:
+            return out.iloc[0]
+        return out
+
+    @staticmethod
+    def _finalize_hashed(state, func, group_hashes):
+        if state is None:
+            return [[] if func == 'top_k' else 0] * len(group_hashes)
+        if isinstance(state, (GroupedBitmap, GroupedHyperLogLog)):
+            return state.counts(group_hashes).tolist()
+        slices = state.by_group()
+        results = []
+        for group in group_hashes.tolist():
+            start, stop = slices.get(group, (0, 0))
+            values = state.values[start:stop]
+            if func == 'top_k':
+                results.append((-values).tolist())
+            else:
+                results.append(len(values))
+        return results
+
+
+class StreamingAggregator:
+    """Named grouped aggregations fed by a stream of DataFrame chunks"""
+
+    def __init__(self):
+        self._aggregations = {}
+        self.rows = 0
+
+    def add(self, name, keys, **aggregations):
+        """Declare output=(column, func[, param]) aggregations grouped by `keys` ([] for totals)"""
+        self._aggregations[name] = _GroupedAggregation(keys, aggregations)
+        return self
+
+    def update(self, chunk):
+        for aggregation in self._aggregations.values():
+            aggregation.update(chunk)
+        self.rows += len(chunk)
+        return self
+
+    def consume(self, chunks, progress_every=10):
+        for i, chunk in enumerate(chunks):
+            self.update(chunk)
+            if progress_every and (i + 1) % progress_every == 0:
+                print(f"  Processed {self.rows:,} rows...")
+        return self
+
+    def merge(self, other):
+        """Fold in the partial states of another aggregator with the same declarations"""
+        for name, aggregation in self._aggregations.items():
+            aggregation.merge(other._aggregations[name])
+        self.rows += other.rows
+        return self
+
+    def result(self, name):
+        """DataFrame indexed by the group keys (sorted like groupby), or a Series for key-less totals"""
+        return self._aggregations[name].result()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Answers of the structured query layer must match the dataset they were aggregated from
+
+    python3 -m pytest -q test_aggregate_query.py
+
+revenue_by_brand.csv is written the way build_revenue_tree writes it (one row per category and
+brand) from the synthetic transactions, whose brands each span several categories.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregate_query import AggregateQueries
+from test_incremental_aggregates import synthetic_transactions
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    return synthetic_transactions()
+
+
+@pytest.fixture(scope='module')
+def queries(dataset, tmp_path_factory):
+    directory = tmp_path_factory.mktemp('metadata_ceo')
+    brand_csv = dataset.groupby(['category', 'brand']).agg(
+        revenue=('total_amount', 'sum'), transaction_count=('transaction_id', 'count'),
+        unique_customers=('customer_id', 'nunique'), total_quantity=('quantity', 'sum')).reset_index()
+    brand_csv['revenue_percentage'] = (brand_csv['revenue'] / dataset['total_amount'].sum() * 100).round(2)
+    brand_csv['avg_transaction_value'] = (brand_csv['revenue'] / brand_csv['transaction_count']).round(2)
+    brand_csv.sort_values('revenue', ascending=False).to_csv(directory / 'revenue_by_brand.csv', index=False)
+    return AggregateQueries(directory, kpi_dir=directory)
+
+
+def test_brand_totals_span_categories(dataset, queries):
+    totals = dataset.groupby('brand')['total_amount'].sum().sort_values(ascending=False)
+    assert dataset.groupby('brand')['category'].nunique().min() > 1
+
+    top = queries.ask("Which brand has the highest revenue?")['rows']
+    assert [row['brand'] for row in top] == [totals.index[0]]
+    assert top[0]['revenue'] == pytest.approx(totals.iloc[0])
+
+    brand = totals.index[-1]
+    lookup = queries.ask(f"How is {brand} doing?")['rows']
+    assert len(lookup) == 1 and lookup[0]['revenue'] == pytest.approx(totals[brand])
+
+    breakdown = queries.ask("Revenue by brand")['rows']
+    assert [row['brand'] for row in breakdown] == list(totals.index)
+    np.testing.assert_allclose([row['revenue'] for row in breakdown], totals.to_numpy())
+
+
+def test_brand_ratios_recomputed_distinct_counts_not_summed(dataset, queries):
+    by_brand = dataset.groupby('brand')['total_amount']
+    atv = (by_brand.sum() / by_brand.size()).sort_values(ascending=False)
+    rows = queries.ask("Average transaction value by brand")['rows']
+    np.testing.assert_allclose([row['avg_transaction_value'] for row in rows], atv.to_numpy())
+
+    # Customers of one brand across categories are not the sum of its per-category counts
+    assert queries.ask("Which brand has the most customers?") is None
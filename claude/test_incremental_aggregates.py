@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Backfill + nightly append must reproduce a full recompute of every aggregation
+
+    python3 -m pytest -q test_incremental_aggregates.py
+
+A small synthetic dataset is ingested twice: without its last days (backfilled, then appended
+from a CSV like the nightly file) and in full (aggregated in one pass as the reference).
+"""
+
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import incremental_aggregates
+from dataset_store import ingest_csv, load_dataset
+from incremental_aggregates import (SOURCE_COLUMNS, IncrementalAggregates, add_partition_columns,
+                                    partial_state)
+
+STORES = {'STR_01': ('North', 'Supermarket'), 'STR_02': ('North', 'Express'), 'STR_03': ('East', 'Supermarket'),
+          'STR_04': ('West', 'Hypermarket'), 'STR_05': ('South', 'Express')}
+PRODUCTS = {f"PRD_{i:02d}": (f"Product {i}", category, f"{category} Sub{i % 2}", f"Brand{i % 3}")
+            for i, category in enumerate(['Dairy', 'Bakery', 'Produce', 'Dairy', 'Snacks', 'Bakery', 'Produce', 'Snacks'])}
+HELD_OUT_DAYS = 3
+
+
+def _quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def synthetic_transactions(seed=0, start='2023-11-01', end='2024-01-31', baskets_per_day=12):
+    """Baskets of 1-4 distinct products, one row per line item, spanning a year boundary"""
+    rng = np.random.default_rng(seed)
+    stores, products = list(STORES), list(PRODUCTS)
+    rows = []
+    for day in pd.date_range(start, end, freq='D'):
+        for _ in range(baskets_per_day):
+            transaction_id = f"TXN_{len(rows):07d}"
+            store = stores[rng.integers(len(stores))]
+            timestamp = day + pd.Timedelta(seconds=int(rng.integers(6 * 3600, 22 * 3600)))
+            customer = f"CUST_{rng.integers(150):04d}"
+            items = rng.choice(products, size=rng.integers(1, 5), replace=False)
+            for product in items:
+                name, category, sub_category, brand = PRODUCTS[product]
+                quantity = int(rng.integers(1, 6))
+                unit_price = round(float(rng.uniform(1, 30)), 2)
+                discount = int(rng.choice([0, 5, 10]))
+                final_price = round(unit_price * (1 - discount / 100), 2)
+                rows.append({
+                    'transaction_id': transaction_id, 'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+                    'store_id': store, 'store_region': STORES[store][0], 'store_type': STORES[store][1],
+                    'product_id': product, 'product_name': name, 'category': category,
+                    'sub_category': sub_category, 'brand': brand, 'quantity': quantity, 'unit_price': unit_price,
+                    'discount_percentage': discount, 'final_price': final_price,
+                    'total_amount': round(final_price * quantity, 2),
+                    'payment_method': str(rng.choice(['Card', 'Cash', 'Wallet'])), 'customer_id': customer,
+                    'customer_type': str(rng.choice(['Regular', 'Premium', 'Occasional'])),
+                    'loyalty_points_used': int(rng.choice([0, 0, 10, 25])), 'basket_size': len(items),
+                    'is_weekend': timestamp.dayofweek >= 5, 'season': 'Winter',
+                    'promotion_id': str(rng.choice(['NO_PROMO', 'NO_PROMO', 'PROMO_1'])),
+                    'stock_level_at_sale': int(rng.integers(10, 200)),
+                    'delivery_method': str(rng.choice(['In-Store', 'Home Delivery'])),
+                    'time_slot': 'Morning' if timestamp.hour < 12 else 'Evening',
+                    'employee_id': f"EMP_{rng.integers(12):03d}", 'checkout_duration_sec': int(rng.integers(30, 400)),
+                    'is_organic': bool(rng.integers(2)),
+                })
+    return pd.DataFrame(rows)[SOURCE_COLUMNS]
+
+
+def _normalized(result):
+    """Aggregation result with string keys in sorted order, so differently coded states compare equal"""
+    if isinstance(result, pd.Series) and result.index.name is None and not isinstance(result.index, pd.MultiIndex):
+        return result
+    frame = result.reset_index() if isinstance(result, pd.DataFrame) else result.rename('value').reset_index()
+    for column in frame.columns:
+        if not pd.api.types.is_numeric_dtype(frame[column]) or pd.api.types.is_bool_dtype(frame[column]):
+            frame[column] = frame[column].astype(str)
+    keys = [name for name in (result.index.names or []) if name is not None]
+    return frame.sort_values(keys, ignore_index=True) if keys else frame
+
+
+def _assert_same(actual, expected, what):
+    actual, expected = _normalized(actual), _normalized(expected)
+    if isinstance(expected, pd.DataFrame):
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_exact=False, rtol=1e-9,
+                                      obj=what)
+    else:
+        pd.testing.assert_series_equal(actual, expected, check_dtype=False, check_exact=False, rtol=1e-9,
+                                       obj=what)
+
+
+def assert_partials_equal(actual, expected):
+    assert actual.rows == expected.rows
+    for name in expected.revenue._aggregations:
+        _assert_same(actual.revenue.result(name), expected.revenue.result(name), f"revenue {name}")
+    for name in expected.dashboard._cubes:
+        _assert_same(actual.dashboard.frame(name), expected.dashboard.frame(name), f"dashboard cube {name}")
+    for name in expected.dashboard._distincts:
+        counts, expected_counts = actual.dashboard.distinct_counts(name), expected.dashboard.distinct_counts(name)
+        if isinstance(expected_counts, int):
+            assert counts == expected_counts, f"dashboard distinct {name}"
+        else:
+            _assert_same(counts, expected_counts, f"dashboard distinct {name}")
+
+
+@pytest.fixture(scope='module')
+def appended(tmp_path_factory):
+    """(incremental state after backfill + append, full-recompute partial state)"""
+    root = tmp_path_factory.mktemp('incremental')
+    full = synthetic_transactions()
+    days = pd.to_datetime(full['timestamp']).dt.normalize()
+    held_out = days > days.max() - pd.Timedelta(days=HELD_OUT_DAYS)
+    base, tail = full[~held_out], full[held_out].copy()
+
+    # The nightly file also carries a late line item of a basket loaded months ago (a product
+    # the basket did not have yet), an unseen product, one re-delivered row and one row
+    # repeated within the file
+    old_basket = base[base['timestamp'] < '2023-12-01'].groupby('transaction_id').filter(lambda rows: len(rows) == 1).iloc[0]
+    late_item = old_basket.copy()
+    late_item['product_id'] = next(p for p in PRODUCTS if p != old_basket['product_id'])
+    late_item[['product_name', 'category', 'sub_category', 'brand']] = PRODUCTS[late_item['product_id']]
+    new_product = tail.iloc[0].copy()
+    new_product[['transaction_id', 'product_id', 'product_name']] = ['TXN_NEW', 'PRD_NEW', 'Product New']
+    tail = pd.concat([tail, pd.DataFrame([late_item, new_product])], ignore_index=True)
+    nightly = pd.concat([tail, base.iloc[[0]], tail.iloc[[1]]], ignore_index=True)
+
+    base.to_csv(root / 'base.csv', index=False)
+    pd.concat([base, tail], ignore_index=True).to_csv(root / 'full.csv', index=False)
+    nightly.to_csv(root / 'nightly.csv', index=False)
+    _quiet(ingest_csv, root / 'base.csv', root / 'base_store')
+    _quiet(ingest_csv, root / 'full.csv', root / 'full_store')
+
+    aggregates = IncrementalAggregates(root / 'state', root / 'base_store')
+    _quiet(aggregates.backfill, processes=1)
+    added = _quiet(aggregates.append, pd.read_csv(root / 'nightly.csv', low_memory=False))
+    expected = partial_state(add_partition_columns(load_dataset(SOURCE_COLUMNS, root / 'full_store')))
+    return aggregates, added, len(tail), expected
+
+
+def test_append_matches_full_recompute(appended):
+    aggregates, _, _, expected = appended
+    assert_partials_equal(incremental_aggregates._load(aggregates.state_dir / 'total.pkl'), expected)
+
+
+def test_partitions_remerge_to_full_recompute(appended):
+    aggregates, _, _, expected = appended
+    assert_partials_equal(_quiet(aggregates.remerge), expected)
+
+
+def test_repeated_rows_skipped_late_items_kept(appended):
+    aggregates, added, tail_rows, _ = appended
+    assert added == tail_rows
+    assert _quiet(aggregates.append, pd.read_csv(aggregates.state_dir.parent / 'nightly.csv', low_memory=False)) == 0
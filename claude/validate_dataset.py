@@ -5,21 +5,82 @@ Analyzes grocery_dataset.csv (24M+ rows, 39 columns)
 """
 
 import pandas as pd
-import numpy as np
 from datetime import datetime
 import json
 
+from dataset_store import iter_chunks, load_column, load_dimension, read_manifest
+from streaming_aggregation import StreamingAggregator
+from validation_engine import ValidationEngine, timing_table
+
 def validate_dataset():
     print("=" * 80)
     print("PHASE 1.1: DATASET UNDERSTANDING & VALIDATION")
     print("=" * 80)
     print()
 
-    # Load dataset
-    print("Loading grocery_dataset.csv...")
-    df = pd.read_csv('/Users/arghya.mukherjee/Downloads/cursor/sd ceo/grocery_dataset.csv')
-
-    print(f"✓ Dataset loaded: {len(df):,} rows, {len(df.columns)} columns")
+    expected_columns = [
+        'transaction_id', 'timestamp', 'store_id', 'store_region', 'store_type',
+        'product_id', 'product_name', 'category', 'sub_category', 'brand',
+        'quantity', 'unit_price', 'discount_percentage', 'final_price', 'total_amount',
+        'payment_method', 'customer_id', 'customer_type', 'loyalty_points_used',
+        'loyalty_points_earned', 'age_group', 'gender', 'basket_size', 'is_weekend',
+        'is_holiday', 'season', 'promotion_id', 'stock_level_at_sale', 'supplier_id',
+        'days_to_expiry', 'weather_condition', 'temperature_celsius', 'delivery_method',
+        'time_slot', 'employee_id', 'checkout_duration_sec', 'origin_country',
+        'is_organic', 'shelf_location'
+    ]
+    columns = list(read_manifest()['columns'])
+
+    # Checks and descriptive statistics are all evaluated in one streaming pass over the store
+    engine = ValidationEngine()
+    for col in columns:
+        engine.null_check(f"Nulls - {col}", col)
+    engine.unique_check("Duplicate transaction_ids", 'transaction_id')
+    engine.range_check("Negative total_amounts", 'total_amount', lower=0, notes=("No negatives", "Negative values found"))
+    engine.range_check("Negative quantities", 'quantity', lower=0, notes=("No negatives", "Negative values found"))
+    engine.row_check("Zero total_amounts", ['total_amount'], lambda chunk: chunk['total_amount'] == 0,
+                     notes=("No zero amounts", "Zero amounts found"))
+    engine.row_check("Calculation mismatches", ['total_amount', 'final_price', 'quantity'],
+                     lambda chunk: (chunk['total_amount'] - chunk['final_price'] * chunk['quantity']).abs() > 0.01,
+                     notes=("final_price * quantity == total_amount", "final_price * quantity != total_amount"))
+    store_dim, product_dim = load_dimension('store_dim'), load_dimension('product_dim')
+    engine.referential_check("Store region matches store_dim", 'store_id', store_dim, 'store_region', fail_status='WARNING')
+    engine.referential_check("Store type matches store_dim", 'store_id', store_dim, 'store_type', fail_status='WARNING')
+    engine.referential_check("Category matches product_dim", 'product_id', product_dim, 'category', fail_status='WARNING')
+
+    aggregates = StreamingAggregator()
+    aggregates.add('totals', [],
+                   total_revenue=('total_amount', 'sum'),
+                   avg_transaction=('total_amount', 'mean'),
+                   total_quantity_sold=('quantity', 'sum'),
+                   date_range_start=('timestamp', 'min'),
+                   date_range_end=('timestamp', 'max'),
+                   unique_stores=('store_id', 'nunique'),
+                   unique_customers=('customer_id', 'nunique'),
+                   unique_products=('product_id', 'nunique'),
+                   unique_employees=('employee_id', 'nunique'),
+                   avg_basket_size=('basket_size', 'mean'),
+                   avg_discount=('discount_percentage', 'mean'),
+                   promo=('is_promo', 'sum'),
+                   weekend=('is_weekend', 'sum'),
+                   holiday=('is_holiday', 'sum'),
+                   organic=('is_organic_flag', 'sum'),
+                   home_delivery=('is_home_delivery', 'sum'))
+    for dimension in ['store_region', 'category', 'customer_type', 'store_type']:
+        aggregates.add(dimension, [dimension], revenue=('total_amount', 'sum'))
+
+    def with_flags(chunks):
+        for chunk in chunks:
+            yield chunk.assign(is_promo=chunk['promotion_id'] != 'NO_PROMO',
+                               is_organic_flag=chunk['is_organic'] == True,
+                               is_home_delivery=chunk['delivery_method'] == 'Home Delivery')
+
+    print("Validating grocery dataset store (single pass)...")
+    results = engine.run(with_flags(iter_chunks(columns=columns)), aggregator=aggregates)
+    checks = {result.name: result for result in results}
+    totals = aggregates.result('totals')
+
+    print(f"✓ Dataset validated: {engine.rows:,} rows, {len(columns)} columns")
     print()
 
     # Basic Statistics
@@ -28,17 +89,17 @@ def validate_dataset():
     print("=" * 80)
 
     stats = {
-        "total_rows": len(df),
-        "total_columns": len(df.columns),
-        "total_transactions": df['transaction_id'].nunique(),
-        "total_revenue": float(df['total_amount'].sum()),
-        "date_range_start": str(pd.to_datetime(df['timestamp']).min()),
-        "date_range_end": str(pd.to_datetime(df['timestamp']).max()),
-        "unique_stores": int(df['store_id'].nunique()),
-        "unique_customers": int(df['customer_id'].nunique()),
-        "unique_products": int(df['product_id'].nunique()),
-        "unique_employees": int(df['employee_id'].nunique()),
-        "total_quantity_sold": int(df['quantity'].sum())
+        "total_rows": engine.rows,
+        "total_columns": len(columns),
+        "total_transactions": checks["Duplicate transaction_ids"].expected,
+        "total_revenue": float(totals['total_revenue']),
+        "date_range_start": str(pd.Timestamp(totals['date_range_start'])),
+        "date_range_end": str(pd.Timestamp(totals['date_range_end'])),
+        "unique_stores": int(totals['unique_stores']),
+        "unique_customers": int(totals['unique_customers']),
+        "unique_products": int(totals['unique_products']),
+        "unique_employees": int(totals['unique_employees']),
+        "total_quantity_sold": int(totals['total_quantity_sold'])
     }
 
     print(f"Total Rows: {stats['total_rows']:,}")
@@ -57,20 +118,9 @@ def validate_dataset():
     print("=" * 80)
     print("COLUMN STRUCTURE (39 Columns Expected)")
     print("=" * 80)
-    expected_columns = [
-        'transaction_id', 'timestamp', 'store_id', 'store_region', 'store_type',
-        'product_id', 'product_name', 'category', 'sub_category', 'brand',
-        'quantity', 'unit_price', 'discount_percentage', 'final_price', 'total_amount',
-        'payment_method', 'customer_id', 'customer_type', 'loyalty_points_used',
-        'loyalty_points_earned', 'age_group', 'gender', 'basket_size', 'is_weekend',
-        'is_holiday', 'season', 'promotion_id', 'stock_level_at_sale', 'supplier_id',
-        'days_to_expiry', 'weather_condition', 'temperature_celsius', 'delivery_method',
-        'time_slot', 'employee_id', 'checkout_duration_sec', 'origin_country',
-        'is_organic', 'shelf_location'
-    ]
 
-    missing_cols = set(expected_columns) - set(df.columns)
-    extra_cols = set(df.columns) - set(expected_columns)
+    missing_cols = set(expected_columns) - set(columns)
+    extra_cols = set(columns) - set(expected_columns)
 
     if missing_cols:
         print(f"⚠️  Missing columns: {missing_cols}")
@@ -80,10 +130,10 @@ def validate_dataset():
         print("✓ All 39 expected columns present")
 
     print()
-    for i, col in enumerate(df.columns, 1):
-        dtype = str(df[col].dtype)
-        nulls = df[col].isna().sum()
-        null_pct = (nulls / len(df)) * 100
+    for i, col in enumerate(columns, 1):
+        dtype = str(engine.dtypes[col])
+        nulls = checks[f"Nulls - {col}"].value
+        null_pct = (nulls / engine.rows) * 100
         print(f"{i:2d}. {col:30s} | {dtype:12s} | Nulls: {nulls:8,} ({null_pct:.2f}%)")
     print()
 
@@ -92,24 +142,21 @@ def validate_dataset():
     print("DATA QUALITY CHECKS")
     print("=" * 80)
 
-    # Check for duplicate transaction IDs
-    dup_transactions = df['transaction_id'].duplicated().sum()
+    dup_transactions = checks["Duplicate transaction_ids"].value
     print(f"Duplicate transaction_ids: {dup_transactions}")
 
-    # Check for negative values
-    negative_amounts = (df['total_amount'] < 0).sum()
-    negative_quantities = (df['quantity'] < 0).sum()
+    negative_amounts = checks["Negative total_amounts"].value
+    negative_quantities = checks["Negative quantities"].value
     print(f"Negative total_amounts: {negative_amounts}")
     print(f"Negative quantities: {negative_quantities}")
 
-    # Check for zero values
-    zero_amounts = (df['total_amount'] == 0).sum()
+    zero_amounts = checks["Zero total_amounts"].value
     print(f"Zero total_amounts: {zero_amounts}")
 
-    # Validate calculations
-    df['calculated_total'] = df['final_price'] * df['quantity']
-    calculation_mismatch = (abs(df['total_amount'] - df['calculated_total']) > 0.01).sum()
+    calculation_mismatch = checks["Calculation mismatches"].value
     print(f"Calculation mismatches (final_price * quantity != total_amount): {calculation_mismatch}")
+    for name in ["Store region matches store_dim", "Store type matches store_dim", "Category matches product_dim"]:
+        print(f"{name}: {checks[name].status} ({checks[name].value:,} rows)")
     print()
 
     # Revenue by dimension
@@ -118,25 +165,25 @@ def validate_dataset():
     print("=" * 80)
 
     print("\nBy Region:")
-    region_rev = df.groupby('store_region')['total_amount'].sum().sort_values(ascending=False)
+    region_rev = aggregates.result('store_region')['revenue'].sort_values(ascending=False)
     for region, rev in region_rev.items():
         pct = (rev / stats['total_revenue']) * 100
         print(f"  {region:15s}: ${rev:15,.2f} ({pct:5.2f}%)")
 
     print("\nBy Category:")
-    category_rev = df.groupby('category')['total_amount'].sum().sort_values(ascending=False)
+    category_rev = aggregates.result('category')['revenue'].sort_values(ascending=False)
     for cat, rev in category_rev.items():
         pct = (rev / stats['total_revenue']) * 100
         print(f"  {cat:25s}: ${rev:15,.2f} ({pct:5.2f}%)")
 
     print("\nBy Customer Type:")
-    customer_rev = df.groupby('customer_type')['total_amount'].sum().sort_values(ascending=False)
+    customer_rev = aggregates.result('customer_type')['revenue'].sort_values(ascending=False)
     for ctype, rev in customer_rev.items():
         pct = (rev / stats['total_revenue']) * 100
         print(f"  {ctype:15s}: ${rev:15,.2f} ({pct:5.2f}%)")
 
     print("\nBy Store Type:")
-    store_type_rev = df.groupby('store_type')['total_amount'].sum().sort_values(ascending=False)
+    store_type_rev = aggregates.result('store_type')['revenue'].sort_values(ascending=False)
     for stype, rev in store_type_rev.items():
         pct = (rev / stats['total_revenue']) * 100
         print(f"  {stype:15s}: ${rev:15,.2f} ({pct:5.2f}%)")
@@ -147,19 +194,23 @@ def validate_dataset():
     print("ADDITIONAL KEY METRICS")
     print("=" * 80)
 
-    avg_transaction = df['total_amount'].mean()
-    median_transaction = df['total_amount'].median()
-    avg_basket_size = df['basket_size'].mean()
+    rows = engine.rows
+    avg_transaction = totals['avg_transaction']
+    # The median needs every value: read it from the memory-mapped column rather than the scan
+    median_transaction = pd.Series(load_column('total_amount')).median()
+    avg_basket_size = totals['avg_basket_size']
+    promo, weekend, holiday = int(totals['promo']), int(totals['weekend']), int(totals['holiday'])
+    organic, home_delivery = int(totals['organic']), int(totals['home_delivery'])
 
     print(f"Average Transaction Value: ${avg_transaction:.2f}")
     print(f"Median Transaction Value: ${median_transaction:.2f}")
     print(f"Average Basket Size: {avg_basket_size:.2f} items")
-    print(f"Average Discount %: {df['discount_percentage'].mean():.2f}%")
-    print(f"Promotional Transactions: {(df['promotion_id'] != 'NO_PROMO').sum():,} ({((df['promotion_id'] != 'NO_PROMO').sum() / len(df)) * 100:.2f}%)")
-    print(f"Weekend Transactions: {df['is_weekend'].sum():,} ({(df['is_weekend'].sum() / len(df)) * 100:.2f}%)")
-    print(f"Holiday Transactions: {df['is_holiday'].sum():,} ({(df['is_holiday'].sum() / len(df)) * 100:.2f}%)")
-    print(f"Organic Products: {(df['is_organic'] == True).sum():,} ({((df['is_organic'] == True).sum() / len(df)) * 100:.2f}%)")
-    print(f"Home Delivery: {(df['delivery_method'] == 'Home Delivery').sum():,} ({((df['delivery_method'] == 'Home Delivery').sum() / len(df)) * 100:.2f}%)")
+    print(f"Average Discount %: {totals['avg_discount']:.2f}%")
+    print(f"Promotional Transactions: {promo:,} ({(promo / rows) * 100:.2f}%)")
+    print(f"Weekend Transactions: {weekend:,} ({(weekend / rows) * 100:.2f}%)")
+    print(f"Holiday Transactions: {holiday:,} ({(holiday / rows) * 100:.2f}%)")
+    print(f"Organic Products: {organic:,} ({(organic / rows) * 100:.2f}%)")
+    print(f"Home Delivery: {home_delivery:,} ({(home_delivery / rows) * 100:.2f}%)")
     print()
 
     # Save validation report
@@ -214,11 +265,16 @@ Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 - **Average Transaction Value**: ${avg_transaction:.2f}
 - **Median Transaction Value**: ${median_transaction:.2f}
 - **Average Basket Size**: {avg_basket_size:.2f} items
-- **Average Discount**: {df['discount_percentage'].mean():.2f}%
-- **Promotional Transactions**: {(df['promotion_id'] != 'NO_PROMO').sum():,} ({((df['promotion_id'] != 'NO_PROMO').sum() / len(df)) * 100:.2f}%)
-- **Weekend Transactions**: {df['is_weekend'].sum():,} ({(df['is_weekend'].sum() / len(df)) * 100:.2f}%)
-- **Organic Products**: {(df['is_organic'] == True).sum():,} ({((df['is_organic'] == True).sum() / len(df)) * 100:.2f}%)
+- **Average Discount**: {totals['avg_discount']:.2f}%
+- **Promotional Transactions**: {promo:,} ({(promo / rows) * 100:.2f}%)
+- **Weekend Transactions**: {weekend:,} ({(weekend / rows) * 100:.2f}%)
+- **Organic Products**: {organic:,} ({(organic / rows) * 100:.2f}%)
+
+## Check Timing
+
+All checks ran in a single pass over {rows:,} rows.
 
+{timing_table(results, engine.aggregate_seconds)}
 ## Validation Status
 
 ✅ **Dataset is valid and ready for analysis**
@@ -245,7 +301,7 @@ All key metrics have been calculated and verified. The dataset contains {stats['
     print("✅ PHASE 1.1 COMPLETE: Dataset validated successfully!")
     print("=" * 80)
 
-    return df, stats
+    return stats
 
 if __name__ == "__main__":
-    df, stats = validate_dataset()
+    stats = validate_dataset()
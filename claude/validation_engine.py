@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Single-Scan Validation Engine
+Data checks registered up front as vectorized rules and evaluated together in one
+streaming pass over the dataset store, with the time spent in every check recorded
+
+    engine = ValidationEngine()
+    engine.null_check('Null Check - customer_id', 'customer_id')
+    engine.range_check('Negative Amounts', 'total_amount', lower=0)
+    engine.unique_check('Transaction Uniqueness', 'transaction_id')
+    engine.reconciliation('Revenue by Region', 'total_amount', expected=regional_sum, tolerance=1)
+    results = engine.run(iter_chunks(columns=engine.columns()))
+
+Check kinds:
+    null            rows where the column is null
+    range           rows outside [lower, upper]
+    row             rows where a vectorized predicate(chunk) is True (e.g. price × qty mismatches)
+    unique          non-null rows minus distinct values (exact, hashed)
+    referential     rows whose key is missing from a dimension table, or whose attribute
+                    disagrees with the dimension's attribute for that key
+    reconciliation  |source sum (or row count) - expected| against a tolerance
+    info            value computed after the pass from the aggregates (always INFO)
+
+A StreamingAggregator passed to run() is fed the same chunks, so descriptive statistics
+come out of the same scan.
+"""
+
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from streaming_aggregation import StreamingAggregator
+
+CheckResult = namedtuple('CheckResult', ['name', 'kind', 'status', 'value', 'note', 'seconds', 'actual', 'expected'])
+
+STATUS_ICONS = {"PASS": "✓", "FAIL": "✗", "WARNING": "⚠️", "INFO": "ℹ️"}
+
+
+class _Check:
+
+    def __init__(self, name, kind, columns, update, finalize, fail_status, notes):
+        self.name = name
+        self.kind = kind
+        self.columns = list(columns)
+        self.update = update
+        self.finalize = finalize
+        self.fail_status = fail_status
+        self.pass_note, self.fail_note = notes
+        self.seconds = 0.0
+
+
+class ValidationEngine:
+
+    def __init__(self):
+        self._checks = {}
+        self.rows = 0
+        self.dtypes = None
+        self.aggregate_seconds = 0.0
+
+    # ------------------------------------------------------------------
+    # Registration
+    # ------------------------------------------------------------------
+    def _register(self, name, kind, columns, update, finalize, fail_status, notes):
+        if name in self._checks:
+            raise ValueError(f"Duplicate validation check '{name}'")
+        self._checks[name] = _Check(name, kind, columns, update, finalize, fail_status, notes)
+        return self
+
+    def _violation_count(self, name, kind, columns, mask, fail_status, notes):
+        """Check whose value is the number of rows where mask(chunk) is True"""
+        state = {'count': 0}
+
+        def update(chunk):
+            state['count'] += int(np.count_nonzero(mask(chunk)))
+
+        return self._register(name, kind, columns, update, lambda: (state['count'], None, None), fail_status, notes)
+
+    def null_check(self, name, column, fail_status='WARNING', notes=("No nulls", "Null values found")):
+        return self._violation_count(name, 'null', [column], lambda chunk: chunk[column].isna().to_numpy(),
+                                     fail_status, notes)
+
+    def range_check(self, name, column, lower=None, upper=None, fail_status='WARNING',
+                    notes=("Within range", "Out-of-range values found")):
+        def outside(chunk):
+            values = chunk[column].to_numpy(dtype=np.float64)
+            mask = np.zeros(len(values), dtype=bool)
+            if lower is not None:
+                mask |= values < lower
+            if upper is not None:
+                mask |= values > upper
+            return mask
+
+        return self._violation_count(name, 'range', [column], outside, fail_status, notes)
+
+    def row_check(self, name, columns, predicate, fail_status='WARNING', notes=("No violations", "Violations found")):
+        """predicate(chunk) → boolean array/Series marking violating rows"""
+        return self._violation_count(name, 'row', columns, lambda chunk: np.asarray(predicate(chunk), dtype=bool),
+                                     fail_status, notes)
+
+    def unique_check(self, name, column, fail_status='WARNING', notes=("All values unique", "Duplicate values found")):
+        distinct = StreamingAggregator().add(name, [], distinct=(column, 'nunique'), rows=(column, 'count'))
+
+        def finalize():
+            totals = distinct.result(name)
+            rows, unique = int(totals['rows']), int(totals['distinct'])
+            return rows - unique, rows, unique
+
+        return self._register(name, 'unique', [column], distinct.update, finalize, fail_status, notes)
+
+    def referential_check(self, name, key, dimension, attribute=None, fail_status='FAIL',
+                          notes=("All references resolve", "Dangling or inconsistent references found")):
+        """
+        Rows whose `key` is not in the dimension's index, or (with `attribute`) whose attribute
+        differs from the dimension's value for that key. Categoricals are compared on codes.
+        """
+        def violations(chunk):
+            keys = chunk[key]
+            positions = dimension.index.get_indexer(keys)
+            missing = positions < 0
+            if attribute is None:
+                return missing & keys.notna().to_numpy()
+            values = chunk[attribute]
+            expected = dimension[attribute]
+            if isinstance(values.dtype, pd.CategoricalDtype) and values.dtype == expected.dtype:
+                actual, expected = values.cat.codes.to_numpy(), expected.cat.codes.to_numpy()
+            else:
+                actual, expected = values.to_numpy(), expected.to_numpy()
+            return missing | (actual != expected[np.where(missing, 0, positions)])
+
+        columns = [key] + ([attribute] if attribute else [])
+        return self._violation_count(name, 'referential', columns, violations, fail_status, notes)
+
+    def reconciliation(self, name, column, expected, tolerance=1, fail_status='FAIL',
+                       notes=("Reconciles with source", "Does not match source")):
+        """|sum of `column` (row count when column is None) - expected| must stay below tolerance (== 0 for exact)"""
+        state = {'actual': 0}
+
+        def update(chunk):
+            if column is None:
+                state['actual'] += len(chunk)
+            else:
+                state['actual'] += chunk[column].sum()
+
+        def finalize():
+            diff = abs(state['actual'] - expected)
+            return diff, state['actual'], expected
+
+        check_columns = [] if column is None else [column]
+        self._register(name, 'reconciliation', check_columns, update, finalize, fail_status, notes)
+        self._checks[name].tolerance = tolerance
+        return self
+
+    def info(self, name, compute):
+        """Informational entry computed after the pass: compute() → (value, note)"""
+        return self._register(name, 'info', [], lambda chunk: None, compute, 'INFO', (None, None))
+
+    def columns(self, extra=()):
+        """Columns the registered checks read (plus `extra`), in first-use order"""
+        names = []
+        for check in self._checks.values():
+            names.extend(check.columns)
+        names.extend(extra)
+        return list(dict.fromkeys(names))
+
+    # ------------------------------------------------------------------
+    # Single pass
+    # ------------------------------------------------------------------
+    def run(self, chunks, aggregator=None, progress_every=10):
+        for i, chunk in enumerate(chunks):
+            if self.dtypes is None:
+                self.dtypes = chunk.dtypes
+            for check in self._checks.values():
+                start = time.perf_counter()
+                check.update(chunk)
+                check.seconds += time.perf_counter() - start
+            if aggregator is not None:
+                start = time.perf_counter()
+                aggregator.update(chunk)
+                self.aggregate_seconds += time.perf_counter() - start
+            self.rows += len(chunk)
+            if progress_every and (i + 1) % progress_every == 0:
+                print(f"  Validated {self.rows:,} rows...")
+        return self.results()
+
+    def results(self):
+        results = []
+        for check in self._checks.values():
+            start = time.perf_counter()
+            if check.kind == 'info':
+                value, note = check.finalize()
+                actual = expected = None
+                status = 'INFO'
+            else:
+                value, actual, expected = check.finalize()
+                if check.kind == 'reconciliation':
+                    failed = value > 0 if check.tolerance == 0 else value >= check.tolerance
+                else:
+                    failed = value > 0
+                status = check.fail_status if failed else 'PASS'
+                note = check.fail_note if failed else check.pass_note
+                value = value if failed else 0
+            check.seconds += time.perf_counter() - start
+            results.append(CheckResult(check.name, check.kind, status, value, note, check.seconds, actual, expected))
+        return results
+
+
+def timing_table(results, aggregate_seconds=None):
+    """Markdown table of per-check status and time spent in the scan"""
+    table = "| Check | Kind | Status | Time (s) |\n|-------|------|--------|----------|\n"
+    for result in results:
+        table += (f"| {result.name} | {result.kind} | {STATUS_ICONS.get(result.status, '?')} {result.status} "
+                  f"| {result.seconds:.3f} |\n")
+    if aggregate_seconds is not None:
+        table += f"| Descriptive aggregates | aggregate | - | {aggregate_seconds:.3f} |\n"
+    return table
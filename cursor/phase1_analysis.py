@@ -7,11 +7,16 @@ Analyzing 24M+ row grocery dataset for CEO-level insights
 import pandas as pd
 import numpy as np
 import json
+import sys
 from datetime import datetime
 from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "claude"))
+from dataset_store import STORE_DIR, iter_chunks
+from streaming_aggregation import StreamingAggregator
+
 # Configuration
 BASE_DIR = Path("/Users/arghya.mukherjee/Downloads/cursor/sd ceo")
 CURSOR_DIR = BASE_DIR / "cursor"
@@ -26,6 +31,7 @@ print("CEO ULTIMATE PROJECT - Phase 1: Data Analysis")
 print("=" * 80)
 print(f"Start Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 print(f"Data File: {DATA_FILE}")
+print(f"Dataset Store: {STORE_DIR}")
 print(f"Output Directory: {METADATA_CEO_DIR}")
 print("=" * 80)
 
@@ -49,61 +55,88 @@ print(first_chunk.head())
 print(f"\nData types:")
 print(first_chunk.dtypes)
 
-# Calculate total statistics using chunking
-print("\nCalculating total statistics (processing 24M+ rows in chunks)...")
-
-total_rows = 0
-total_revenue = 0
-total_transactions = set()
-unique_stores = set()
-unique_customers = set()
-unique_products = set()
-unique_brands = set()
-unique_categories = set()
-min_date = None
-max_date = None
-
-# Reopen the file for full processing
-chunk_iter = pd.read_csv(DATA_FILE, chunksize=500000, low_memory=False, 
-                         parse_dates=['timestamp'])
-
-for i, chunk in enumerate(chunk_iter):
-    total_rows += len(chunk)
-    total_revenue += chunk['total_amount'].sum()
-    total_transactions.update(chunk['transaction_id'].unique())
-    unique_stores.update(chunk['store_id'].unique())
-    unique_customers.update(chunk['customer_id'].unique())
-    unique_products.update(chunk['product_id'].unique())
-    unique_brands.update(chunk['brand'].unique())
-    unique_categories.update(chunk['category'].unique())
-    
-    chunk_min = chunk['timestamp'].min()
-    chunk_max = chunk['timestamp'].max()
-    
-    if min_date is None or chunk_min < min_date:
-        min_date = chunk_min
-    if max_date is None or chunk_max > max_date:
-        max_date = chunk_max
-    
-    if (i + 1) % 10 == 0:
-        print(f"  Processed {total_rows:,} rows...")
+# Calculate total statistics and every revenue tree level in one chunked pass
+print("\nCalculating total statistics and revenue tree (processing 24M+ rows in chunks)...")
+
+# Transactions per group: exact distinct transaction ids (a transaction spans one row per line
+# item). The store's transaction_id column is read dictionary-coded, so each count is a bitmap.
+TRANSACTIONS = {'Transactions': ('transaction_id', 'nunique')}
+
+engine = StreamingAggregator()
+engine.add('totals', [],
+           total_revenue=('total_amount', 'sum'),
+           transaction_rows=('transaction_id', 'count'),
+           transactions=('transaction_id', 'nunique'),
+           stores=('store_id', 'nunique'),
+           customers=('customer_id', 'nunique'),
+           products=('product_id', 'nunique'),
+           brands=('brand', 'nunique'),
+           categories=('category', 'nunique'),
+           min_date=('timestamp', 'min'),
+           max_date=('timestamp', 'max'))
+engine.add('region', ['store_region'],
+           Total_Revenue=('total_amount', 'sum'), **TRANSACTIONS,
+           Stores=('store_id', 'nunique'), Customers=('customer_id', 'nunique'))
+engine.add('store', ['store_id', 'store_region', 'store_type'],
+           Total_Revenue=('total_amount', 'sum'), **TRANSACTIONS,
+           Customers=('customer_id', 'nunique'), Products=('product_id', 'nunique'))
+engine.add('category', ['category'],
+           Total_Revenue=('total_amount', 'sum'), **TRANSACTIONS,
+           Products=('product_id', 'nunique'), Units_Sold=('quantity', 'sum'))
+engine.add('subcategory', ['category', 'sub_category'],
+           Total_Revenue=('total_amount', 'sum'), **TRANSACTIONS,
+           Units_Sold=('quantity', 'sum'))
+engine.add('brand', ['brand'],
+           Total_Revenue=('total_amount', 'sum'), **TRANSACTIONS,
+           Products=('product_id', 'nunique'))
+engine.add('sku', ['product_id', 'product_name', 'category', 'brand'],
+           Total_Revenue=('total_amount', 'sum'), **TRANSACTIONS,
+           Units_Sold=('quantity', 'sum'),
+           Avg_Unit_Price=('unit_price', 'mean'),
+           Avg_Discount_Pct=('discount_percentage', 'mean'))
+
+chunk_iter = iter_chunks(columns=[
+    'transaction_id', 'timestamp', 'store_id', 'store_region', 'store_type', 'customer_id',
+    'product_id', 'product_name', 'category', 'sub_category', 'brand', 'quantity',
+    'unit_price', 'discount_percentage', 'total_amount'
+], coded=['transaction_id'])
+engine.consume(chunk_iter)
+
+totals = engine.result('totals')
+total_rows = engine.rows
+total_revenue = totals['total_revenue']
+total_transactions = int(totals['transactions'])
+unique_stores = int(totals['stores'])
+unique_customers = int(totals['customers'])
+unique_products = int(totals['products'])
+unique_brands = int(totals['brands'])
+unique_categories = int(totals['categories'])
+min_date = totals['min_date']
+max_date = totals['max_date']
+transaction_ids_unique = total_transactions == int(totals['transaction_rows'])
+
+
+def revenue_level(name, columns):
+    """Streamed aggregates for one tree level, in the column order of the saved CSV"""
+    return engine.result(name)[columns].round(2)
+
 
 print("\n" + "=" * 80)
 print("DATASET VALIDATION SUMMARY")
 print("=" * 80)
 print(f"Total Rows: {total_rows:,}")
-print(f"Total Transactions: {len(total_transactions):,}")
+print(f"Total Transactions: {total_transactions:,}")
 print(f"Total Revenue: ${total_revenue:,.2f} (${total_revenue/1e9:.2f}B)")
 print(f"Date Range: {min_date.date()} to {max_date.date()}")
 print(f"Duration: {(max_date - min_date).days} days")
-print(f"Unique Stores: {len(unique_stores)}")
-print(f"Unique Customers: {len(unique_customers):,}")
-print(f"Unique Products: {len(unique_products):,}")
-print(f"Unique Brands: {len(unique_brands)}")
-print(f"Unique Categories: {len(unique_categories)}")
-print(f"Average Transaction Value: ${total_revenue / len(total_transactions):,.2f}")
-print(f"Revenue per Customer: ${total_revenue / len(unique_customers):,.2f}")
-print(f"Revenue per Store: ${total_revenue / len(unique_stores):,.2f}")
+print(f"Unique Stores: {unique_stores}")
+print(f"Unique Customers: {unique_customers:,}")
+print(f"Unique Products: {unique_products:,}")
+print(f"Unique Brands: {unique_brands}")
+print(f"Unique Categories: {unique_categories}")
+print(f"Average Transaction Value: ${total_revenue / total_transactions:,.2f}")
+print(f"Revenue per Customer: ${total_revenue / unique_customers:,.2f}")
+print(f"Revenue per Store: ${total_revenue / unique_stores:,.2f}")
 print("=" * 80)
 
 # Save validation report
@@ -114,33 +147,33 @@ validation_report = f"""# Data Validation Report
 ## Dataset Overview
 
 - **Total Rows**: {total_rows:,}
-- **Total Transactions**: {len(total_transactions):,}
+- **Total Transactions**: {total_transactions:,}
 - **Total Revenue**: ${total_revenue:,.2f} (${total_revenue/1e9:.2f}B)
 - **Date Range**: {min_date.date()} to {max_date.date()}
 - **Duration**: {(max_date - min_date).days} days ({(max_date - min_date).days/365:.1f} years)
 
 ## Business Entities
 
-- **Unique Stores**: {len(unique_stores)}
-- **Unique Customers**: {len(unique_customers):,}
-- **Unique Products**: {len(unique_products):,}
-- **Unique Brands**: {len(unique_brands)}
-- **Unique Categories**: {len(unique_categories)}
+- **Unique Stores**: {unique_stores}
+- **Unique Customers**: {unique_customers:,}
+- **Unique Products**: {unique_products:,}
+- **Unique Brands**: {unique_brands}
+- **Unique Categories**: {unique_categories}
 
 ## Key Metrics
 
-- **Average Transaction Value**: ${total_revenue / len(total_transactions):,.2f}
-- **Transactions per Day**: {len(total_transactions) / (max_date - min_date).days:,.0f}
+- **Average Transaction Value**: ${total_revenue / total_transactions:,.2f}
+- **Transactions per Day**: {total_transactions / (max_date - min_date).days:,.0f}
 - **Revenue per Day**: ${total_revenue / (max_date - min_date).days:,.2f}
 - **Annual Revenue (2-year avg)**: ${(total_revenue / ((max_date - min_date).days / 365)):,.2f}
-- **Revenue per Customer**: ${total_revenue / len(unique_customers):,.2f}
-- **Revenue per Store**: ${total_revenue / len(unique_stores):,.2f}
-- **Transactions per Customer**: {len(total_transactions) / len(unique_customers):.1f}
-- **Transactions per Store**: {len(total_transactions) / len(unique_stores):,.0f}
+- **Revenue per Customer**: ${total_revenue / unique_customers:,.2f}
+- **Revenue per Store**: ${total_revenue / unique_stores:,.2f}
+- **Transactions per Customer**: {total_transactions / unique_customers:.1f}
+- **Transactions per Store**: {total_transactions / unique_stores:,.0f}
 
 ## Data Quality Notes
 
-- All transaction IDs are unique: ✓
+- All transaction IDs are unique: {'✓' if transaction_ids_unique else '✗'}
 - No missing transaction amounts found
 - Date range covers complete 2-year period
 - All stores have transaction data
@@ -164,25 +197,15 @@ print(f"\n✓ Saved: data_validation_report.md")
 
 print("\n### STEP 1.2: Descriptive Analytics - Revenue Analysis Tree ###\n")
 
-# We'll need to load the full dataset for detailed analysis
-# Since it's large, we'll use efficient processing
-print("Loading dataset for detailed analysis...")
-df = pd.read_csv(DATA_FILE, low_memory=False, parse_dates=['timestamp'])
-
-print(f"Dataset loaded: {len(df):,} rows")
+# All levels were aggregated during the chunked pass above; no full load needed
+print(f"Revenue tree aggregated from {total_rows:,} rows")
 
 # A. Revenue by Region
 print("\n1. Revenue by Region...")
-revenue_by_region = df.groupby('store_region').agg({
-    'total_amount': 'sum',
-    'transaction_id': 'nunique',
-    'store_id': 'nunique',
-    'customer_id': 'nunique'
-}).round(2)
-
-revenue_by_region['revenue_pct'] = (revenue_by_region['total_amount'] / total_revenue * 100).round(2)
-revenue_by_region['avg_transaction'] = (revenue_by_region['total_amount'] / revenue_by_region['transaction_id']).round(2)
-revenue_by_region.columns = ['Total_Revenue', 'Transactions', 'Stores', 'Customers', 'Revenue_Pct', 'Avg_Transaction']
+revenue_by_region = revenue_level('region', ['Total_Revenue', 'Transactions', 'Stores', 'Customers'])
+
+revenue_by_region['Revenue_Pct'] = (revenue_by_region['Total_Revenue'] / total_revenue * 100).round(2)
+revenue_by_region['Avg_Transaction'] = (revenue_by_region['Total_Revenue'] / revenue_by_region['Transactions']).round(2)
 revenue_by_region = revenue_by_region.sort_values('Total_Revenue', ascending=False)
 
 print("\nRevenue by Region:")
@@ -193,14 +216,8 @@ print("✓ Saved: revenue_by_region.csv")
 
 # B. Revenue by Store
 print("\n2. Revenue by Store...")
-revenue_by_store = df.groupby(['store_id', 'store_region', 'store_type']).agg({
-    'total_amount': 'sum',
-    'transaction_id': 'nunique',
-    'customer_id': 'nunique',
-    'product_id': 'nunique'
-}).round(2)
-
-revenue_by_store.columns = ['Total_Revenue', 'Transactions', 'Customers', 'Products']
+revenue_by_store = revenue_level('store', ['Total_Revenue', 'Transactions', 'Customers', 'Products'])
+
 revenue_by_store['Avg_Transaction'] = (revenue_by_store['Total_Revenue'] / revenue_by_store['Transactions']).round(2)
 revenue_by_store = revenue_by_store.sort_values('Total_Revenue', ascending=False)
 
@@ -214,15 +231,9 @@ print("✓ Saved: revenue_by_store.csv")
 
 # C. Revenue by Category
 print("\n3. Revenue by Category...")
-revenue_by_category = df.groupby('category').agg({
-    'total_amount': 'sum',
-    'transaction_id': 'nunique',
-    'product_id': 'nunique',
-    'quantity': 'sum'
-}).round(2)
-
-revenue_by_category['revenue_pct'] = (revenue_by_category['total_amount'] / total_revenue * 100).round(2)
-revenue_by_category.columns = ['Total_Revenue', 'Transactions', 'Products', 'Units_Sold', 'Revenue_Pct']
+revenue_by_category = revenue_level('category', ['Total_Revenue', 'Transactions', 'Products', 'Units_Sold'])
+
+revenue_by_category['Revenue_Pct'] = (revenue_by_category['Total_Revenue'] / total_revenue * 100).round(2)
 revenue_by_category = revenue_by_category.sort_values('Total_Revenue', ascending=False)
 
 print("\nRevenue by Category:")
@@ -233,13 +244,8 @@ print("✓ Saved: revenue_by_category.csv")
 
 # D. Revenue by Sub-Category
 print("\n4. Revenue by Sub-Category...")
-revenue_by_subcategory = df.groupby(['category', 'sub_category']).agg({
-    'total_amount': 'sum',
-    'transaction_id': 'nunique',
-    'quantity': 'sum'
-}).round(2)
+revenue_by_subcategory = revenue_level('subcategory', ['Total_Revenue', 'Transactions', 'Units_Sold'])
 
-revenue_by_subcategory.columns = ['Total_Revenue', 'Transactions', 'Units_Sold']
 revenue_by_subcategory = revenue_by_subcategory.sort_values('Total_Revenue', ascending=False)
 
 revenue_by_subcategory.to_csv(METADATA_CEO_DIR / "revenue_by_subcategory.csv")
@@ -247,14 +253,9 @@ print("✓ Saved: revenue_by_subcategory.csv")
 
 # E. Revenue by Brand
 print("\n5. Revenue by Brand...")
-revenue_by_brand = df.groupby('brand').agg({
-    'total_amount': 'sum',
-    'transaction_id': 'nunique',
-    'product_id': 'nunique'
-}).round(2)
-
-revenue_by_brand['revenue_pct'] = (revenue_by_brand['total_amount'] / total_revenue * 100).round(2)
-revenue_by_brand.columns = ['Total_Revenue', 'Transactions', 'Products', 'Revenue_Pct']
+revenue_by_brand = revenue_level('brand', ['Total_Revenue', 'Transactions', 'Products'])
+
+revenue_by_brand['Revenue_Pct'] = (revenue_by_brand['Total_Revenue'] / total_revenue * 100).round(2)
 revenue_by_brand = revenue_by_brand.sort_values('Total_Revenue', ascending=False)
 
 revenue_by_brand.to_csv(METADATA_CEO_DIR / "revenue_by_brand.csv")
@@ -262,15 +263,8 @@ print("✓ Saved: revenue_by_brand.csv")
 
 # F. Revenue by SKU (Product)
 print("\n6. Revenue by SKU (Product)...")
-revenue_by_sku = df.groupby(['product_id', 'product_name', 'category', 'brand']).agg({
-    'total_amount': 'sum',
-    'transaction_id': 'nunique',
-    'quantity': 'sum',
-    'unit_price': 'mean',
-    'discount_percentage': 'mean'
-}).round(2)
-
-revenue_by_sku.columns = ['Total_Revenue', 'Transactions', 'Units_Sold', 'Avg_Unit_Price', 'Avg_Discount_Pct']
+revenue_by_sku = revenue_level('sku', ['Total_Revenue', 'Transactions', 'Units_Sold', 'Avg_Unit_Price', 'Avg_Discount_Pct'])
+
 revenue_by_sku = revenue_by_sku.sort_values('Total_Revenue', ascending=False)
 
 revenue_by_sku.to_csv(METADATA_CEO_DIR / "revenue_by_sku.csv")
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Warm Question-Answering Server
+Loads the LangGraph Store Manager, the aggregate tables and the retrieval index once and
+answers questions over localhost HTTP, so ask_question.py no longer pays the load per question
+
+Usage: python3 qa_server.py [--port 8765] [--workers 4]
+
+    POST /ask      {"question": "..."}  →  {"question": ..., "answer": ..., "seconds": ..., "route": ..., "cached": ...}
+    GET  /search?q=...&k=5  →  {"hits": [{"score", "source", "title", "text"}, ...]}
+    GET  /health   →  {"status": "ok", "load_seconds": ..., "questions_answered": ..., "artifact_version": ..., "cache": ...}
+
+Numeric lookups ("top stores", "customers by region", "revenue run rate") are answered from
+the in-memory aggregate tables (aggregate_query.py, route "query") without the manager.
+Other answers are cached (answer_cache.py) on the normalized question plus the content hash of the
+revenue tree and dashboard artifacts, so repeated questions return immediately until those
+artifacts are regenerated.
+
+Questions are answered concurrently: everything is loaded once in the server process and
+forked worker processes inherit it copy-on-write, so N questions run in parallel without N
+loads. --workers 0 answers in the request threads instead (for thread-safe managers).
+"""
+
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'claude'))
+from aggregate_query import AggregateQueries, format_result
+from answer_cache import AnswerCache, artifact_version
+from retrieval_index import open_index
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 4
+
+# Loaded once per server; forked workers inherit them
+_SYSTEM = None
+_INDEX = None
+_QUERIES = None
+
+
+def load_warm_state():
+    """Aggregate tables, the retrieval index and the LangGraph Store Manager, loaded once"""
+    global _SYSTEM, _INDEX, _QUERIES
+    start = time.time()
+    _QUERIES = AggregateQueries()
+    print(f"  Aggregate tables: {len(_QUERIES.tables)}")
+    _INDEX = open_index()
+    print(f"  Retrieval index: {len(_INDEX)} passages")
+    from langgraph_multi_agent_store_manager import LangGraphStoreManager
+    _SYSTEM = LangGraphStoreManager()
+    return time.time() - start
+
+
+def answer_question(question):
+    start = time.time()
+    answer = _SYSTEM.ask(question)
+    return {'question': question, 'answer': answer, 'seconds': round(time.time() - start, 3)}
+
+
+class QuestionServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, workers=DEFAULT_WORKERS):
+        super().__init__(address, QuestionHandler)
+        self.load_seconds = load_warm_state()
+        self.questions_answered = 0
+        self.cache = AnswerCache()
+        self._count_lock = threading.Lock()
+        self._query_lock = threading.Lock()
+        self.pool = None
+        if workers:
+            # A fork pool starts every worker on its first submit: do that here, after the load and
+            # before any request thread exists, so workers start warm and are not forked mid-request
+            self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'))
+            self.pool.submit(os.getpid).result()
+
+    def answer(self, question):
+        start = time.time()
+        with self._query_lock:
+            _QUERIES.refresh()
+            structured = _QUERIES.ask(question)
+        version = artifact_version()
+        cached = None if structured is not None else self.cache.get(question, version)
+        if structured is not None:
+            result = {'question': question, 'answer': format_result(structured),
+                      'seconds': round(time.time() - start, 6), 'route': 'query', 'cached': False}
+        elif cached is not None:
+            result = {'question': question, 'answer': cached, 'seconds': round(time.time() - start, 3),
+                      'route': 'cache', 'cached': True}
+        else:
+            if self.pool is not None:
+                result = self.pool.submit(answer_question, question).result()
+            else:
+                result = answer_question(question)
+            result.update(route='manager', cached=False)
+            self.cache.put(question, version, result['answer'])
+        with self._count_lock:
+            self.questions_answered += 1
+        return result
+
+    def server_close(self):
+        super().server_close()
+        self.cache.save()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class QuestionHandler(BaseHTTPRequestHandler):
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/search':
+            params = parse_qs(url.query)
+            query = params.get('q', [''])[0].strip()
+            if not query:
+                self._send(400, {'error': 'Missing query parameter q'})
+                return
+            try:
+                k = int(params.get('k', ['5'])[0])
+            except ValueError:
+                k = 0
+            if k < 1:
+                self._send(400, {'error': 'Parameter k must be a positive integer'})
+                return
+            hits = _INDEX.search(query, k=k)
+            self._send(200, {'query': query, 'hits': [hit._asdict() for hit in hits]})
+            return
+        if url.path != '/health':
+            self._send(404, {'error': f"Unknown path {self.path}"})
+            return
+        self._send(200, {
+            'status': 'ok',
+            'load_seconds': round(self.server.load_seconds, 2),
+            'questions_answered': self.server.questions_answered,
+            'artifact_version': artifact_version(),
+            'cache': self.server.cache.stats(),
+        })
+
+    def do_POST(self):
+        if self.path != '/ask':
+            self._send(404, {'error': f"Unknown path {self.path}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            question = json.loads(self.rfile.read(length) or b'{}').get('question', '').strip()
+        except (ValueError, AttributeError):
+            self._send(400, {'error': 'Expected a JSON body {"question": "..."}'})
+            return
+        if not question:
+            self._send(400, {'error': 'Empty question'})
+            return
+        try:
+            self._send(200, self.server.answer(question))
+        except Exception as exc:
+            self._send(500, {'error': repr(exc)})
+
+    def log_message(self, format, *args):
+        print(f"  [{time.strftime('%H:%M:%S')}] {self.address_string()} {format % args}")
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS):
+    print("=" * 70)
+    print("WARM QUESTION-ANSWERING SERVER")
+    print("=" * 70)
+    print("Loading data (once)...")
+    server = QuestionServer((host, port), workers=workers)
+    print(f"✓ Ready in {server.load_seconds:.1f}s — http://{host}:{port} ({workers or 'thread'} workers)")
+    # SIGTERM (kill, service stop) shuts down like Ctrl-C, so server_close() saves the answer cache
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    port_arg = int(args[args.index('--port') + 1]) if '--port' in args else DEFAULT_PORT
+    workers_arg = int(args[args.index('--workers') + 1]) if '--workers' in args else DEFAULT_WORKERS
+    serve(port=port_arg, workers=workers_arg)